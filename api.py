@@ -0,0 +1,177 @@
+"""
+POR JSON API (version 1).
+Read-only endpoints for integrations under /api/v1: a cursor-paginated,
+filterable POR list, single PORs with their line items and attachments,
+and the next PO number. Every response carries an ETag and Last-Modified
+derived from the data generation (see view_cache.py), so a poller whose
+copy is current gets a 304 for the cost of one single-row query.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional
+
+from flask import Blueprint, Response, request
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from models import POR
+from db import get_db
+from search import apply_search
+from po_counter import peek_next_po
+from utils import encode_cursor, decode_cursor
+from view_cache import get_data_version
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the standard library encoder
+    orjson = None
+
+API_VERSION = 'v1'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Exact-match filters accepted by the list endpoint: query parameter -> column
+LIST_FILTERS = {
+    'po_number': POR.po_number,
+    'requestor_name': POR.requestor_name,
+    'supplier': POR.supplier,
+    'job_contract_no': POR.job_contract_no,
+    'op_no': POR.op_no,
+}
+
+api = Blueprint('api', __name__, url_prefix=f'/api/{API_VERSION}')
+
+
+def dumps(data) -> bytes:
+    """Encode data as JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def json_response(data, status: int = 200) -> Response:
+    """Build a JSON response from data."""
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def error_response(message: str, status: int) -> Response:
+    """Build a JSON error response in the same shape as the HTML app's JSON endpoints."""
+    return json_response({'success': False, 'error': message}, status)
+
+
+def conditional(resource: str, build) -> Response:
+    """
+    Answer a GET with a 304 if the client's copy is current, else build the response.
+
+    The ETag combines the data generation with the resource (path and query
+    string), so it changes whenever any write lands; Last-Modified is when
+    the generation was last bumped.
+
+    Args:
+        resource: Identifies the representation, e.g. the full request path
+        build: Callable returning the Response when the client needs a body
+
+    Returns:
+        Response with ETag and Last-Modified set
+    """
+    generation, updated_at = get_data_version(get_db())
+    digest = hashlib.sha1(resource.encode('utf-8')).hexdigest()[:16]
+    etag = f"{generation}-{digest}"
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = bool(updated_at and request.if_modified_since
+                            and updated_at.replace(microsecond=0) <= request.if_modified_since)
+
+    response = Response(status=304) if not_modified else build()
+    response.set_etag(etag, weak=True)
+    if updated_at:
+        response.last_modified = updated_at
+    response.cache_control.no_cache = True  # always revalidate
+    return response
+
+
+@api.route('/pors')
+def list_pors():
+    """
+    List PORs newest first.
+
+    Query parameters: limit (1-200), cursor (next_cursor of the previous
+    page), q (same search as /view), created_since (ISO date or datetime)
+    and exact-match filters on the LIST_FILTERS fields.
+    """
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return error_response(f'limit must be between 1 and {MAX_PAGE_SIZE}', 400)
+
+    cursor_id = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            direction, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            return error_response('Invalid cursor', 400)
+        if direction != 'next':
+            return error_response('Invalid cursor', 400)
+
+    created_since: Optional[datetime] = None
+    if request.args.get('created_since'):
+        try:
+            created_since = datetime.fromisoformat(request.args['created_since'])
+        except ValueError:
+            return error_response('created_since must be an ISO date or datetime', 400)
+
+    filters = {}
+    for name, column in LIST_FILTERS.items():
+        value = request.args.get(name)
+        if value is not None:
+            if name == 'po_number' and not value.isdigit():
+                return error_response('po_number must be a number', 400)
+            filters[name] = (column, int(value) if name == 'po_number' else value)
+
+    def build():
+        # Plain rows, not ORM objects: lists can be long and are read-only
+        db_session = get_db()
+        stmt = select(*[POR.__table__.c[field] for field in POR.DICT_FIELDS])
+        stmt, _ = apply_search(db_session, stmt, request.args.get('q', '').strip())
+        for column, value in filters.values():
+            stmt = stmt.where(column == value)
+        if created_since:
+            stmt = stmt.where(POR.created_at >= created_since)
+        if cursor_id is not None:
+            stmt = stmt.where(POR.id < cursor_id)
+        rows = db_session.execute(stmt.order_by(POR.id.desc()).limit(limit + 1)).all()
+
+        pors = [POR.row_to_dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor('next', pors[-1]['id']) if len(rows) > limit else None
+        return json_response({'success': True, 'pors': pors, 'next_cursor': next_cursor, 'limit': limit})
+
+    return conditional(request.full_path, build)
+
+
+@api.route('/pors/<int:por_id>')
+def get_por(por_id):
+    """Get one POR with its line items and attachment metadata."""
+    def build():
+        por = (get_db().query(POR)
+               .options(selectinload(POR.line_items), selectinload(POR.attached_files))
+               .filter(POR.id == por_id)
+               .first())
+        if not por:
+            return error_response('POR not found', 404)
+        data = por.to_dict()
+        data['line_items'] = [item.to_dict() for item in sorted(por.line_items, key=lambda item: item.id)]
+        data['attachments'] = [por_file.to_dict() for por_file in por.attached_files]
+        return json_response({'success': True, 'por': data})
+
+    return conditional(request.path, build)
+
+
+@api.route('/po-numbers/next')
+def next_po_number():
+    """Get the PO number the next upload will be given (not reserved)."""
+    return conditional(request.path, lambda: json_response({'success': True,
+                                                           'next_po_number': peek_next_po(get_db())}))
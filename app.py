@@ -7,25 +7,33 @@ import os
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Tuple, List
+from urllib.parse import quote
 
-from models import BatchCounter
-from models import Base, engine
-Base.metadata.create_all(engine)
-
-from flask import Flask, request, render_template, flash, redirect, url_for, send_file
+from flask import (Flask, Blueprint, Request, Response, request, render_template, flash, redirect, url_for,
+                   send_file, jsonify, abort, stream_with_context)
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
 
-from models import POR, session, PORFile
-from utils import read_ws, find_vertical, get_order_total, extract_line_items, to_float, stringify
-from po_counter import increment_po, current_po, po_counter_path, set_po_value
+from models import POR, PORFile, init_database
+from db import get_db, rollback_db, init_app as init_db_app
+from search import index_pors, apply_search
+from view_cache import view_cache, get_data_generation, bump_data_generation
+from spool import spool_stream_factory, spooled_hash
+from duplicates import DuplicateUpload, duplicate_message, find_processed_po
+from parse_cache import parse_cache
+from blob_store import (stage_blob, discard_staged, add_blob_reference, remove_placed,
+                        release_blob_reference, purge_released, restore_released)
+from utils import read_ws, to_float, capitalize_text, make_por_filename, encode_cursor, decode_cursor
+from parsing_map import POR_PLAN, build_por_data
+from po_counter import allocate_po, get_current_po, set_current_po, set_po_value
+from bulk_upload import collect_bulk_files, process_bulk_upload
+from jobs import enqueue_upload, get_job, start_upload_workers, FINISHED_STATES, JOB_DONE
+from config import BULK_MAX_CONTENT_LENGTH, UPLOAD_WORKERS, ATTACHMENT_SENDFILE, ATTACHMENT_ACCEL_PREFIX
 
 # Configuration
 UPLOAD_FOLDER = "static/uploads"
 
-# Ensure the upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'msg', 'eml'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
 RECORDS_PER_PAGE = 10
@@ -34,13 +42,28 @@ RECORDS_PER_PAGE = 10
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Flask app setup
-app = Flask(__name__)
-app.config.update(
-    UPLOAD_FOLDER=UPLOAD_FOLDER,
-    MAX_CONTENT_LENGTH=MAX_FILE_SIZE,
-    SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-)
+# Endpoints whose uploaded files are spooled straight to the uploads volume
+SPOOLED_UPLOAD_ENDPOINTS = {'por.upload', 'por.dry_run', 'por.attach_files', 'por.attach_email_to_por'}
+
+
+class PORRequest(Request):
+    """Request class that allows larger bodies on the bulk upload endpoint
+    and spools POR and attachment uploads to disk as they arrive."""
+    
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'por.bulk_upload':
+            return BULK_MAX_CONTENT_LENGTH
+        return super().max_content_length
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in SPOOLED_UPLOAD_ENDPOINTS:
+            return spool_stream_factory(total_content_length, content_type, filename, content_length)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+# All POR routes; registered on the app by create_app
+bp = Blueprint('por', __name__)
 
 
 def allowed_file(filename: str) -> bool:
@@ -49,28 +72,31 @@ def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 
-def capitalize_text(value):
-    """Capitalize text values, handling None and non-string values."""
-    if value is None:
-        return None
-    if isinstance(value, str):
-        return value.upper()
-    return value
+def check_upload_file(file) -> Optional[str]:
+    """Validate an uploaded POR file, returning an error message or None."""
+    if not file or file.filename == '':
+        return "No file selected"
+    if not allowed_file(file.filename):
+        return "Invalid file type. Please upload Excel files (.xlsx, .xls) or email files (.msg, .eml)"
+    return None
 
 
-def process_uploaded_file(file) -> Tuple[bool, str, Optional[dict], Optional[list]]:
+def process_uploaded_file(file, path: Optional[str] = None) -> Tuple[bool, str, Optional[dict], Optional[list]]:
     """
     Process uploaded Excel file or email file and extract POR data and line items.
+    
+    Args:
+        file: Uploaded FileStorage
+        path: Optional path of the upload on disk; workbooks are then read from the path
+        
     Returns:
         Tuple of (success, message, data_dict, line_items)
     """
     try:
         # Validate file
-        if not file or file.filename == '':
-            return False, "No file selected", None, None
-        
-        if not allowed_file(file.filename):
-            return False, "Invalid file type. Please upload Excel files (.xlsx, .xls) or email files (.msg, .eml)", None, None
+        error = check_upload_file(file)
+        if error:
+            return False, error, None, None
         
         # Check file extension
         file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
@@ -78,95 +104,51 @@ def process_uploaded_file(file) -> Tuple[bool, str, Optional[dict], Optional[lis
         if file_extension in ['msg', 'eml']:
             return process_email_file(file)
         else:
-            return process_excel_file(file)
+            return process_excel_file(file, path)
             
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         return False, f"❌ Error processing file: {str(e)}", None, None
 
 
-def process_excel_file(file) -> Tuple[bool, str, Optional[dict], Optional[list]]:
-    """Process Excel file and extract POR data."""
+def parse_upload(file, path: Optional[str] = None,
+                 content_hash: Optional[str] = None) -> Tuple[bool, str, Optional[dict], Optional[list]]:
+    """
+    Extract POR data and line items from an upload without side effects.
+    
+    Nothing is allocated or stored. Successful parses are cached by
+    content_hash (see parse_cache.py), so a dry run and the real upload
+    of the same file parse it once.
+    
+    Args:
+        file: Uploaded FileStorage
+        path: Optional path of the upload on disk
+        content_hash: SHA-256 of the upload, if known
+        
+    Returns:
+        Tuple of (success, message, data_dict, line_items)
+    """
+    cached = parse_cache.get(content_hash)
+    if cached:
+        data, line_items = cached
+        return True, "✅ File processed", data, line_items
+    success, message, data, line_items = process_uploaded_file(file, path)
+    if success and data:
+        parse_cache.put(content_hash, data, line_items or [])
+    return success, message, data, line_items
+
+
+def process_excel_file(file, path: Optional[str] = None) -> Tuple[bool, str, Optional[dict], Optional[list]]:
+    """Process Excel file (read from path if given) and extract POR data (the PO number is allocated on save)."""
     try:
-        # Read worksheet
-        rows, ws = read_ws(file)
-        if not rows:
+        # Read worksheet once, bounded by the compiled parsing map
+        sheet = read_ws(path or file, POR_PLAN)
+        if not sheet:
             return False, "Empty or invalid Excel file", None, None
         
-        # Extract data
-        requestor = capitalize_text(find_vertical(rows, 'Requestor Name') or 'Unknown')
-        date_order = find_vertical(rows, 'Date Order Raised') or datetime.now().strftime('%d/%m/%Y')
-        
-        # Extract ship/project name from B2 (based on parsing map)
-        ship_project_name = capitalize_text(ws.cell(2, 2).value if ws.cell(2, 2).value else 'Unknown')
-        
-        # Extract supplier from D2
-        supplier = capitalize_text(ws.cell(2, 4).value if ws.cell(2, 4).value else '')
-        
-        # Extract specification/standards from A29
-        specification_standards = capitalize_text(ws.cell(29, 1).value if ws.cell(29, 1).value else '')
-        
-        # Extract supplier contact details from C33-C36
-        supplier_contact_name = capitalize_text(ws.cell(33, 3).value if ws.cell(33, 3).value else '')
-        supplier_contact_email = ws.cell(34, 3).value if ws.cell(34, 3).value else ''  # Keep email in original case
-        quote_ref = capitalize_text(ws.cell(35, 3).value if ws.cell(35, 3).value else '')
-        quote_date = stringify(ws.cell(36, 3).value) if ws.cell(36, 3).value else ''  # Format as dd/mm/yyyy
-        
-        # Generate PO number and filename
-        po_number = increment_po()
-        safe_filename = secure_filename(f'PO_{po_number}_{date_order}_{requestor.replace(" ", "_")}.xlsx')
-        
-        # Save file locally
-        try:
-            file.seek(0)
-            file_path = os.path.join(UPLOAD_FOLDER, safe_filename)
-            file.save(file_path)
-        except Exception as e:
-            logger.error(f"Error saving file: {str(e)}")
-            return False, f"❌ Error saving file: {str(e)}", None, None
-        
-        # Extract line items
-        header_row = next((i for i, r in enumerate(ws.iter_rows(values_only=True), 1) 
-                          if any(isinstance(c, str) and 'MATERIAL' in c.upper() for c in r)), None)
-        
-        items = extract_line_items(ws, header_row) if header_row else []
-        
-        # Capitalize text fields in line items
-        for item in items:
-            item['job'] = capitalize_text(item.get('job'))
-            item['op'] = capitalize_text(item.get('op'))
-            item['desc'] = capitalize_text(item.get('desc'))
-        
-        first_item = items[0] if items else {}
-        
-        # Calculate totals
-        order_total = to_float(get_order_total(ws))
-        
-        # Prepare data
-        data = {
-            'po_number': po_number,
-            'requestor_name': requestor,
-            'date_order_raised': date_order,
-            'ship_project_name': ship_project_name,
-            'supplier': supplier,
-            'filename': safe_filename,
-            'job_contract_no': first_item.get('job'),
-            'op_no': first_item.get('op'),
-            'description': first_item.get('desc'),
-            'quantity': first_item.get('qty'),
-            'price_each': to_float(first_item.get('price')),
-            'line_total': to_float(first_item.get('ltot')),
-            'order_total': order_total,
-            'specification_standards': specification_standards,
-            'supplier_contact_name': supplier_contact_name,
-            'supplier_contact_email': supplier_contact_email,
-            'quote_ref': quote_ref,
-            'quote_date': quote_date,
-            'data_summary': "\n".join(str(r) for r in rows[:10]),
-            'created_at': datetime.now(timezone.utc)
-        }
+        data, items = build_por_data(sheet, POR_PLAN)
         
-        return True, f"✅ Successfully processed PO #{po_number}", data, items
+        return True, "✅ Excel file processed", data, items
         
     except Exception as e:
         logger.error(f"Error processing Excel file: {str(e)}")
@@ -174,27 +156,13 @@ def process_excel_file(file) -> Tuple[bool, str, Optional[dict], Optional[list]]
 
 
 def process_email_file(file) -> Tuple[bool, str, Optional[dict], Optional[list]]:
-    """Process email file (.msg or .eml) and extract POR data."""
+    """Process email file (.msg or .eml) and extract POR data (the PO number is allocated on save)."""
     try:
         import email
         from email import policy
         
-        # Generate PO number and filename
-        po_number = increment_po()
         date_order = datetime.now().strftime('%d/%m/%Y')
         
-        # Save file locally
-        original_filename = secure_filename(file.filename)
-        safe_filename = secure_filename(f'PO_{po_number}_{date_order}_EMAIL_{original_filename}')
-        
-        try:
-            file.seek(0)
-            file_path = os.path.join(UPLOAD_FOLDER, safe_filename)
-            file.save(file_path)
-        except Exception as e:
-            logger.error(f"Error saving email file: {str(e)}")
-            return False, f"❌ Error saving email file: {str(e)}", None, None
-        
         # Parse email content
         file.seek(0)
         if file.filename.lower().endswith('.msg'):
@@ -243,12 +211,10 @@ def process_email_file(file) -> Tuple[bool, str, Optional[dict], Optional[list]]
         
         # Prepare data
         data = {
-            'po_number': po_number,
             'requestor_name': requestor,
             'date_order_raised': date_order,
             'ship_project_name': 'Email Upload',
             'supplier': supplier,
-            'filename': safe_filename,
             'job_contract_no': '',
             'op_no': '',
             'description': email_data['subject'][:100],  # Use subject as description
@@ -262,7 +228,6 @@ def process_email_file(file) -> Tuple[bool, str, Optional[dict], Optional[list]]
             'quote_ref': '',
             'quote_date': '',
             'data_summary': f"Email Subject: {email_data['subject']}\nFrom: {email_data['from']}\nDate: {email_data['date']}\n\nBody Preview:\n{email_data['body'][:500]}...",
-            'created_at': datetime.now(timezone.utc)
         }
         
         # Create a simple line item from email data
@@ -275,137 +240,379 @@ def process_email_file(file) -> Tuple[bool, str, Optional[dict], Optional[list]]
             'ltot': 0.0
         }]
         
-        return True, f"✅ Successfully processed Email PO #{po_number}", data, items
+        return True, "✅ Email file processed", data, items
         
     except Exception as e:
         logger.error(f"Error processing email file: {str(e)}")
         return False, f"❌ Error processing email file: {str(e)}", None, None
 
 
-def save_por_to_database(data: dict, line_items: list = None) -> bool:
-    """Save POR data and its line items to database."""
+def is_email_file(filename: str) -> bool:
+    """Check if an uploaded POR file is an email (.msg/.eml)."""
+    return filename.rsplit('.', 1)[-1].lower() in ('msg', 'eml')
+
+
+def stored_upload_filename(original_filename: str, data: dict) -> str:
+    """Build the stored filename for an uploaded POR file once its PO number is known."""
+    if is_email_file(original_filename):
+        return secure_filename(f"PO_{data['po_number']}_{data['date_order_raised']}_EMAIL_{secure_filename(original_filename)}")
+    return make_por_filename(data['po_number'], data['date_order_raised'], data['requestor_name'])
+
+
+def save_por_to_database(data: dict, line_items: list = None, file=None,
+                         source_path: Optional[str] = None, allow_duplicate: bool = False) -> Optional[int]:
+    """
+    Save POR data and its line items to database.
+    
+    Unless data already carries a po_number, the PO number is allocated in
+    the same transaction as the insert, and the uploaded file (if given) is
+    stored under that number before commit. A failed save therefore never
+    burns a PO number or leaves a stray file behind.
+    
+    Args:
+        data: POR fields
+        line_items: Parsed line items
+        file: Uploaded FileStorage to store with the POR
+        source_path: Spooled copy of file on the uploads volume; it is
+            renamed into place instead of copying file (and moved back if
+            the save fails)
+        allow_duplicate: Save even if a POR was already created from a
+            file with the same data['source_hash']
+        
+    Returns:
+        The saved PO number, None on failure
+        
+    Raises:
+        DuplicateUpload: If data['source_hash'] was already processed
+    """
+    from models import get_session, LineItem
+    db_session = get_session()
+    file_path = None
     try:
-        from models import get_session, LineItem
-        db_session = get_session()
+        data = dict(data)
+        if not data.get('po_number'):
+            data['po_number'] = allocate_po(db_session)
+        if not allow_duplicate:
+            # Checked after allocation: the counter row lock serializes
+            # concurrent saves, so two identical uploads cannot both pass
+            existing = find_processed_po(db_session, data.get('source_hash'))
+            if existing:
+                raise DuplicateUpload(existing)
+        if file is not None:
+            data['filename'] = stored_upload_filename(file.filename, data)
+        data.setdefault('created_at', datetime.now(timezone.utc))
+        
         por = POR(**data)
-        db_session.add(por)
-        db_session.flush()  # Get POR id
         # Save line items if provided
-        if line_items:
-            for item in line_items:
-                line_item = LineItem(
-                    por_id=por.id,
-                    job_contract_no=item.get('job'),
-                    op_no=item.get('op'),
-                    description=item.get('desc'),
-                    quantity=item.get('qty'),
-                    price_each=to_float(item.get('price')),
-                    line_total=to_float(item.get('ltot'))
-                )
-                db_session.add(line_item)
+        por.line_items = [
+            LineItem(
+                job_contract_no=item.get('job'),
+                op_no=item.get('op'),
+                description=item.get('desc'),
+                quantity=item.get('qty'),
+                price_each=to_float(item.get('price')),
+                line_total=to_float(item.get('ltot'))
+            )
+            for item in line_items or []
+        ]
+        db_session.add(por)
+        db_session.flush()  # Surface constraint errors before touching the disk
+        index_pors(db_session, [por.id])
+        
+        if file is not None:
+            file_path = os.path.join(UPLOAD_FOLDER, data['filename'])
+            if source_path:
+                os.replace(source_path, file_path)
+            else:
+                file.seek(0)
+                file.save(file_path)
+        
+        bump_data_generation(db_session)
         db_session.commit()
-        db_session.close()
-        return True
+        return data['po_number']
+    except DuplicateUpload:
+        db_session.rollback()
+        raise
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
-        try:
-            db_session.rollback()
-            db_session.close()
-        except:
-            pass
-        return False
+        db_session.rollback()
+        if file_path and os.path.exists(file_path):
+            if source_path:
+                os.replace(file_path, source_path)
+            else:
+                os.remove(file_path)
+        return None
+    finally:
+        db_session.close()
 
 
-def get_paginated_records(page: int, search_query: str = '') -> Tuple[List[POR], dict]:
+def get_paginated_records(page: int, search_query: str = '', per_page: int = RECORDS_PER_PAGE,
+                          cursor: Optional[str] = None) -> Tuple[List[POR], dict]:
     """
-    Get paginated POR records with optional search.
-    Also attaches all line items to each POR record.
+    Get paginated POR records, newest first, or best match first when searching.
+    
+    Searches use the full-text index (see search.py), which covers the POR
+    header and every line item. With a cursor (see encode_cursor) the page
+    is found by seeking on the id index, so deep pages cost the same as
+    the first one; otherwise, and for ranked searches, the page number is
+    used with OFFSET. Line items and attachments are
+    select-in loaded and attachment counts come from a correlated count
+    subquery, so a page costs the same number of queries whatever its size.
+    
+    Raises:
+        ValueError: If the cursor is malformed
     """
+    direction, cursor_id = decode_cursor(cursor) if cursor else (None, None)
     try:
-        from models import get_session, LineItem
-        db_session = get_session()
-        query = db_session.query(POR).order_by(POR.id.desc())
-        if search_query:
-            search_term = f"%{search_query}%"
-            query = query.filter(
-                POR.po_number.like(search_term) |
-                POR.requestor_name.like(search_term) |
-                POR.job_contract_no.like(search_term) |
-                POR.op_no.like(search_term) |
-                POR.description.like(search_term)
-            )
+        from sqlalchemy import func, select
+        from sqlalchemy.orm import selectinload
+        db_session = get_db()
+        query, matches = apply_search(db_session, db_session.query(POR), search_query)
+        if matches is not None:
+            direction = None  # ranked results are paged by number
         total_records = query.count()
-        total_pages = (total_records + RECORDS_PER_PAGE - 1) // RECORDS_PER_PAGE
-        offset = (page - 1) * RECORDS_PER_PAGE
-        records = query.offset(offset).limit(RECORDS_PER_PAGE).all()
-        # Attach line items to each record
-        for record in records:
-            record.file_count = len(record.attached_files)
+        total_pages = (total_records + per_page - 1) // per_page
+        
+        file_count = (select(func.count(PORFile.id))
+                      .where(PORFile.por_id == POR.id)
+                      .correlate(POR)
+                      .scalar_subquery())
+        query = (query
+                 .add_columns(file_count)
+                 .options(selectinload(POR.line_items), selectinload(POR.attached_files)))
+        
+        # Fetch one extra row to learn whether there is another page
+        if direction == 'next':
+            rows = query.filter(POR.id < cursor_id).order_by(POR.id.desc()).limit(per_page + 1).all()
+            has_prev, has_next = True, len(rows) > per_page
+            rows = rows[:per_page]
+        elif direction == 'prev':
+            rows = query.filter(POR.id > cursor_id).order_by(POR.id.asc()).limit(per_page + 1).all()
+            has_prev, has_next = len(rows) > per_page, True
+            rows = rows[:per_page][::-1]
+        else:
+            order = (matches.c.rank, POR.id.desc()) if matches is not None else (POR.id.desc(),)
+            rows = query.order_by(*order).offset((page - 1) * per_page).limit(per_page).all()
+            has_prev, has_next = page > 1, page < total_pages
+        
+        records = []
+        for record, count in rows:
+            record.file_count = count
             record.files = record.attached_files
-            # Attach all line items
-            record.line_items = db_session.query(LineItem).filter_by(por_id=record.id).all()
+            records.append(record)
         pagination_info = {
-            'current_page': page,
+            'current_page': page if direction is None else None,
             'total_pages': total_pages,
             'total_records': total_records,
-            'has_prev': page > 1,
-            'has_next': page < total_pages,
-            'records_per_page': RECORDS_PER_PAGE
+            'has_prev': has_prev and bool(records),
+            'has_next': has_next and bool(records),
+            'records_per_page': per_page,
+            'prev_cursor': encode_cursor('prev', records[0].id) if records and matches is None else None,
+            'next_cursor': encode_cursor('next', records[-1].id) if records and matches is None else None
         }
-        db_session.close()
         return records, pagination_info
     except Exception as e:
         logger.error(f"Error fetching records: {str(e)}")
+        rollback_db()
+        return [], {}
+
+
+def run_upload_job(spool_path: str, original_filename: str, content_hash: Optional[str] = None,
+                   allow_duplicate: bool = False) -> Tuple[bool, str, Optional[int]]:
+    """
+    Process a queued upload; called by the background upload workers.
+    
+    A file already processed (same content hash) is matched to its PO
+    without being parsed, unless allow_duplicate is set.
+    
+    Returns:
+        Tuple of (success, message, po_number)
+    """
+    if content_hash and not allow_duplicate:
+        from models import get_session
+        db_session = get_session()
         try:
+            existing = find_processed_po(db_session, content_hash)
+        finally:
             db_session.close()
-        except:
-            pass
-        return [], {}
+        if existing:
+            return True, duplicate_message(existing), existing
+    
+    with open(spool_path, 'rb') as stream:
+        file = FileStorage(stream=stream, filename=original_filename)
+        success, message, data, line_items = parse_upload(file, spool_path, content_hash)
+        if not (success and data):
+            return False, message, None
+        data['source_hash'] = content_hash
+        try:
+            po_number = save_por_to_database(data, line_items, file, source_path=spool_path,
+                                             allow_duplicate=allow_duplicate)
+        except DuplicateUpload as e:
+            return True, duplicate_message(e.po_number), e.po_number
+    if po_number is None:
+        return False, "❌ Error saving to database", None
+    label = "Email PO" if is_email_file(original_filename) else "PO"
+    return True, f"✅ Successfully processed {label} #{po_number}", po_number
+
 
+def ensure_upload_workers():
+    """Start the in-process upload workers if they are not running yet."""
+    start_upload_workers(run_upload_job, UPLOAD_WORKERS)
 
-@app.route('/test')
+
+@bp.route('/test')
 def test():
-    return "App is working! Database connection: " + str(session is not None)
+    from sqlalchemy import text
+    try:
+        get_db().execute(text("SELECT 1"))
+        connected = True
+    except Exception:
+        connected = False
+    return "App is working! Database connection: " + str(connected)
 
-@app.route('/', methods=['GET', 'POST'])
+@bp.route('/', methods=['GET', 'POST'])
 def upload():
-    """Handle file upload and processing."""
+    """Queue file uploads for background processing and report finished jobs."""
     if request.method == 'POST':
         try:
             file = request.files.get('file')
-            success, message, data, line_items = process_uploaded_file(file)
-            if success and data:
-                if save_por_to_database(data, line_items):
-                    flash(message, 'success')
-                else:
-                    flash("❌ Error saving to database", 'error')
+            allow_duplicate = request.form.get('allow_duplicate') == '1'
+            error = check_upload_file(file)
+            existing = None if error or allow_duplicate else find_processed_po(get_db(), spooled_hash(file))
+            if error:
+                flash(error, 'error')
+            elif existing:
+                # Known file: answer now, without queueing or parsing it
+                flash(duplicate_message(existing), 'error')
             else:
-                flash(message, 'error')
+                job_id = enqueue_upload(file, allow_duplicate=allow_duplicate)
+                ensure_upload_workers()
+                return redirect(url_for('.upload', job=job_id))
         except RequestEntityTooLarge:
             flash("❌ File too large. Maximum size is 16MB.", 'error')
         except Exception as e:
             logger.error(f"Upload error: {str(e)}")
             flash(f"❌ Unexpected error: {str(e)}", 'error')
-    return render_template("upload.html", current_po=current_po)
+        return render_template("upload.html", current_po=get_current_po(), job=None)
+    
+    job = None
+    job_id = request.args.get('job', type=int)
+    if job_id:
+        job = get_job(job_id)
+        if job and job['status'] in FINISHED_STATES:
+            flash(job['message'], 'success' if job['status'] == JOB_DONE else 'error')
+            return redirect(url_for('.upload'))
+    return render_template("upload.html", current_po=get_current_po(), job=job)
+
+
+@bp.route('/dry-run', methods=['POST'])
+def dry_run():
+    """
+    Preview what an upload would extract, as JSON.
+    
+    Parses the file without allocating a PO number or storing anything,
+    and reports whether the same file was already processed.
+    """
+    file = request.files.get('file')
+    error = check_upload_file(file)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    content_hash = spooled_hash(file)
+    success, message, data, line_items = parse_upload(file, content_hash=content_hash)
+    if not (success and data):
+        return jsonify({'success': False, 'error': message}), 422
+    return jsonify({
+        'success': True,
+        'content_hash': content_hash,
+        'already_processed_as': find_processed_po(get_db(), content_hash),
+        'data': data,
+        'line_items': [
+            {
+                'job_contract_no': item.get('job'),
+                'op_no': item.get('op'),
+                'description': item.get('desc'),
+                'quantity': item.get('qty'),
+                'price_each': to_float(item.get('price')),
+                'line_total': to_float(item.get('ltot'))
+            }
+            for item in line_items or []
+        ]
+    })
+
+
+@bp.route('/parse-cache-stats')
+def parse_cache_stats():
+    """Return parsed upload cache hit and miss statistics as JSON."""
+    return jsonify(parse_cache.stats())
+
+
+@bp.route('/upload-status/<int:job_id>')
+def upload_status(job_id):
+    """Return the status of a queued upload as JSON."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+
+@bp.route('/bulk-upload', methods=['GET', 'POST'])
+def bulk_upload():
+    """Handle multi-file and ZIP uploads of POR workbooks."""
+    results = []
+    if request.method == 'POST':
+        try:
+            entries = collect_bulk_files(request.files.getlist('files'))
+            if not entries:
+                flash("❌ No files selected", 'error')
+            else:
+                results = process_bulk_upload(entries, allow_duplicates=request.form.get('allow_duplicate') == '1')
+                processed = sum(1 for r in results if r['success'])
+                flash(f"✅ Processed {processed} of {len(results)} file(s)" if processed
+                      else "❌ No files could be processed", 'success' if processed else 'error')
+        except RequestEntityTooLarge:
+            flash("❌ Upload too large. Maximum total size is 256MB.", 'error')
+        except ValueError as e:
+            flash(f"❌ {str(e)}", 'error')
+        except Exception as e:
+            logger.error(f"Bulk upload error: {str(e)}")
+            flash(f"❌ Unexpected error: {str(e)}", 'error')
+    return render_template("bulk_upload.html", results=results, current_po=get_current_po())
 
 
-@app.route('/view')
+@bp.route('/view')
 def view():
     """Display paginated POR records with search."""
     try:
         page = request.args.get('page', 1, type=int)
+        cursor = request.args.get('cursor') or None
         search_query = request.args.get('q', '').strip()
         
         # Validate page number
         if page < 1:
             page = 1
         
-        records, pagination = get_paginated_records(page, search_query)
+        # Read the generation before the data so a page is never cached
+        # under a newer generation than the data it shows
+        generation = get_data_generation(get_db())
+        cache_key = (page, cursor, search_query)
+        html = view_cache.get(generation, cache_key)
+        if html is not None:
+            return html
         
-        return render_template("view.html", 
-                             pors=records, 
-                             current_po=current_po,
-                             **pagination)
+        try:
+            records, pagination = get_paginated_records(page, search_query, cursor=cursor)
+        except ValueError:
+            # Stale or hand-edited cursor: start again from the newest records
+            records, pagination = get_paginated_records(1, search_query)
+        
+        html = render_template("view.html", 
+                               pors=records, 
+                               current_po=get_current_po(),
+                               **pagination)
+        if pagination:  # empty on database errors; don't cache those
+            view_cache.put(generation, cache_key, html)
+        return html
                              
     except Exception as e:
         logger.error(f"View error: {str(e)}")
@@ -417,12 +624,39 @@ def view():
             'total_records': 0,
             'has_prev': False,
             'has_next': False,
-            'records_per_page': RECORDS_PER_PAGE
+            'records_per_page': RECORDS_PER_PAGE,
+            'prev_cursor': None,
+            'next_cursor': None
         }
-        return render_template("view.html", pors=[], current_po=current_po, **default_pagination)
+        return render_template("view.html", pors=[], current_po=get_current_po(), **default_pagination)
+
+
+@bp.route('/export/<fmt>')
+def export_records(fmt):
+    """Stream every POR and line item matching the /view search as CSV or XLSX."""
+    from export import stream_csv, stream_xlsx, export_filename
+    formats = {
+        'csv': (stream_csv, 'text/csv; charset=utf-8'),
+        'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    }
+    if fmt not in formats:
+        abort(404)
+    stream, mimetype = formats[fmt]
+    search_query = request.args.get('q', '').strip()
+    return Response(
+        stream_with_context(stream(get_db(), search_query)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{export_filename(fmt)}"'}
+    )
+
 
+@bp.route('/view-cache-stats')
+def view_cache_stats():
+    """Return /view cache hit and miss statistics as JSON."""
+    return jsonify(view_cache.stats())
 
-@app.route('/change-batch', methods=['GET', 'POST'])
+
+@bp.route('/change-batch', methods=['GET', 'POST'])
 def change_batch():
     print("CHANGE BATCH ROUTE HIT")
     """Handle batch number updates."""
@@ -440,13 +674,14 @@ def change_batch():
                     if new_po < 1:
                         flash("❌ PO number must be greater than 0", 'error')
                     else:
-                        # Update global variable and file
-                        global current_po
-                        current_po = new_po
-                        with open(po_counter_path, 'w') as f:
-                            f.write(str(new_po))
+                        # Update displayed value and file
+                        set_current_po(new_po)
                         logger.info(f"[DEBUG] Calling set_po_value({new_po})")
                         set_po_value(new_po)
+                        # /view shows the batch number
+                        db_session = get_db()
+                        bump_data_generation(db_session)
+                        db_session.commit()
                         logger.info(f"[DEBUG] set_po_value({new_po}) called successfully")
                         flash(f"✅ Starting PO set to {new_po}", 'success')
                         
@@ -461,20 +696,21 @@ def change_batch():
     return render_template("change_batch.html")
 
 
-@app.route('/attach-files/<int:por_id>', methods=['GET', 'POST'])
+@bp.route('/attach-files/<int:por_id>', methods=['GET', 'POST'])
 def attach_files(por_id):
     """Handle file attachments for POR records."""
     try:
         # Get the POR record
-        from models import get_session
-        db_session = get_session()
+        db_session = get_db()
         por = db_session.query(POR).filter_by(id=por_id).first()
         
         if not por:
             flash("❌ POR record not found", 'error')
-            return redirect(url_for('view'))
+            return redirect(url_for('.view'))
         
         if request.method == 'POST':
+            staged_blobs = []
+            placed_blobs = []
             try:
                 files = request.files.getlist('files')
                 file_types = request.form.getlist('file_types')
@@ -497,25 +733,22 @@ def attach_files(por_id):
                         file_type = file_types[i] if i < len(file_types) else 'other'
                         description = descriptions[i] if i < len(descriptions) else ''
                         
-                        # Generate safe filename
+                        # Store the content once, however many PORs it is attached to
                         original_filename = file.filename
-                        file_extension = os.path.splitext(original_filename)[1]
-                        safe_filename = f"POR_{por.po_number}_{file_type}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}{file_extension}"
-                        
-                        # Save file
-                        file_path = os.path.join(UPLOAD_FOLDER, safe_filename)
-                        file.save(file_path)
-                        logger.info(f"File saved to: {file_path}")
-                        file_size = os.path.getsize(file_path)
-                        logger.info(f"File size: {file_size} bytes")
+                        staged = stage_blob(file.stream)
+                        staged_blobs.append(staged)
+                        stored_filename, placed = add_blob_reference(db_session, staged)
+                        placed_blobs.append(placed)
+                        logger.info(f"File stored as: {stored_filename} ({staged.size} bytes)")
                         
                         # Create PORFile record
                         por_file = PORFile(
                             por_id=por_id,
                             original_filename=original_filename,
-                            stored_filename=safe_filename,
+                            stored_filename=stored_filename,
+                            content_hash=staged.sha256,
                             file_type=file_type,
-                            file_size=file_size,
+                            file_size=staged.size,
                             mime_type=file.content_type or 'application/octet-stream',
                             description=description
                         )
@@ -525,6 +758,7 @@ def attach_files(por_id):
                         logger.info(f"Added file to database: {por_file.original_filename}")
                 
                 if uploaded_count > 0:
+                    bump_data_generation(db_session)
                     db_session.commit()
                     logger.info(f"Committed {uploaded_count} files to database")
                     flash(f"✅ Successfully uploaded {uploaded_count} file(s)", 'success')
@@ -533,202 +767,177 @@ def attach_files(por_id):
                     flash("❌ No valid files were uploaded", 'error')
                     
             except Exception as e:
+                for placed in placed_blobs:
+                    remove_placed(placed)
                 db_session.rollback()
                 logger.error(f"File upload error: {str(e)}")
                 flash(f"❌ Error uploading files: {str(e)}", 'error')
             finally:
-                db_session.close()
+                for staged in staged_blobs:
+                    discard_staged(staged)
         
-        # Get existing attachments
-        db_session = get_session()
-        por = db_session.query(POR).filter_by(id=por_id).first()
-        attached_files = por.attached_files if por else []
-        db_session.close()
+        # Get existing attachments (reloaded after a commit or rollback)
+        attached_files = por.attached_files
         
         return render_template("attach_files.html", por=por, attached_files=attached_files)
         
     except Exception as e:
         logger.error(f"Attach files error: {str(e)}")
         flash(f"❌ Error: {str(e)}", 'error')
-        return redirect(url_for('view'))
+        return redirect(url_for('.view'))
+
+
+def attachment_etag(por_file: PORFile) -> str:
+    """ETag of an attachment: its content hash, or id and size for legacy flat files."""
+    return por_file.content_hash or f"{por_file.id}-{por_file.file_size}"
+
 
+def offloaded_download(por_file: PORFile, file_path: str) -> Response:
+    """
+    Build an empty response telling the front proxy to send the file.
+    
+    The proxy serves the body and Range requests; conditional requests
+    are answered here so a current client gets a 304 without touching
+    the proxy's file handling.
+    """
+    response = Response(mimetype=por_file.mime_type or 'application/octet-stream')
+    if ATTACHMENT_SENDFILE == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = ATTACHMENT_ACCEL_PREFIX + por_file.stored_filename.replace(os.sep, '/')
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(file_path)
+    try:
+        por_file.original_filename.encode('ascii')
+        response.headers.set('Content-Disposition', 'attachment', filename=por_file.original_filename)
+    except UnicodeEncodeError:
+        response.headers.set('Content-Disposition', 'attachment',
+                             filename=secure_filename(por_file.original_filename) or 'download',
+                             **{'filename*': f"UTF-8''{quote(por_file.original_filename)}"})
+    response.set_etag(attachment_etag(por_file))
+    response.last_modified = por_file.uploaded_at
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
-@app.route('/download-file/<int:file_id>')
+
+@bp.route('/download-file/<int:file_id>')
 def download_file(file_id):
-    """Download an attached file."""
+    """
+    Download an attached file.
+    
+    Supports Range requests (resumable downloads) and If-None-Match /
+    If-Modified-Since; with ATTACHMENT_SENDFILE set the transfer is
+    handed to the front proxy.
+    """
     try:
-        from models import get_session
-        db_session = get_session()
-        por_file = db_session.query(PORFile).filter_by(id=file_id).first()
+        por_file = get_db().get(PORFile, file_id)
         
         if not por_file:
             flash("❌ File not found", 'error')
-            return redirect(url_for('view'))
-        
-
-        
-        file_path = os.path.join(UPLOAD_FOLDER, por_file.stored_filename)
+            return redirect(url_for('.view'))
         
-        if not os.path.exists(file_path):
-            flash("❌ File not found on server", 'error')
-            return redirect(url_for('view'))
+        # Absolute: send_file would resolve a relative path against the app root, not the working directory
+        file_path = os.path.abspath(os.path.join(UPLOAD_FOLDER, por_file.stored_filename))
+        if ATTACHMENT_SENDFILE in ('x-sendfile', 'x-accel-redirect'):
+            return offloaded_download(por_file, file_path)
         
-        db_session.close()
-        
-        return send_file(file_path, as_attachment=True, download_name=por_file.original_filename)
+        return send_file(file_path, as_attachment=True, download_name=por_file.original_filename,
+                         mimetype=por_file.mime_type, etag=attachment_etag(por_file),
+                         last_modified=por_file.uploaded_at, conditional=True)
         
+    except FileNotFoundError:
+        flash("❌ File not found on server", 'error')
+        return redirect(url_for('.view'))
     except Exception as e:
         logger.error(f"Download error: {str(e)}")
         flash(f"❌ Error downloading file: {str(e)}", 'error')
-        return redirect(url_for('view'))
+        return redirect(url_for('.view'))
 
 
-@app.route('/delete-file/<int:file_id>', methods=['POST'])
+@bp.route('/delete-file/<int:file_id>', methods=['POST'])
 def delete_file(file_id):
     """Delete an attached file."""
+    released = None
     try:
-        from models import get_session
-        db_session = get_session()
+        db_session = get_db()
         por_file = db_session.query(PORFile).filter_by(id=file_id).first()
         
         if not por_file:
             flash("❌ File not found", 'error')
-            return redirect(url_for('view'))
+            return redirect(url_for('.view'))
         
-        # Delete physical file
-        file_path = os.path.join(UPLOAD_FOLDER, por_file.stored_filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if por_file.content_hash:
+            # Shared blob: only removed with its last reference
+            released = release_blob_reference(db_session, por_file.content_hash)
+        else:
+            # Legacy flat file, owned by this record alone
+            file_path = os.path.join(UPLOAD_FOLDER, por_file.stored_filename)
+            if os.path.exists(file_path):
+                os.remove(file_path)
         
         # Delete database record
         db_session.delete(por_file)
+        bump_data_generation(db_session)
         db_session.commit()
-        db_session.close()
+        purge_released(released)
         
         flash("✅ File deleted successfully", 'success')
         
     except Exception as e:
+        rollback_db()
+        restore_released(released)
         logger.error(f"Delete file error: {str(e)}")
         flash(f"❌ Error deleting file: {str(e)}", 'error')
     
-    return redirect(request.referrer or url_for('view'))
+    return redirect(request.referrer or url_for('.view'))
+
 
+def apply_single_field_change(entity: str, row_id, field, value):
+    """Apply one inline edit and answer in the single-field endpoints' JSON shape."""
+    from field_edits import apply_field_changes
+    result = apply_field_changes(get_db(), [{'entity': entity, 'id': row_id, 'field': field, 'value': value}])[0]
+    return jsonify(result)
 
-@app.route('/update_por_field', methods=['POST'])
+
+@bp.route('/update_por_field', methods=['POST'])
 def update_por_field():
     """Update a field in a POR record."""
-    try:
-        from flask import jsonify
-        from models import get_session
-        
-        data = request.get_json()
-        por_id = data.get('por_id')
-        field = data.get('field')
-        value = data.get('value')
-        
-        if not all([por_id, field, value is not None]):
-            return jsonify({'success': False, 'error': 'Missing required fields'})
-        
-        # Validate field name to prevent SQL injection
-        allowed_fields = {
-            'requestor_name', 'ship_project_name', 'supplier', 'job_contract_no', 
-            'op_no', 'order_total', 'quote_ref', 'quote_date'
-        }
-        
-        if field not in allowed_fields:
-            return jsonify({'success': False, 'error': 'Invalid field name'})
-        
-        # Convert value types
-        if field == 'order_total':
-            try:
-                value = float(value) if value else 0.0
-            except ValueError:
-                return jsonify({'success': False, 'error': 'Invalid number format'})
-        
-        db_session = get_session()
-        por = db_session.query(POR).filter(POR.id == por_id).first()
-        
-        if not por:
-            return jsonify({'success': False, 'error': 'POR not found'})
-        
-        # Update the field
-        setattr(por, field, value)
-        db_session.commit()
-        
-        return jsonify({'success': True})
-        
-    except Exception as e:
-        logger.error(f"Error updating POR field: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)})
-    finally:
-        if 'db_session' in locals():
-            db_session.close()
+    data = request.get_json(silent=True) or {}
+    return apply_single_field_change('por', data.get('por_id'), data.get('field'), data.get('value'))
 
 
-@app.route('/update_line_item_field', methods=['POST'])
+@bp.route('/update_line_item_field', methods=['POST'])
 def update_line_item_field():
     """Update a field in a line item record."""
-    try:
-        from flask import jsonify
-        from models import get_session, LineItem
-        
-        data = request.get_json()
-        line_item_id = data.get('line_item_id')
-        field = data.get('field')
-        value = data.get('value')
-        
-        if not all([line_item_id, field, value is not None]):
-            return jsonify({'success': False, 'error': 'Missing required fields'})
-        
-        # Validate field name to prevent SQL injection
-        allowed_fields = {
-            'job_contract_no', 'op_no', 'description', 'quantity', 'price_each', 'line_total'
-        }
-        
-        if field not in allowed_fields:
-            return jsonify({'success': False, 'error': 'Invalid field name'})
-        
-        # Convert value types
-        if field in ['quantity']:
-            try:
-                value = int(value) if value else 0
-            except ValueError:
-                return jsonify({'success': False, 'error': 'Invalid number format'})
-        elif field in ['price_each', 'line_total']:
-            try:
-                value = float(value) if value else 0.0
-            except ValueError:
-                return jsonify({'success': False, 'error': 'Invalid number format'})
-        
-        db_session = get_session()
-        line_item = db_session.query(LineItem).filter(LineItem.id == line_item_id).first()
-        
-        if not line_item:
-            return jsonify({'success': False, 'error': 'Line item not found'})
-        
-        # Update the field
-        setattr(line_item, field, value)
-        db_session.commit()
-        
-        return jsonify({'success': True})
-        
-    except Exception as e:
-        logger.error(f"Error updating line item field: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)})
-    finally:
-        if 'db_session' in locals():
-            db_session.close()
+    data = request.get_json(silent=True) or {}
+    return apply_single_field_change('line_item', data.get('line_item_id'), data.get('field'), data.get('value'))
+
+
+@bp.route('/update_fields', methods=['POST'])
+def update_fields():
+    """
+    Apply a batch of inline edits in one transaction.
+    
+    Expects JSON {"changes": [{"entity": "por" | "line_item", "id": ...,
+    "field": ..., "value": ...}, ...]} and returns one result per change.
+    """
+    from field_edits import apply_field_changes, MAX_BATCH_CHANGES
+    data = request.get_json(silent=True) or {}
+    changes = data.get('changes')
+    if not isinstance(changes, list) or not changes:
+        return jsonify({'success': False, 'error': 'No changes given'}), 400
+    if len(changes) > MAX_BATCH_CHANGES:
+        return jsonify({'success': False, 'error': f'At most {MAX_BATCH_CHANGES} changes per request'}), 400
+    results = apply_field_changes(get_db(), changes)
+    return jsonify({'success': all(r['success'] for r in results), 'results': results})
 
 
-@app.route('/attach_email/<int:por_id>', methods=['POST'])
+@bp.route('/attach_email/<int:por_id>', methods=['POST'])
 def attach_email_to_por(por_id):
     """Attach an email file to a specific POR record."""
+    staged = None
+    placed = None
     try:
-        from flask import jsonify
-        from models import get_session
-        
         # Get the POR record
-        db_session = get_session()
+        db_session = get_db()
         por = db_session.query(POR).filter(POR.id == por_id).first()
         
         if not por:
@@ -751,15 +960,8 @@ def attach_email_to_por(por_id):
         if file_extension not in ['msg', 'eml']:
             return jsonify({'success': False, 'error': 'Only email files (.msg, .eml) are allowed'})
         
-        # Generate safe filename with PO number
         original_filename = file.filename
         file_extension = os.path.splitext(original_filename)[1]
-        safe_filename = f"POR_{por.po_number}_EMAIL_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}{file_extension}"
-        
-        # Save file
-        file_path = os.path.join(UPLOAD_FOLDER, safe_filename)
-        file.save(file_path)
-        file_size = os.path.getsize(file_path)
         
         # Parse email content for description
         file.seek(0)
@@ -770,7 +972,7 @@ def attach_email_to_por(por_id):
             from email import policy
             
             if file_extension == '.eml':
-                msg = email.message_from_file(file, policy=policy.default)
+                msg = email.message_from_binary_file(file, policy=policy.default)
                 subject = msg.get('subject', 'No Subject')
                 from_header = msg.get('from', 'Unknown Sender')
                 email_description = f"Email: {subject} (from {from_header})"
@@ -779,20 +981,25 @@ def attach_email_to_por(por_id):
         except:
             email_description = f"Email: {original_filename}"
         
+        # Store the content once, however many PORs it is attached to
+        staged = stage_blob(file.stream)
+        stored_filename, placed = add_blob_reference(db_session, staged)
+        
         # Create PORFile record
         por_file = PORFile(
             por_id=por_id,
             original_filename=original_filename,
-            stored_filename=safe_filename,
+            stored_filename=stored_filename,
+            content_hash=staged.sha256,
             file_type='email',
-            file_size=file_size,
+            file_size=staged.size,
             mime_type='message/rfc822' if file_extension == '.eml' else 'application/vnd.ms-outlook',
             description=email_description
         )
         
         db_session.add(por_file)
+        bump_data_generation(db_session)
         db_session.commit()
-        db_session.close()
         
         return jsonify({
             'success': True, 
@@ -802,26 +1009,70 @@ def attach_email_to_por(por_id):
         })
         
     except Exception as e:
+        remove_placed(placed)
+        rollback_db()
         logger.error(f"Error attaching email: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
     finally:
-        if 'db_session' in locals():
-            db_session.close()
+        discard_staged(staged)
 
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found_error(error):
     """Handle 404 errors."""
     return render_template('404.html'), 404
 
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
-    session.rollback()
+    rollback_db()
     return render_template('500.html'), 500
 
 
+def create_app(config: Optional[dict] = None) -> Flask:
+    """
+    Application factory.
+    
+    Building the app does not touch the database or start workers; run
+    init_database() (or ``flask --app app init-db``) to create the schema
+    and ensure_upload_workers() to start in-process queue workers.
+    
+    Args:
+        config: Optional config overrides
+        
+    Returns:
+        Configured Flask app
+    """
+    app = Flask(__name__)
+    app.request_class = PORRequest
+    app.config.update(
+        UPLOAD_FOLDER=UPLOAD_FOLDER,
+        MAX_CONTENT_LENGTH=MAX_FILE_SIZE,
+        SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    )
+    if config:
+        app.config.update(config)
+    
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    app.register_blueprint(bp)
+    from api import api
+    app.register_blueprint(api)
+    init_db_app(app)
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create any missing database tables."""
+        init_database()
+    
+    return app
+
+
+app = create_app()
+
+
 if __name__ == '__main__':
+    init_database()
+    ensure_upload_workers()
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,98 @@
+"""
+Benchmark: streaming export time and peak memory.
+
+Seeds PORs with line items into a throwaway SQLite file, then drains the
+CSV and XLSX export generators, reporting rows/sec and the process's
+max RSS at each size (or the peak Python heap with --trace-memory, which
+slows the export several times). Flat memory across sizes means the
+export never holds the whole result. Run from the repository root:
+
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --lines 20000,200000 --formats csv --trace-memory
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LINES_PER_POR = 10
+
+
+def grow_to(lines: int, batch_size: int = 1000) -> None:
+    """Bulk insert PORs (LINES_PER_POR line items each) up to lines line items."""
+    from models import engine, POR, LineItem
+    with engine.begin() as conn:
+        start = conn.execute(POR.__table__.select().with_only_columns(POR.id).order_by(POR.id.desc()).limit(1)).scalar() or 0
+    # Insert in batches so seeding does not set the process's max RSS
+    for first in range(start + 1, lines // LINES_PER_POR + 1, batch_size):
+        pors = [{'id': i, 'po_number': 1000 + i, 'requestor_name': f'User {i % 50}',
+                 'date_order_raised': '01/01/2025', 'filename': f'PO_{i}.xlsx', 'supplier': 'ACME Marine'}
+                for i in range(first, min(first + batch_size, lines // LINES_PER_POR + 1))]
+        with engine.begin() as conn:
+            conn.execute(POR.__table__.insert(), pors)
+            conn.execute(LineItem.__table__.insert(), [
+                {'por_id': por['id'], 'job_contract_no': f"J{por['id']}", 'op_no': f'OP{n}',
+                 'description': f'Line item {n} for PO {por["po_number"]}', 'quantity': n + 1,
+                 'price_each': 9.99, 'line_total': 9.99 * (n + 1)}
+                for por in pors for n in range(LINES_PER_POR)
+            ])
+
+
+def drain(stream) -> int:
+    """Consume an export stream, returning the bytes produced."""
+    size = 0
+    for chunk in stream:
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming export")
+    parser.add_argument('--lines', default='20000,200000', help="comma-separated line item counts")
+    parser.add_argument('--formats', default='csv,xlsx', help="comma-separated export formats")
+    parser.add_argument('--trace-memory', action='store_true', help="report peak Python heap via tracemalloc")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='export_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    try:
+        import logging
+        logging.disable(logging.CRITICAL)
+        from models import init_database, get_session
+        from export import stream_csv, stream_xlsx
+        init_database()
+        streams = {'csv': stream_csv, 'xlsx': stream_xlsx}
+
+        memory_label = 'peak heap MB' if args.trace_memory else 'max RSS MB'
+        print(f"{'lines':>8} {'format':>6} {'seconds':>8} {'rows/s':>9} {'MB out':>7} {memory_label:>13}")
+        for lines in [int(n) for n in args.lines.split(',')]:
+            grow_to(lines)
+            for fmt in args.formats.split(','):
+                session = get_session()
+                if args.trace_memory:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                size = drain(streams[fmt](session))
+                elapsed = time.perf_counter() - started
+                if args.trace_memory:
+                    memory = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KB on Linux
+                session.close()
+                print(f"{lines:>8} {fmt:>6} {elapsed:>8.2f} {lines / elapsed:>9,.0f} "
+                      f"{size / 1e6:>7.1f} {memory / 1e6:>13.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: deep-page latency of OFFSET vs keyset (cursor) pagination.
+
+Seeds PORs into a throwaway SQLite file, then times get_paginated_records
+for the first page, a middle page and the last page, once by page number
+and once by cursor, as the table grows. Run from the repository root:
+
+    python benchmarks/bench_pagination.py
+    python benchmarks/bench_pagination.py --sizes 10000,50000,200000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REPEAT = 5
+
+
+def best_of(func, repeat: int = REPEAT) -> float:
+    """Best wall time of repeat runs, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def grow_to(size: int) -> None:
+    """Bulk insert PORs until the table holds size rows."""
+    from models import engine, POR
+    with engine.begin() as conn:
+        existing = conn.execute(POR.__table__.select().with_only_columns(POR.id)).fetchall()
+        start = len(existing)
+        rows = [{'po_number': 1000 + i, 'requestor_name': f'User {i % 50}', 'date_order_raised': '01/01/2025',
+                 'filename': f'PO_{i}.xlsx', 'description': f'Item {i}'} for i in range(start, size)]
+        if rows:
+            conn.execute(POR.__table__.insert(), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OFFSET vs cursor pagination")
+    parser.add_argument('--sizes', default='1000,10000,50000', help="comma-separated table sizes")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='pagination_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    os.chdir(work_dir)
+    try:
+        import logging
+        logging.disable(logging.CRITICAL)
+        from models import init_database, get_session, POR
+        from app import app, get_paginated_records, RECORDS_PER_PAGE
+        from utils import encode_cursor
+        init_database()
+
+        print(f"{'rows':>8} {'page':>6} {'offset ms':>10} {'cursor ms':>10}")
+        for size in [int(s) for s in args.sizes.split(',')]:
+            grow_to(size)
+            session = get_session()
+            ids = [row.id for row in session.query(POR.id).order_by(POR.id.desc())]
+            session.close()
+            last_page = (size + RECORDS_PER_PAGE - 1) // RECORDS_PER_PAGE
+            for page in (1, last_page // 2, last_page):
+                # The cursor for a page points just past the last id of the page before it
+                cursor = encode_cursor('next', ids[(page - 1) * RECORDS_PER_PAGE - 1] if page > 1 else ids[0] + 1)
+                with app.test_request_context('/view'):
+                    by_offset = best_of(lambda: get_paginated_records(page))
+                    by_cursor = best_of(lambda: get_paginated_records(page, cursor=cursor))
+                print(f"{size:>8} {page:>6} {by_offset:>10.2f} {by_cursor:>10.2f}")
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
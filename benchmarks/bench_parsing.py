@@ -0,0 +1,230 @@
+"""
+Benchmark: workbook parsing and the upload / view routes.
+
+Generates synthetic POR workbooks (see workbooks.py) and times each
+parsing stage on them: read_ws (bounded by the parsing map, and unbounded
+for comparison), find_vertical, get_order_total, extract_line_items and
+the full process_excel_file. Then times GET / and POST / (spool and
+enqueue; in-process upload workers are disabled) and GET /view, cached,
+uncached and searching, through Flask's test client against a throwaway
+SQLite file.
+
+Cases start from a baseline workbook and vary one knob at a time
+(line count, trailing junk rows, extra sheets). Results are written as
+JSON so runs can be compared across commits. Run from the repository root:
+
+    python benchmarks/bench_parsing.py --output before.json
+    python benchmarks/bench_parsing.py --output after.json --compare before.json
+    python benchmarks/bench_parsing.py --lines 21,200 --junk 0 --sheets 0 --repeat 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE = {'lines': 21, 'junk_rows': 0, 'extra_sheets': 0}
+
+
+def measure(func, repeat: int) -> dict:
+    """Run func repeat times (after one warm-up) and summarize the wall times in milliseconds."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'runs': repeat,
+            'best_ms': round(min(timings), 4),
+            'median_ms': round(statistics.median(timings), 4),
+            'mean_ms': round(statistics.fmean(timings), 4)}
+
+
+def cases(lines, junk, sheets) -> list:
+    """The baseline workbook plus one-knob variations of it, without repeats."""
+    variations = ([dict(BASELINE, lines=n) for n in lines] +
+                  [dict(BASELINE, junk_rows=n) for n in junk] +
+                  [dict(BASELINE, extra_sheets=n) for n in sheets])
+    unique = [BASELINE]
+    for case in variations:
+        if case not in unique:
+            unique.append(case)
+    return unique
+
+
+def bench_parsing(case: dict, repeat: int) -> list:
+    """Time each parsing stage on one generated workbook."""
+    from werkzeug.datastructures import FileStorage
+    from app import process_excel_file
+    from parsing_map import POR_PLAN
+    from utils import read_ws, find_vertical, get_order_total, extract_line_items
+    from workbooks import make_por_workbook
+
+    content = make_por_workbook(**case)
+    template = POR_PLAN.default
+    sheet = read_ws(io.BytesIO(content), POR_PLAN)
+    start_row, end_row = template.line_item_rows
+
+    stages = {
+        'read_ws': lambda: read_ws(io.BytesIO(content), POR_PLAN),
+        'read_ws_unbounded': lambda: read_ws(io.BytesIO(content)),
+        'find_vertical': lambda: find_vertical(sheet, template.keywords['requestor_name']),
+        'get_order_total': lambda: get_order_total(sheet, template.keywords['order_total']),
+        'extract_line_items': lambda: extract_line_items(sheet, template.header_row, start_row=start_row,
+                                                         end_row=end_row,
+                                                         default_columns=template.line_item_columns),
+        'process_excel_file': lambda: process_excel_file(FileStorage(io.BytesIO(content), filename='bench.xlsx')),
+    }
+    results = []
+    for name, func in stages.items():
+        results.append(dict(measure(func, repeat), name=name, case=case, workbook_bytes=len(content)))
+    return results
+
+
+def seed(pors: int) -> None:
+    """Bulk insert PORs with a few line items each and index them for search."""
+    from models import engine, get_session, POR, LineItem
+    from search import rebuild_search_index
+    rows = [{'id': i, 'po_number': 1000 + i, 'requestor_name': f'User {i % 50}', 'date_order_raised': '01/01/2025',
+             'filename': f'PO_{i}.xlsx', 'supplier': ['Acme Marine', 'Solent Fasteners'][i % 2],
+             'description': f'Item {i}'} for i in range(1, pors + 1)]
+    with engine.begin() as conn:
+        conn.execute(POR.__table__.insert(), rows)
+        conn.execute(LineItem.__table__.insert(), [
+            {'por_id': row['id'], 'description': f'Line {n} of PO {row["po_number"]}', 'quantity': n + 1,
+             'price_each': 9.99, 'line_total': 9.99 * (n + 1)}
+            for row in rows for n in range(3)
+        ])
+    session = get_session()
+    try:
+        rebuild_search_index(session)
+        session.commit()
+    finally:
+        session.close()
+
+
+def bench_routes(pors: int, repeat: int) -> list:
+    """Time the upload and view routes through the test client."""
+    from app import app
+    from view_cache import view_cache
+    from workbooks import make_por_workbook
+
+    seed(pors)
+    client = app.test_client()
+    workbook = make_por_workbook(**BASELINE)
+    uploads = iter(range(10 ** 9))
+
+    def upload():
+        # A different file each time, so the duplicate check never short-circuits
+        # (trailing bytes are fine: POST / only spools and queues the file)
+        content = workbook + str(next(uploads)).encode()
+        response = client.post('/', data={'file': (io.BytesIO(content), 'bench.xlsx')},
+                               content_type='multipart/form-data')
+        assert response.status_code in (200, 302), response.status_code
+
+    def uncached(path):
+        def get():
+            view_cache.clear()
+            client.get(path)
+        return get
+
+    routes = {
+        'GET /': lambda: client.get('/'),
+        'POST /': upload,
+        'GET /view (cached)': lambda: client.get('/view'),
+        'GET /view (uncached)': uncached('/view'),
+        'GET /view?q= (uncached)': uncached('/view?q=Acme&page=3'),
+    }
+    return [dict(measure(func, repeat), name=name, case={'pors': pors}) for name, func in routes.items()]
+
+
+def git_commit() -> str:
+    """Current commit of the working tree, if it is a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """Print the median time of each result relative to a previous run's JSON."""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], json.dumps(r['case'], sort_keys=True)): r for r in json.load(f)['results']}
+    print(f"{'benchmark':<24} {'case':<50} {'before ms':>10} {'after ms':>10} {'ratio':>7}", file=sys.stderr)
+    for result in results:
+        case = json.dumps(result['case'], sort_keys=True)
+        before = baseline.get((result['name'], case))
+        if not before:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 0.0
+        print(f"{result['name']:<24} {case:<50} {before['median_ms']:>10.3f} {result['median_ms']:>10.3f} "
+              f"{ratio:>6.2f}x", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workbook parsing and the upload/view routes")
+    parser.add_argument('--lines', default='5,60,200', help="comma-separated line counts to vary")
+    parser.add_argument('--junk', default='1000,10000', help="comma-separated trailing junk row counts")
+    parser.add_argument('--sheets', default='3', help="comma-separated extra sheet counts")
+    parser.add_argument('--pors', type=int, default=5000, help="PORs seeded for the /view timings")
+    parser.add_argument('--repeat', type=int, default=10, help="timed runs per benchmark")
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--compare', help="JSON from an earlier run to print ratios against")
+    args = parser.parse_args()
+
+    def numbers(value):
+        return [int(n) for n in value.split(',') if n.strip()]
+
+    work_dir = tempfile.mkdtemp(prefix='parsing_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    os.environ['UPLOAD_WORKERS'] = '0'
+    os.chdir(work_dir)
+    try:
+        import logging
+        logging.disable(logging.CRITICAL)
+        # Keep stdout for the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            from models import init_database
+            init_database()
+
+            results = []
+            for case in cases(numbers(args.lines), numbers(args.junk), numbers(args.sheets)):
+                results.extend(bench_parsing(case, args.repeat))
+            results.extend(bench_routes(args.pors, args.repeat))
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'benchmark': 'parsing',
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Contention benchmark: concurrent PO number allocation.
+
+Starts N allocator processes against one database, each allocating PO
+numbers in its own transactions (one number, or a block of numbers, per
+transaction), then checks that every number was handed out exactly once
+and that the sequence has no gaps. Run from the repository root:
+
+    python benchmarks/bench_po_allocation.py --allocators 8 --allocations 200
+    python benchmarks/bench_po_allocation.py --block 10
+
+Uses a throwaway SQLite file unless --database-url is given.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _allocate(database_url: str, allocations: int, block: int, start_event) -> List[int]:
+    """Allocator process body: allocate in its own transactions, return the numbers."""
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, ROOT)
+    from models import get_session
+    from po_counter import allocate_po_block
+
+    start_event.wait()
+    numbers = []
+    while len(numbers) < allocations:
+        session = get_session()
+        try:
+            numbers.extend(allocate_po_block(session, min(block, allocations - len(numbers))))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return numbers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent PO allocation")
+    parser.add_argument('--allocators', type=int, default=8, help="concurrent allocator processes")
+    parser.add_argument('--allocations', type=int, default=200, help="PO numbers per allocator")
+    parser.add_argument('--block', type=int, default=1, help="PO numbers allocated per transaction")
+    parser.add_argument('--database-url', help="database to run against (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        tmp_dir = tempfile.mkdtemp(prefix='po_bench_')
+        database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+
+    from models import Base, engine, get_session, get_or_create_batch_counter
+    Base.metadata.create_all(engine)
+    session = get_session()
+    first = get_or_create_batch_counter(session).value + 1
+    session.close()
+
+    context = multiprocessing.get_context('spawn')
+    start_event = context.Manager().Event()
+    with context.Pool(args.allocators) as pool:
+        pending = [pool.apply_async(_allocate, (database_url, args.allocations, args.block, start_event))
+                   for _ in range(args.allocators)]
+        time.sleep(1)  # let every process import and connect before the clock starts
+        started = time.perf_counter()
+        start_event.set()
+        results = [p.get() for p in pending]
+        elapsed = time.perf_counter() - started
+
+    numbers = [n for result in results for n in result]
+    duplicates = [n for n, seen in Counter(numbers).items() if seen > 1]
+    expected = set(range(first, first + len(numbers)))
+    gaps = sorted(expected - set(numbers))
+
+    print(f"Database:     {database_url}")
+    print(f"Allocators:   {args.allocators} x {args.allocations} (block {args.block})")
+    print(f"Allocated:    {len(numbers)} in {elapsed:.3f}s ({len(numbers) / elapsed:,.0f}/s)")
+    print(f"Range:        {min(numbers)}..{max(numbers)}")
+    print(f"Duplicates:   {len(duplicates)}")
+    print(f"Gaps:         {len(gaps)}")
+
+    if tmp_dir:
+        engine.dispose()
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+    if duplicates or gaps:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Concurrency benchmark: request throughput per connection-pool strategy.
+
+For each DB_POOL_STRATEGY a fresh interpreter seeds a database, then many
+threads hit /view (paged and searched) and / through Flask test clients
+for a fixed duration. Throughput, latency and errors are reported per
+strategy. Run from the repository root:
+
+    python benchmarks/bench_pool.py
+    python benchmarks/bench_pool.py --threads 32 --seconds 10 --strategies queue,null
+    python benchmarks/bench_pool.py --database-url postgresql://...   # existing database
+
+Uses a throwaway SQLite file per strategy unless --database-url is given.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STRATEGIES = ['static', 'thread', 'null', 'queue']
+SEED_RECORDS = 200
+PATHS = ['/view', '/view?page=3', '/view?q=smith', '/']
+
+
+def seed(records: int) -> None:
+    """Create the schema and insert records PORs with line items, if empty."""
+    from models import init_database, get_session, POR, LineItem
+    from search import rebuild_search_index
+    init_database()
+    session = get_session()
+    try:
+        if session.query(POR).count():
+            return
+        for i in range(records):
+            por = POR(po_number=100000 + i, requestor_name='Smith' if i % 5 == 0 else 'Jones',
+                      date_order_raised='01/01/2025', filename=f'bench_{i}.xlsx',
+                      description=f'Bench item {i}', order_total=100.0 + i)
+            por.line_items = [LineItem(description=f'Bench line {n}', quantity=1, price_each=10.0, line_total=10.0)
+                              for n in range(5)]
+            session.add(por)
+        session.commit()
+        rebuild_search_index(session)
+    finally:
+        session.close()
+
+
+def run_child(threads: int, seconds: float) -> dict:
+    """Drive the app from many threads; runs inside a per-strategy interpreter."""
+    import logging
+    logging.disable(logging.CRITICAL)
+    seed(SEED_RECORDS)
+    from app import app
+    from models import engine
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start_event = threading.Event()
+    deadline = []
+
+    def client_loop(index: int) -> None:
+        client = app.test_client()
+        mine, failed = [], 0
+        start_event.wait()
+        n = index
+        while time.perf_counter() < deadline[0]:
+            path = PATHS[n % len(PATHS)]
+            n += 1
+            started = time.perf_counter()
+            try:
+                response = client.get(path)
+                # /view swallows DB errors into an empty page, so check the body too
+                if response.status_code != 200 or (path.startswith('/view') and b'Bench line' not in response.data):
+                    failed += 1
+                    continue
+            except Exception:
+                failed += 1
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    workers = [threading.Thread(target=client_loop, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    deadline.append(time.perf_counter() + seconds)
+    start_event.set()
+    for worker in workers:
+        worker.join()
+
+    latencies.sort()
+    ok = len(latencies)
+    return {
+        'pool': type(engine.pool).__name__,
+        'requests': ok,
+        'errors': sum(errors),
+        'rps': ok / seconds,
+        'p50_ms': statistics.median(latencies) * 1000 if ok else None,
+        'p95_ms': latencies[int(ok * 0.95) - 1] * 1000 if ok else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark throughput per pool strategy")
+    parser.add_argument('--threads', type=int, default=16, help="concurrent client threads")
+    parser.add_argument('--seconds', type=float, default=5.0, help="duration per strategy")
+    parser.add_argument('--strategies', default=','.join(STRATEGIES), help="comma-separated DB_POOL_STRATEGY values")
+    parser.add_argument('--database-url', help="database to run against (default: temporary SQLite file)")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.threads, args.seconds)))
+        return
+
+    print(f"{args.threads} threads x {args.seconds:.0f}s, paths: {', '.join(PATHS)}")
+    print(f"{'strategy':<10} {'pool':<20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for strategy in args.strategies.split(','):
+        work_dir = tempfile.mkdtemp(prefix='pool_bench_')
+        database_url = args.database_url or f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+        env = dict(os.environ, DB_POOL_STRATEGY=strategy, DATABASE_URL=database_url,
+                   UPLOAD_WORKERS='0', PYTHONPATH=ROOT)
+        if strategy == 'thread':
+            # SingletonThreadPool closes other threads' connections once it has
+            # more threads than slots, which crashes pysqlite; give every thread one
+            env.update(DB_POOL_SIZE=str(args.threads + 1), DB_MAX_OVERFLOW='0')  # + seeding thread
+        try:
+            # Run from the scratch dir so po_counter.txt and uploads stay out of the repo
+            shutil.copytree(os.path.join(ROOT, 'templates'), os.path.join(work_dir, 'templates'))
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child',
+                                     '--threads', str(args.threads), '--seconds', str(args.seconds)],
+                                    cwd=work_dir, env=env, capture_output=True, text=True)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        if result.returncode != 0:
+            print(f"{strategy:<10} failed: {(result.stderr.strip().splitlines() or ['exit code %d' % result.returncode])[-1]}")
+            continue
+        r = json.loads(result.stdout.strip().splitlines()[-1])
+        p50 = f"{r['p50_ms']:.1f}" if r['p50_ms'] is not None else '-'
+        p95 = f"{r['p95_ms']:.1f}" if r['p95_ms'] is not None else '-'
+        print(f"{strategy:<10} {r['pool']:<20} {r['rps']:>8.1f} {p50:>8} {p95:>8} {r['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Startup-time benchmark.
+
+Times a cold ``import app`` (which builds the Flask app via create_app)
+and the CLI-facing modules in fresh interpreters, and checks that
+importing them has no side effects: no database file is created and
+openpyxl is not loaded. Run from the repository root:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --max-ms 600   # fail on regressions
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['app', 'models', 'po_counter', 'utils', 'parsing_map']
+HEAVY_MODULES = ['openpyxl']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(module: str, cwd: str, env: dict) -> dict:
+    """Import module in a fresh interpreter and report its import time."""
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold import time")
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument('--max-ms', type=float, help="fail if the median 'import app' exceeds this")
+    args = parser.parse_args()
+
+    # Work in a scratch directory so any file the imports create is noticed
+    work_dir = tempfile.mkdtemp(prefix='startup_bench_')
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1',
+               DATABASE_URL=f"sqlite:///{os.path.join(work_dir, 'por.db')}")
+    failures = []
+    medians = {}
+    try:
+        print(f"{'module':<14} {'median ms':>10} {'min ms':>8} {'heavy modules loaded'}")
+        for module in MODULES:
+            runs = [time_import(module, work_dir, env) for _ in range(args.repeat)]
+            timings = [run['seconds'] * 1000 for run in runs]
+            loaded = runs[0]['loaded']
+            medians[module] = statistics.median(timings)
+            print(f"{module:<14} {medians[module]:>10.1f} {min(timings):>8.1f} {', '.join(loaded) or '-'}")
+            if loaded:
+                failures.append(f"importing {module} loaded {', '.join(loaded)}")
+
+        # create_app makes the upload folder; any file (e.g. por.db) is a side effect
+        created = sorted(name for name in os.listdir(work_dir)
+                         if os.path.isfile(os.path.join(work_dir, name)))
+        if created:
+            failures.append(f"imports created files: {', '.join(created)}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.max_ms is not None and medians['app'] > args.max_ms:
+        failures.append(f"import app took {medians['app']:.1f}ms (limit {args.max_ms:.1f}ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,441 @@
+"""
+Load test: concurrent clerks against one instance.
+
+Drives a running instance with a mix of workbook uploads (POST /), /view
+pages, /view searches, batched inline edits (/update_fields) and
+attachment downloads, each at its own rate (requests per second,
+Poisson arrivals). Requests are scheduled open-loop: latency is measured
+from when a request was due, not when a free client thread got to it, so
+an overloaded server shows up as growing latency instead of a politely
+lowered request rate.
+
+Without --url the driver starts the app itself (python app.py in a
+scratch directory) on a throwaway SQLite file, or on --database-url,
+seeds it through /bulk-upload and /attach-files, and stops it afterwards.
+Once the run ends and the queued uploads have finished, the database is
+checked for invariants: unique PO numbers, no orphaned line items or
+attachments, attachment reference counts, the PO counter ahead of every
+PO, and no file processed twice. The exit status is 1 if any fails.
+Run from the repository root:
+
+    python benchmarks/load_driver.py --duration 30
+    python benchmarks/load_driver.py --uploads 2 --views 10 --searches 5 --edits 5 --downloads 3 --concurrency 32
+    python benchmarks/load_driver.py --database-url postgresql://localhost/por_load --upload-workers 4
+    python benchmarks/load_driver.py --url http://127.0.0.1:5000 --database-url sqlite:////srv/por/por.db --seed 0
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workbooks import make_por_workbook, PARTS, REQUESTORS, SUPPLIERS  # noqa: E402
+
+ROUTES = ('upload', 'view', 'search', 'edit', 'download')
+SEED_BATCH = 25  # workbooks per /bulk-upload request while seeding
+JOB_TIMEOUT = 300  # seconds to wait for queued uploads after the run
+
+
+class Client:
+    """Minimal HTTP client with one keep-alive connection per thread; never follows redirects."""
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+
+    def get_json(self, path: str) -> dict:
+        status, _, body = self.request('GET', path)
+        if status != 200:
+            raise RuntimeError(f"GET {path} returned {status}")
+        return json.loads(body)
+
+    def post_json(self, path: str, payload: dict) -> Tuple[int, dict]:
+        status, _, body = self.request('POST', path, json.dumps(payload).encode(),
+                                       {'Content-Type': 'application/json'})
+        return status, json.loads(body) if body else {}
+
+    def post_files(self, path: str, files: List[Tuple[str, str, bytes]],
+                   fields: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """POST multipart/form-data; files are (field name, filename, content)."""
+        boundary = uuid.uuid4().hex
+        chunks = []
+        for name, value in (fields or {}).items():
+            chunks.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        for name, filename, content in files:
+            chunks.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                          f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n')
+        chunks.append(f'--{boundary}--\r\n'.encode())
+        return self.request('POST', path, b''.join(chunks),
+                            {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+
+def start_server(database_url: str, port: int, upload_workers: int, work_dir: str) -> subprocess.Popen:
+    """Run python app.py in work_dir (so uploads land there) and wait until it answers."""
+    env = dict(os.environ, DATABASE_URL=database_url, PORT=str(port), UPLOAD_WORKERS=str(upload_workers),
+               LOG_LEVEL='WARNING')
+    log = open(os.path.join(work_dir, 'server.log'), 'wb')
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'app.py')], cwd=work_dir, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    client = Client(f'http://127.0.0.1:{port}', timeout=5)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited; see {log.name}")
+        try:
+            if client.request('GET', '/test')[0] == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 60s")
+
+
+def seed(client: Client, pors: int, attachments: int, rng: random.Random) -> None:
+    """Create PORs through /bulk-upload and attach a file to some of them."""
+    for start in range(0, pors, SEED_BATCH):
+        files = [('files', f'seed_{n}.xlsx', make_por_workbook(lines=rng.randint(1, 21), seed=-1 - n))
+                 for n in range(start, min(start + SEED_BATCH, pors))]
+        status = client.post_files('/bulk-upload', files)[0]
+        if status != 200:
+            raise RuntimeError(f"Seeding failed: /bulk-upload returned {status}")
+    ids = [por['id'] for por in client.get_json('/api/v1/pors?limit=200')['pors']]
+    for n, por_id in enumerate(ids[:attachments]):
+        content = f"Quote {n} for POR {por_id}\n".encode() * rng.randint(50, 5000)
+        client.post_files(f'/attach-files/{por_id}', [('files', f'quote_{n}.pdf', content)],
+                          {'file_types': 'quote', 'descriptions': 'load test'})
+
+
+def discover(client: Client) -> Dict[str, list]:
+    """Collect POR, line item and attachment ids to aim edits and downloads at."""
+    pors = client.get_json('/api/v1/pors?limit=200')['pors']
+    targets = {'por_ids': [por['id'] for por in pors], 'line_item_ids': [], 'file_ids': []}
+    for por in pors[:100]:
+        detail = client.get_json(f"/api/v1/pors/{por['id']}")['por']
+        targets['line_item_ids'].extend(item['id'] for item in detail['line_items'])
+        targets['file_ids'].extend(attachment['id'] for attachment in detail['attachments'])
+    return targets
+
+
+class LoadRun:
+    """One timed run: a scheduler feeding due requests to a pool of client threads."""
+
+    def __init__(self, client: Client, rates: Dict[str, float], duration: float, concurrency: int,
+                 targets: Dict[str, list], pages: int, seed_value: int):
+        self.client = client
+        self.rates = rates
+        self.duration = duration
+        self.concurrency = concurrency
+        self.targets = targets
+        self.pages = max(1, pages)
+        self.rng = random.Random(seed_value)
+        self.seed_value = seed_value
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+        self.job_ids: List[int] = []
+        self.uploads = 0
+
+    def schedule(self) -> List[Tuple[float, str]]:
+        """Poisson arrival times (seconds from start) for every route, merged in time order."""
+        arrivals = []
+        for route, rate in self.rates.items():
+            if rate <= 0:
+                continue
+            at = self.rng.expovariate(rate)
+            while at < self.duration:
+                arrivals.append((at, route))
+                at += self.rng.expovariate(rate)
+        return sorted(arrivals)
+
+    # Operations; each returns an error message, or None on success
+
+    def do_upload(self, rng: random.Random) -> Optional[str]:
+        with self.lock:
+            self.uploads += 1
+            number = self.uploads
+        content = make_por_workbook(lines=rng.randint(1, 21), seed=self.seed_value * 1000003 + number)
+        status, headers, _ = self.client.post_files('/', [('file', f'load_{number}.xlsx', content)])
+        location = headers.get('Location', '')
+        if status != 302 or 'job=' not in location:
+            return f"POST / returned {status}"
+        with self.lock:
+            self.job_ids.append(int(location.rsplit('job=', 1)[1]))
+        return None
+
+    def do_view(self, rng: random.Random) -> Optional[str]:
+        status = self.client.request('GET', f'/view?page={rng.randint(1, self.pages)}')[0]
+        return None if status == 200 else f"GET /view returned {status}"
+
+    def do_search(self, rng: random.Random) -> Optional[str]:
+        term = rng.choice([rng.choice(SUPPLIERS).split()[0], rng.choice(REQUESTORS).split()[-1],
+                           rng.choice(PARTS).split()[0]])
+        status = self.client.request('GET', f'/view?q={quote(term)}')[0]
+        return None if status == 200 else f"GET /view?q= returned {status}"
+
+    def do_edit(self, rng: random.Random) -> Optional[str]:
+        changes = []
+        if self.targets['por_ids']:
+            changes.append({'entity': 'por', 'id': rng.choice(self.targets['por_ids']),
+                            'field': 'supplier', 'value': rng.choice(SUPPLIERS)})
+        for item_id in rng.sample(self.targets['line_item_ids'], min(3, len(self.targets['line_item_ids']))):
+            changes.append({'entity': 'line_item', 'id': item_id, 'field': 'quantity',
+                            'value': str(rng.randint(1, 50))})
+        if not changes:
+            return "nothing to edit"
+        status, result = self.client.post_json('/update_fields', {'changes': changes})
+        if status != 200 or not all(r.get('success') for r in result.get('results', [])):
+            return f"/update_fields returned {status}: {result.get('error') or result.get('results')}"
+        return None
+
+    def do_download(self, rng: random.Random) -> Optional[str]:
+        if not self.targets['file_ids']:
+            return "no attachments to download"
+        status = self.client.request('GET', f"/download-file/{rng.choice(self.targets['file_ids'])}")[0]
+        return None if status == 200 else f"GET /download-file returned {status}"
+
+    def run(self) -> float:
+        """Run the schedule; returns the wall time taken, in seconds."""
+        arrivals = self.schedule()
+        due: "queue.Queue[Optional[Tuple[float, str]]]" = queue.Queue()
+
+        def worker(number: int):
+            rng = random.Random(self.seed_value * 7919 + number)
+            while True:
+                item = due.get()
+                if item is None:
+                    return
+                scheduled, route = item
+                try:
+                    error = getattr(self, f'do_{route}')(rng)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                latency = (time.perf_counter() - scheduled) * 1000
+                with self.lock:
+                    if error:
+                        self.errors[route] += 1
+                        self.error_samples.setdefault(route, error)
+                    else:
+                        self.latencies[route].append(latency)
+
+        threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        for at, route in arrivals:
+            delay = started + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            due.put((started + at, route))
+        for _ in threads:
+            due.put(None)
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (which must be sorted)."""
+    if not values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(values) + 0.5)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(run: LoadRun, elapsed: float) -> Dict[str, dict]:
+    """Throughput and latency percentiles per route."""
+    summary = {}
+    for route in ROUTES:
+        latencies = sorted(run.latencies.get(route, []))
+        errors = run.errors.get(route, 0)
+        if not latencies and not errors:
+            continue
+        summary[route] = {
+            'requests': len(latencies) + errors,
+            'errors': errors,
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+        }
+        if route in run.error_samples:
+            summary[route]['error_sample'] = run.error_samples[route]
+    return summary
+
+
+def wait_for_jobs(client: Client, job_ids: List[int]) -> Dict[str, int]:
+    """Poll the queued uploads until they finish (or JOB_TIMEOUT passes); counts by status."""
+    pending = set(job_ids)
+    statuses: Dict[int, str] = {}
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            job = client.get_json(f'/upload-status/{job_id}')['job']
+            statuses[job_id] = job['status']
+            if job['status'] in ('done', 'failed'):
+                pending.discard(job_id)
+        if pending:
+            time.sleep(0.5)
+    counts: Dict[str, int] = defaultdict(int)
+    for status in statuses.values():
+        counts[status] += 1
+    return dict(counts)
+
+
+def check_invariants(database_url: str, first_new_po: int) -> List[str]:
+    """Check the database after the run; returns a description of each violation."""
+    from sqlalchemy import create_engine, text
+
+    checks = [
+        ("duplicate PO numbers",
+         "SELECT po_number FROM por GROUP BY po_number HAVING COUNT(*) > 1"),
+        ("line items without a POR",
+         "SELECT li.id FROM line_items li LEFT JOIN por p ON p.id = li.por_id WHERE p.id IS NULL"),
+        ("attachments without a POR",
+         "SELECT f.id FROM por_files f LEFT JOIN por p ON p.id = f.por_id WHERE p.id IS NULL"),
+        ("attachment blobs whose ref_count differs from their references",
+         "SELECT b.sha256 FROM attachment_blobs b LEFT JOIN "
+         "(SELECT content_hash, COUNT(*) AS refs FROM por_files WHERE content_hash IS NOT NULL "
+         "GROUP BY content_hash) f ON f.content_hash = b.sha256 WHERE COALESCE(f.refs, 0) <> b.ref_count"),
+        ("PO numbers above the PO counter",
+         "SELECT po_number FROM por WHERE po_number > (SELECT value FROM batch_counter ORDER BY id LIMIT 1)"),
+        ("files processed into more than one PO during the run",
+         f"SELECT source_hash FROM por WHERE source_hash IS NOT NULL AND po_number >= {int(first_new_po)} "
+         f"GROUP BY source_hash HAVING COUNT(*) > 1"),
+    ]
+    engine = create_engine(database_url)
+    violations = []
+    try:
+        with engine.connect() as conn:
+            for label, sql in checks:
+                rows = conn.execute(text(sql)).fetchall()
+                if rows:
+                    sample = ', '.join(str(row[0]) for row in rows[:5])
+                    violations.append(f"{len(rows)} {label} (e.g. {sample})")
+    finally:
+        engine.dispose()
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test uploads, views, searches, edits and downloads")
+    parser.add_argument('--url', help="instance to test; without it the app is started on a scratch database")
+    parser.add_argument('--database-url', help="database of the instance (needed for the invariant checks with --url)")
+    parser.add_argument('--port', type=int, default=5077, help="port for the app started by the driver")
+    parser.add_argument('--upload-workers', type=int, default=2, help="UPLOAD_WORKERS for the app started by the driver")
+    parser.add_argument('--duration', type=float, default=20, help="seconds of load")
+    parser.add_argument('--concurrency', type=int, default=16, help="client threads")
+    parser.add_argument('--uploads', type=float, default=1, help="workbook uploads per second")
+    parser.add_argument('--views', type=float, default=5, help="/view page loads per second")
+    parser.add_argument('--searches', type=float, default=3, help="/view searches per second")
+    parser.add_argument('--edits', type=float, default=3, help="batched inline edits per second")
+    parser.add_argument('--downloads', type=float, default=2, help="attachment downloads per second")
+    parser.add_argument('--seed', type=int, default=200, help="PORs created before the run")
+    parser.add_argument('--seed-attachments', type=int, default=20, help="seeded PORs given an attachment")
+    parser.add_argument('--random-seed', type=int, default=1, help="seed for arrivals and request contents")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rates = {'upload': args.uploads, 'view': args.views, 'search': args.searches,
+             'edit': args.edits, 'download': args.downloads}
+    work_dir = tempfile.mkdtemp(prefix='load_test_')
+    database_url = args.database_url
+    server = None
+    try:
+        if args.url:
+            base_url = args.url
+        else:
+            database_url = database_url or f"sqlite:///{os.path.join(work_dir, 'load.db')}"
+            server = start_server(database_url, args.port, args.upload_workers, work_dir)
+            base_url = f'http://127.0.0.1:{args.port}'
+        client = Client(base_url)
+
+        rng = random.Random(args.random_seed)
+        if args.seed:
+            print(f"Seeding {args.seed} PORs...", file=sys.stderr)
+            seed(client, args.seed, args.seed_attachments, rng)
+        targets = discover(client)
+        first_new_po = client.get_json('/api/v1/po-numbers/next')['next_po_number']
+        pages = max(1, len(targets['por_ids']) // 10)
+
+        print(f"Running for {args.duration:g}s at {rates} with {args.concurrency} client threads...",
+              file=sys.stderr)
+        run = LoadRun(client, rates, args.duration, args.concurrency, targets, pages, args.random_seed)
+        elapsed = run.run()
+        jobs = wait_for_jobs(client, run.job_ids)
+        violations = (check_invariants(database_url, first_new_po) if database_url
+                      else ["not checked: pass --database-url with --url"])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'benchmark': 'load',
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'url': base_url,
+        'database': database_url.split('@')[-1] if database_url else None,
+        'duration_seconds': round(elapsed, 2),
+        'concurrency': args.concurrency,
+        'rates': rates,
+        'routes': summarize(run, elapsed),
+        'upload_jobs': jobs,
+        'invariant_violations': violations,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    print(f"\n{'route':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}",
+          file=sys.stderr)
+    for route, stats in report['routes'].items():
+        print(f"{route:<10} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps']:>8.2f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}", file=sys.stderr)
+    print(f"Upload jobs: {jobs}", file=sys.stderr)
+    for violation in violations:
+        print(f"❌ {violation}", file=sys.stderr)
+    if not violations:
+        print("✅ Invariants hold", file=sys.stderr)
+    sys.exit(1 if any(not v.startswith('not checked') for v in violations) else 0)
+
+
+if __name__ == '__main__':
+    main()
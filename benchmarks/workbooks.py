@@ -0,0 +1,115 @@
+"""
+Synthetic POR workbooks for benchmarks.
+
+Builds workbooks in the "AP POR v1" layout from parsing_map.POR_TEMPLATES:
+header fields in row 2, the line item header in row 4, line items from
+row 6, then the ORDER TOTAL / requestor / supplier contact footer. Real
+workbooks vary in three ways that matter for parsing cost, and each is a
+knob here:
+
+- lines: line items; beyond the template's 21 rows the footer moves down,
+  as it does when users insert rows
+- junk_rows: formatted but empty-looking rows after the footer (spaces,
+  borders), which an unbounded read has to stream through
+- extra_sheets: further sheets (price lists, notes) after the POR sheet
+
+    from workbooks import make_por_workbook   # from a script in benchmarks/
+    content = make_por_workbook(lines=40, junk_rows=5000, extra_sheets=2)
+"""
+
+import io
+import random
+from datetime import date, timedelta
+from typing import Optional
+
+REQUESTORS = ['Jane Doe', 'John Smith', 'Priya Patel', 'Tom Evans', 'Ana Silva']
+PROJECTS = ['HMS Example', 'RFA Tidespring', 'Dock Refit 7', 'Workshop Stores', 'Project Neptune']
+SUPPLIERS = ['Acme Marine Ltd', 'Solent Fasteners', 'Harbour Electrical', 'North Sea Hydraulics']
+PARTS = ['Hex bolt M12', 'Gasket 4in', 'Cable gland', 'Hydraulic hose', 'Valve seat', 'Bearing 6204',
+         'Paint (grey) 5L', 'Anode', 'Pressure gauge', 'Filter element']
+
+# Rows of the v1 template (see parsing_map.POR_TEMPLATES)
+HEADER_ROW = 4
+FIRST_LINE_ROW = 6
+TEMPLATE_LINES = 21
+
+
+def make_por_workbook(lines: int = 10, junk_rows: int = 0, extra_sheets: int = 0,
+                      seed: int = 0, path: Optional[str] = None) -> bytes:
+    """
+    Build a POR workbook.
+
+    Args:
+        lines: Number of line items
+        junk_rows: Formatted filler rows after the footer
+        extra_sheets: Sheets added after the POR sheet (which stays active)
+        seed: Varies names, items and amounts; the same arguments give the same values
+        path: Also save the workbook here
+
+    Returns:
+        The .xlsx file content
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Border, Side
+
+    rng = random.Random(seed)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'POR'
+
+    ws['A1'] = 'DATE ORDER RAISED'
+    ws['B1'] = 'SHIP / PROJECT NAME'
+    ws['D1'] = 'SUPPLIER (if known)'
+    ws['A2'] = date(2018, 1, 1) + timedelta(days=rng.randrange(3000))
+    ws['B2'] = rng.choice(PROJECTS)
+    ws['D2'] = rng.choice(SUPPLIERS)
+
+    for col, label in zip('ABCGHI', ['JOB / CONTRACT No.', 'OP No.', 'MATERIAL / SERVICE DESCRIPTION',
+                                     'QUANTITY', 'PRICE EACH £', 'LINE TOTAL']):
+        ws[f'{col}{HEADER_ROW}'] = label
+
+    total = 0.0
+    for n in range(lines):
+        row = FIRST_LINE_ROW + n
+        quantity = rng.randint(1, 50)
+        price = round(rng.uniform(0.5, 400), 2)
+        ws.cell(row, 1, f'J{rng.randint(1000, 9999)}')
+        ws.cell(row, 2, f'OP{rng.randint(1, 99):02d}')
+        ws.cell(row, 3, f'{rng.choice(PARTS)} ({n + 1})')
+        ws.cell(row, 7, quantity)
+        ws.cell(row, 8, price)
+        ws.cell(row, 9, round(quantity * price, 2))
+        total += quantity * price
+
+    # Footer sits under the template's line item block, pushed down by extra lines
+    shift = max(0, lines - TEMPLATE_LINES)
+    ws.cell(27 + shift, 8, 'ORDER TOTAL')
+    ws.cell(27 + shift, 9, round(total, 2))
+    ws.cell(28 + shift, 6, 'REQUESTOR NAME')
+    ws.cell(29 + shift, 6, rng.choice(REQUESTORS))
+    ws.cell(29 + shift, 1, 'BS EN 10025')
+    for offset, (label, value) in enumerate([('Supplier Contact Name', 'Bob Jones'),
+                                             ('Email', 'Sales@Example.com'),
+                                             ('Quote Ref', f'Q-{rng.randint(100, 999)}'),
+                                             ('Quote date', date(2024, 1, 1) + timedelta(days=rng.randrange(365)))]):
+        ws.cell(33 + shift + offset, 1, label)
+        ws.cell(33 + shift + offset, 3, value)
+
+    border = Border(bottom=Side(style='thin'))
+    for n in range(junk_rows):
+        cell = ws.cell(40 + shift + n, 1 + n % 9, ' ')
+        cell.border = border
+
+    for sheet_no in range(extra_sheets):
+        sheet = wb.create_sheet(f'Notes {sheet_no + 1}')
+        for n in range(200):
+            sheet.cell(n + 1, 1, rng.choice(PARTS))
+            sheet.cell(n + 1, 2, round(rng.uniform(0.5, 400), 2))
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    content = buffer.getvalue()
+    if path:
+        with open(path, 'wb') as f:
+            f.write(content)
+    return content
@@ -0,0 +1,217 @@
+"""
+Content-addressed attachment storage.
+Attachments are hashed with SHA-256 while they stream to disk and stored
+once under ATTACHMENT_FOLDER/ab/cd/<hash>, however many PORs they are
+attached to. AttachmentBlob rows count the PORFile references to each
+blob; the file is removed when the last reference goes.
+
+Blob reference changes happen in the caller's transaction, which holds
+the blob row lock until commit, so an upload and a delete of the same
+content cannot interleave.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update, delete
+
+from config import UPLOAD_FOLDER, ATTACHMENT_FOLDER
+from models import AttachmentBlob
+from spool import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+# Bytes read per chunk while hashing uploads
+HASH_CHUNK_SIZE = 64 * 1024
+# Staged copies live next to the blobs (and spooled uploads on the same
+# volume), so moving them into place is a rename
+STAGING_FOLDER = os.path.join(ATTACHMENT_FOLDER, 'tmp')
+
+
+@dataclass
+class StagedBlob:
+    """An upload written to a temporary file and hashed, not yet referenced."""
+    sha256: str
+    size: int
+    temp_path: str
+
+
+def blob_path(sha256: str) -> str:
+    """Path of the blob with the given hash, sharded by its first four hex digits."""
+    return os.path.join(ATTACHMENT_FOLDER, sha256[:2], sha256[2:4], sha256)
+
+
+def stored_name(sha256: str) -> str:
+    """PORFile.stored_filename for a blob (relative to UPLOAD_FOLDER, like legacy files)."""
+    return os.path.relpath(blob_path(sha256), UPLOAD_FOLDER)
+
+
+def stage_blob(stream) -> StagedBlob:
+    """
+    Copy a stream to a temporary file, hashing it on the way.
+
+    Uploads already spooled and hashed by spool.py are taken over as they
+    are, without a copy.
+
+    Args:
+        stream: Readable binary file object (e.g. FileStorage.stream)
+
+    Returns:
+        StagedBlob; pass it to add_blob_reference, then discard_staged
+    """
+    if isinstance(stream, SpooledUpload):
+        temp_path, sha256, size = stream.claim()
+        return StagedBlob(sha256, size, temp_path)
+    stream.seek(0)
+    os.makedirs(STAGING_FOLDER, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=STAGING_FOLDER)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return StagedBlob(digest.hexdigest(), size, temp_path)
+
+
+def discard_staged(staged: Optional[StagedBlob]) -> None:
+    """Remove a staged upload's temporary file if it was not moved into place."""
+    if staged and os.path.exists(staged.temp_path):
+        os.remove(staged.temp_path)
+
+
+def add_blob_reference(session, staged: StagedBlob) -> Tuple[str, Optional[str]]:
+    """
+    Count a new reference to a staged upload's content, storing it if new.
+
+    Call inside the transaction that adds the PORFile; the caller commits.
+    If the transaction fails, pass the returned placed path to
+    remove_placed before rolling back, so a blob with no row is not left
+    behind.
+
+    Returns:
+        Tuple of (stored_filename for the PORFile, path of the blob file
+        this call put in place or None if it was already stored)
+    """
+    result = session.execute(update(AttachmentBlob)
+                             .where(AttachmentBlob.sha256 == staged.sha256)
+                             .values(ref_count=AttachmentBlob.ref_count + 1))
+    if result.rowcount == 0:
+        session.add(AttachmentBlob(sha256=staged.sha256, size=staged.size, ref_count=1))
+        session.flush()
+
+    # The row is now locked by this transaction; make sure the content is on disk
+    path = blob_path(staged.sha256)
+    placed = None
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staged.temp_path, path)
+        placed = path
+    return stored_name(staged.sha256), placed
+
+
+def remove_placed(placed: Optional[str]) -> None:
+    """
+    Delete a blob file put in place by add_blob_reference whose transaction failed.
+
+    Call before rolling back: until then the transaction still holds the
+    blob row, so no other upload can be relying on the file.
+    """
+    if placed and os.path.exists(placed):
+        os.remove(placed)
+
+
+def release_blob_reference(session, sha256: str) -> Optional[str]:
+    """
+    Drop one reference to a blob; on the last one, delete its row.
+
+    Call inside the transaction that deletes the PORFile. The blob file of
+    a released last reference is moved aside rather than deleted; after
+    the commit pass the returned path to purge_released, or to
+    restore_released if the transaction failed.
+
+    Returns:
+        Path of the moved-aside blob, or None if it is still referenced
+    """
+    session.execute(update(AttachmentBlob)
+                    .where(AttachmentBlob.sha256 == sha256)
+                    .values(ref_count=AttachmentBlob.ref_count - 1))
+    remaining = session.execute(select(AttachmentBlob.ref_count)
+                                .where(AttachmentBlob.sha256 == sha256)).scalar()
+    if remaining:
+        return None
+    session.execute(delete(AttachmentBlob).where(AttachmentBlob.sha256 == sha256))
+
+    path = blob_path(sha256)
+    if not os.path.exists(path):
+        return None
+    released = f"{path}.released"
+    os.replace(path, released)
+    return released
+
+
+def purge_released(released: Optional[str]) -> None:
+    """Delete a blob moved aside by release_blob_reference, once the release is committed."""
+    if released and os.path.exists(released):
+        os.remove(released)
+
+
+def restore_released(released: Optional[str]) -> None:
+    """Put back a blob moved aside by release_blob_reference when the release was rolled back."""
+    if released and os.path.exists(released):
+        os.replace(released, released[:-len('.released')])
+
+
+def migrate_legacy_attachments(session) -> int:
+    """
+    Move attachments stored as flat files in UPLOAD_FOLDER into the blob store.
+
+    Returns:
+        Number of attachments migrated
+    """
+    from models import PORFile
+    migrated = 0
+    for por_file in session.query(PORFile).filter(PORFile.content_hash.is_(None)).all():
+        legacy_path = os.path.join(UPLOAD_FOLDER, por_file.stored_filename)
+        if not os.path.exists(legacy_path):
+            logger.warning(f"Attachment {por_file.id} missing on disk: {legacy_path}")
+            continue
+        with open(legacy_path, 'rb') as stream:
+            staged = stage_blob(stream)
+        placed = None
+        try:
+            por_file.stored_filename, placed = add_blob_reference(session, staged)
+            por_file.content_hash = staged.sha256
+            por_file.file_size = staged.size
+            session.commit()
+        except Exception:
+            remove_placed(placed)
+            session.rollback()
+            raise
+        finally:
+            discard_staged(staged)
+        os.remove(legacy_path)
+        migrated += 1
+    return migrated
+
+
+if __name__ == '__main__':
+    from models import get_session, init_database
+    init_database()
+    db_session = get_session()
+    try:
+        print(f"✅ Moved {migrate_legacy_attachments(db_session)} attachment(s) into the blob store")
+    finally:
+        db_session.close()
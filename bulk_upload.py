@@ -0,0 +1,330 @@
+"""
+Bulk POR upload.
+Expands multi-file and ZIP submissions, parses the workbooks in a worker
+process pool and stores the results in batched transactions.
+"""
+
+import io
+import os
+import logging
+import zipfile
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple, Optional
+
+from config import (UPLOAD_FOLDER, ALLOWED_EXTENSIONS, MAX_FILE_SIZE, BULK_MAX_FILES,
+                    BULK_MAX_CONTENT_LENGTH, BULK_WORKERS, BULK_INSERT_BATCH_SIZE)
+from parsing_map import parse_por_workbook
+from utils import to_float, make_por_filename
+
+logger = logging.getLogger(__name__)
+
+
+def is_workbook(filename: str) -> bool:
+    """Check if filename has a POR workbook extension."""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def _entry(name: str, content: Optional[bytes] = None, error: str = '') -> Dict[str, Any]:
+    """Build a bulk entry; entries with an error are reported but never parsed."""
+    return {'name': name, 'content': content, 'error': error}
+
+
+def _expand_zip(file, zip_name: str) -> List[Dict[str, Any]]:
+    """Expand workbooks from an uploaded ZIP archive, in archive order."""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(file.read()))
+    except zipfile.BadZipFile:
+        return [_entry(zip_name, error="Invalid ZIP archive")]
+
+    entries = []
+    total_size = 0
+    with archive:
+        for info in archive.infolist():
+            name = info.filename
+            base_name = os.path.basename(name)
+            # Skip folders and OS metadata (__MACOSX, .DS_Store, ~$ lock files)
+            if info.is_dir() or not base_name or name.startswith('__MACOSX/') or base_name.startswith(('.', '~$')):
+                continue
+            if not is_workbook(base_name):
+                entries.append(_entry(name, error="Not an Excel workbook"))
+                continue
+            if info.file_size > MAX_FILE_SIZE:
+                entries.append(_entry(name, error="File too large. Maximum size is 16MB."))
+                continue
+            total_size += info.file_size
+            if total_size > BULK_MAX_CONTENT_LENGTH:
+                raise ValueError("ZIP archive is too large once extracted")
+            entries.append(_entry(name, archive.read(info)))
+    return entries
+
+
+def collect_bulk_files(files) -> List[Dict[str, Any]]:
+    """
+    Collect uploaded workbooks in submission order.
+
+    Args:
+        files: Uploaded FileStorage objects; ZIP archives are expanded in place
+
+    Returns:
+        List of entries with 'name', 'content' and 'error' keys
+
+    Raises:
+        ValueError: If more than BULK_MAX_FILES files were submitted
+    """
+    entries = []
+    for file in files:
+        if not file or not file.filename:
+            continue
+        if file.filename.lower().endswith('.zip'):
+            entries.extend(_expand_zip(file, file.filename))
+        elif is_workbook(file.filename):
+            entries.append(_entry(file.filename, file.read()))
+        else:
+            entries.append(_entry(file.filename, error="Not an Excel workbook"))
+
+    if len(entries) > BULK_MAX_FILES:
+        raise ValueError(f"Too many files. Maximum is {BULK_MAX_FILES} per upload.")
+    return entries
+
+
+def _parse_entry(content: bytes) -> Tuple[bool, str, Optional[dict], Optional[list]]:
+    """Parse one workbook; runs in a pool worker so it must stay side-effect free."""
+    try:
+        data, items = parse_por_workbook(io.BytesIO(content))
+        return True, '', data, items
+    except Exception as e:
+        return False, str(e), None, None
+
+
+def parse_entries(contents: List[bytes], workers: int = BULK_WORKERS) -> List[Tuple[bool, str, Optional[dict], Optional[list]]]:
+    """
+    Parse workbooks in a process pool, preserving input order.
+
+    Args:
+        contents: Workbook bytes in submission order
+        workers: Maximum number of worker processes
+
+    Returns:
+        List of (success, error, data, items) in the same order as contents
+    """
+    workers = min(workers, len(contents))
+    if workers <= 1:
+        return [_parse_entry(content) for content in contents]
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    # spawn keeps workers independent of the web server's threads and DB connections
+    context = multiprocessing.get_context('spawn')
+    chunksize = max(1, len(contents) // (workers * 4))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            return list(pool.map(_parse_entry, contents, chunksize=chunksize))
+    except BrokenProcessPool as e:
+        logger.warning(f"Parser pool failed, parsing in-process instead: {str(e)}")
+        return [_parse_entry(content) for content in contents]
+
+
+def parse_workbook_file(path: str) -> Tuple[bool, str, Optional[dict], Optional[list]]:
+    """Parse a workbook on disk; safe to run in a ParserPool worker."""
+    try:
+        with open(path, 'rb') as stream:
+            data, items = parse_por_workbook(stream)
+        return True, '', data, items
+    except Exception as e:
+        return False, str(e), None, None
+
+
+class ParserPool:
+    """
+    Long-lived pool for parsing workbooks batch after batch.
+
+    Runs in-process when workers <= 1. Used by the command-line backfill
+    and import tools, which parse many batches with the same workers.
+    """
+
+    def __init__(self, workers: int = BULK_WORKERS):
+        self.workers = workers
+        self.pool = None
+        if workers > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn keeps workers independent of the parent's DB connections
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def map(self, func, items: List[Any]) -> List[Any]:
+        """Apply func (a picklable module-level function) to items, preserving order."""
+        if self.pool is None:
+            return [func(item) for item in items]
+        chunksize = max(1, len(items) // (self.workers * 4))
+        return list(self.pool.map(func, items, chunksize=chunksize))
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> 'ParserPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _save_batch(batch: List[Dict[str, Any]], allow_duplicates: bool = False) -> Optional[str]:
+    """
+    Number, store and insert a batch of parsed PORs in one transaction.
+
+    The batch's PO numbers are allocated as one block inside the same
+    transaction, so a failed batch releases its numbers again. Unless
+    allow_duplicates is set, source hashes are checked again once the
+    allocation holds the counter lock: files another submission processed
+    in the meantime are marked as already processed (their 'duplicate_po'
+    set) and the rest of the batch is retried without them.
+    """
+    from duplicates import find_processed_pos
+    from models import get_session, POR, LineItem
+    from po_counter import allocate_po_block
+    from search import index_pors
+    from view_cache import bump_data_generation
+
+    db_session = get_session()
+    written = []
+    pors = []
+    try:
+        while True:
+            po_numbers = allocate_po_block(db_session, len(batch))
+            processed = {} if allow_duplicates else find_processed_pos(db_session, [r['source_hash'] for r in batch])
+            if not processed:
+                break
+            # Release the numbers before dropping the duplicates from the batch
+            db_session.rollback()
+            for result in batch:
+                if result['source_hash'] in processed:
+                    result['duplicate_po'] = processed[result['source_hash']]
+            batch = [r for r in batch if r['source_hash'] not in processed]
+            if not batch:
+                return None
+        for result, po_number in zip(batch, po_numbers):
+            data = result['data']
+            data.update({
+                'po_number': po_number,
+                'source_hash': result['source_hash'],
+                'filename': make_por_filename(po_number, data['date_order_raised'], data['requestor_name']),
+                'created_at': datetime.now(timezone.utc)
+            })
+            por = POR(**data)
+            por.line_items = [
+                LineItem(
+                    job_contract_no=item.get('job'),
+                    op_no=item.get('op'),
+                    description=item.get('desc'),
+                    quantity=item.get('qty'),
+                    price_each=to_float(item.get('price')),
+                    line_total=to_float(item.get('ltot'))
+                )
+                for item in result['items'] or []
+            ]
+            db_session.add(por)
+            pors.append(por)
+        db_session.flush()
+        index_pors(db_session, [por.id for por in pors])
+
+        for result in batch:
+            file_path = os.path.join(UPLOAD_FOLDER, result['data']['filename'])
+            with open(file_path, 'wb') as f:
+                f.write(result['content'])
+            written.append(file_path)
+
+        bump_data_generation(db_session)
+        db_session.commit()
+        return None
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Bulk insert error: {str(e)}")
+        for file_path in written:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        return str(e)
+    finally:
+        db_session.close()
+
+
+def process_bulk_upload(entries: List[Dict[str, Any]], workers: int = BULK_WORKERS,
+                        allow_duplicates: bool = False) -> List[Dict[str, Any]]:
+    """
+    Parse, number, store and insert a bulk submission.
+
+    PO numbers are allocated in submission order to the workbooks that
+    parsed successfully, so failed files do not burn numbers. Unless
+    allow_duplicates is set, workbooks already processed (or repeated
+    within the submission) are matched to their existing PO by content
+    hash and never parsed.
+
+    Args:
+        entries: Entries from collect_bulk_files
+        workers: Maximum number of parser processes
+        allow_duplicates: Create new PORs for files processed before
+
+    Returns:
+        Per-file results with 'name', 'success', 'message' and 'po_number'
+    """
+    from duplicates import content_hash, find_processed_pos
+    from models import get_session
+
+    results = [{'name': e['name'], 'success': False, 'message': e['error'], 'po_number': None,
+                'content': e['content'], 'data': None, 'items': None, 'duplicate_of': None, 'duplicate_po': None,
+                'source_hash': content_hash(e['content']) if e['content'] is not None else None}
+               for e in entries]
+
+    pending = [r for r in results if not r['message']]
+    if not allow_duplicates:
+        db_session = get_session()
+        try:
+            processed = find_processed_pos(db_session, [r['source_hash'] for r in pending])
+        finally:
+            db_session.close()
+        first_seen: Dict[str, Dict[str, Any]] = {}
+        for result in pending:
+            if result['source_hash'] in processed:
+                po_number = processed[result['source_hash']]
+                result.update(success=True, po_number=po_number, message=f"Already processed as PO #{po_number}")
+            elif result['source_hash'] in first_seen:
+                result['duplicate_of'] = first_seen[result['source_hash']]
+            else:
+                first_seen[result['source_hash']] = result
+        pending = [r for r in pending if not r['message'] and r['duplicate_of'] is None]
+
+    parsed = parse_entries([r['content'] for r in pending], workers)
+    for result, (ok, error, data, items) in zip(pending, parsed):
+        if ok:
+            result.update(data=data, items=items)
+        else:
+            result['message'] = f"Error processing Excel file: {error}"
+
+    accepted = [r for r in results if r['data'] is not None]
+    for start in range(0, len(accepted), BULK_INSERT_BATCH_SIZE):
+        batch = accepted[start:start + BULK_INSERT_BATCH_SIZE]
+        error = _save_batch(batch, allow_duplicates)
+        for result in batch:
+            if result['duplicate_po'] is not None:
+                result.update(success=True, po_number=result['duplicate_po'],
+                              message=f"Already processed as PO #{result['duplicate_po']}")
+            elif error:
+                result['message'] = f"Error saving to database: {error}"
+            else:
+                po_number = result['data']['po_number']
+                result.update(success=True, po_number=po_number, message=f"Processed PO #{po_number}")
+
+    for result in results:
+        original = result['duplicate_of']
+        if original is not None:
+            result.update(success=original['success'], po_number=original['po_number'],
+                          message=f"Same file as {original['name']}" +
+                                  (f" (PO #{original['po_number']})" if original['success'] else ""))
+    for result in results:
+        for key in ('content', 'data', 'items', 'duplicate_of', 'duplicate_po', 'source_hash'):
+            result.pop(key)
+    return results
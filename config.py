@@ -12,15 +12,55 @@ DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
 
 # File Upload Settings
 UPLOAD_FOLDER = "static/uploads"
+ATTACHMENT_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')  # content-addressed attachments (see blob_store.py)
+# Hand attachment downloads to the front proxy: '' (Python sends the file),
+# 'x-sendfile' (Apache/lighttpd) or 'x-accel-redirect' (nginx internal location
+# at ATTACHMENT_ACCEL_PREFIX, aliased to UPLOAD_FOLDER)
+ATTACHMENT_SENDFILE = os.environ.get('ATTACHMENT_SENDFILE', '').lower()
+ATTACHMENT_ACCEL_PREFIX = os.environ.get('ATTACHMENT_ACCEL_PREFIX', '/protected-uploads/')
 ALLOWED_EXTENSIONS: Set[str] = {'xlsx', 'xls'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
 
+# Bulk Upload Settings
+BULK_MAX_FILES = int(os.environ.get('BULK_MAX_FILES', 500))
+BULK_MAX_CONTENT_LENGTH = 256 * 1024 * 1024  # 256MB per bulk request (also caps unzipped size)
+BULK_WORKERS = int(os.environ.get('BULK_WORKERS', os.cpu_count() or 2))
+BULK_INSERT_BATCH_SIZE = int(os.environ.get('BULK_INSERT_BATCH_SIZE', 50))
+
+# Re-parse Backfill Settings (reparse.py)
+REPARSE_BATCH_SIZE = int(os.environ.get('REPARSE_BATCH_SIZE', 200))  # PORs per transaction
+REPARSE_CHECKPOINT_PATH = os.environ.get('REPARSE_CHECKPOINT_PATH', 'reparse_checkpoint.json')
+
+# Historical Import Settings (import_history.py)
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))  # PORs per transaction
+
+# Upload Queue Settings
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 2))  # 0 = run worker.py separately
+UPLOAD_JOB_POLL_INTERVAL = float(os.environ.get('UPLOAD_JOB_POLL_INTERVAL', 1.0))  # seconds
+UPLOAD_JOB_STALE_SECONDS = 600  # running jobs older than this are requeued when workers start
+
 # Database Settings
 DATABASE_URL = os.environ.get('DATABASE_URL', "sqlite:///por.db")
 
+# Connection Pool Settings
+# auto = QueuePool on Postgres and SQLite files, StaticPool for in-memory SQLite.
+# queue / thread / static / null force QueuePool / SingletonThreadPool / StaticPool / NullPool.
+# thread keeps DB_POOL_SIZE + DB_MAX_OVERFLOW connections and must not see more threads than that.
+DB_POOL_STRATEGY = os.environ.get('DB_POOL_STRATEGY', 'auto').lower()
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds to wait for a connection
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds; below the server's idle timeout
+SQLITE_WAL = os.environ.get('SQLITE_WAL', 'True').lower() == 'true'  # readers don't block the writer
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 30))  # seconds to wait for a write lock
+
 # Pagination Settings
 RECORDS_PER_PAGE = 10
 
+# View Cache Settings
+VIEW_CACHE_SIZE = int(os.environ.get('VIEW_CACHE_SIZE', 256))  # rendered /view pages kept; 0 disables
+PARSE_CACHE_SIZE = int(os.environ.get('PARSE_CACHE_SIZE', 128))  # parsed uploads kept by content hash; 0 disables
+
 # PO Counter Settings
 STARTING_PO = 1000
 PO_COUNTER_PATH = "po_counter.txt"
@@ -0,0 +1,132 @@
+"""
+Request-scoped database sessions.
+Each request gets one session, opened on first use and closed in
+teardown_appcontext. Pool checkouts are counted per thread so a request
+that ends still holding a connection is logged as a leak.
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Dict
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import engine, get_session
+
+logger = logging.getLogger(__name__)
+
+# Connections currently checked out, by the thread that checked them out
+_held: Counter = Counter()
+# Checkouts by thread since its last request ended (used to count checkouts per
+# request; close_db drops the thread's entry so finished threads don't pile up)
+_checkouts: Counter = Counter()
+_stats = {'checkouts': 0, 'leaked_requests': 0}
+_lock = threading.Lock()
+_instrumented = False
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    thread_id = threading.get_ident()
+    connection_record.info['checkout_thread'] = thread_id
+    with _lock:
+        _held[thread_id] += 1
+        _checkouts[thread_id] += 1
+        _stats['checkouts'] += 1
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    # Check-in may happen on another thread (e.g. garbage collection)
+    thread_id = connection_record.info.pop('checkout_thread', None)
+    if thread_id is None:
+        return
+    with _lock:
+        _held[thread_id] -= 1
+        if not _held[thread_id]:
+            del _held[thread_id]
+
+
+def instrument_pool() -> None:
+    """Count checkouts and check-ins on the engine's pool (once per process)."""
+    global _instrumented
+    with _lock:
+        if _instrumented:
+            return
+        _instrumented = True
+    event.listen(engine, 'checkout', _on_checkout)
+    event.listen(engine, 'checkin', _on_checkin)
+
+
+def held_connections(thread_id: int = None) -> int:
+    """Connections checked out by a thread (default: the current one) and not returned."""
+    with _lock:
+        return _held.get(thread_id or threading.get_ident(), 0)
+
+
+def pool_stats() -> Dict[str, int]:
+    """Process-wide connection counts for monitoring."""
+    with _lock:
+        return {
+            'checked_out': sum(_held.values()),
+            'checkouts': _stats['checkouts'],
+            'leaked_requests': _stats['leaked_requests'],
+        }
+
+
+def get_db() -> Session:
+    """Get the current request's session, opening it on first use."""
+    if '_db_session' not in g:
+        g._db_session = get_session()
+    return g._db_session
+
+
+def rollback_db() -> None:
+    """Roll back the current request's session, if one was opened."""
+    db_session = g.get('_db_session')
+    if db_session is not None:
+        db_session.rollback()
+
+
+def _start_request() -> None:
+    thread_id = threading.get_ident()
+    with _lock:
+        g._db_request = {
+            'label': f"{request.method} {request.path}",
+            'held': _held.get(thread_id, 0),
+            'checkouts': _checkouts.get(thread_id, 0),
+        }
+
+
+def close_db(exception=None) -> None:
+    """Tear down the request's session and report connections it leaked."""
+    db_session = g.pop('_db_session', None)
+    if db_session is not None:
+        try:
+            if exception is not None:
+                db_session.rollback()
+        finally:
+            db_session.close()
+
+    started = g.pop('_db_request', None)
+    if started is None:
+        return
+    thread_id = threading.get_ident()
+    with _lock:
+        held = _held.get(thread_id, 0) - started['held']
+        checkouts = _checkouts.pop(thread_id, 0) - started['checkouts']
+        if held > 0:
+            _stats['leaked_requests'] += 1
+    if held > 0:
+        logger.warning(f"{started['label']} ended holding {held} database connection(s) "
+                       f"({checkouts} checked out during the request)")
+    else:
+        logger.debug(f"{started['label']} checked out {checkouts} database connection(s)")
+
+
+def init_app(app: Flask) -> None:
+    """Register the request-scoped session and leak checks on an app."""
+    instrument_pool()
+    app.before_request(_start_request)
+    app.teardown_appcontext(close_db)
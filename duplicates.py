@@ -0,0 +1,110 @@
+"""
+Duplicate upload detection.
+Every POR records the SHA-256 of the file it was created from
+(POR.source_hash, computed while the upload is spooled). A byte-identical
+re-upload is matched to the existing PO before it is parsed or given a
+PO number, unless the uploader explicitly asks for a new PO.
+"""
+
+import os
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+
+from config import UPLOAD_FOLDER
+from models import POR
+
+logger = logging.getLogger(__name__)
+
+# PORs hashed per commit by backfill_source_hashes
+BACKFILL_BATCH_SIZE = 200
+
+
+class DuplicateUpload(Exception):
+    """Raised when an upload matches a POR that was already created from the same file."""
+
+    def __init__(self, po_number: int):
+        super().__init__(f"Already processed as PO #{po_number}")
+        self.po_number = po_number
+
+
+def duplicate_message(po_number: int) -> str:
+    """User-facing message for a re-upload of an already processed file."""
+    return f"⚠️ This file was already processed as PO #{po_number}; tick \"Upload again as a new PO\" to create another"
+
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 hex digest of an in-memory upload."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 hex digest of a file on disk, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_processed_po(session, source_hash: Optional[str]) -> Optional[int]:
+    """Return the PO number of the oldest POR created from a file with this hash, or None."""
+    if not source_hash:
+        return None
+    return session.execute(select(POR.po_number)
+                           .where(POR.source_hash == source_hash)
+                           .order_by(POR.id)
+                           .limit(1)).scalar()
+
+
+def find_processed_pos(session, source_hashes: Iterable[str]) -> Dict[str, int]:
+    """Map each of source_hashes that was already processed to its (oldest) PO number."""
+    hashes = sorted(set(h for h in source_hashes if h))
+    if not hashes:
+        return {}
+    found: Dict[str, int] = {}
+    rows = session.execute(select(POR.source_hash, POR.po_number)
+                           .where(POR.source_hash.in_(hashes))
+                           .order_by(POR.id))
+    for source_hash, po_number in rows:
+        found.setdefault(source_hash, po_number)
+    return found
+
+
+def backfill_source_hashes(session) -> int:
+    """
+    Hash the stored workbooks of PORs created before source hashes were recorded.
+
+    Returns:
+        Number of PORs given a source hash
+    """
+    hashed, last_id = 0, 0
+    while True:
+        pors = (session.query(POR)
+                .filter(POR.source_hash.is_(None), POR.id > last_id)
+                .order_by(POR.id)
+                .limit(BACKFILL_BATCH_SIZE)
+                .all())
+        if not pors:
+            break
+        for por in pors:
+            path = os.path.join(UPLOAD_FOLDER, por.filename)
+            if not os.path.isfile(path):
+                continue
+            por.source_hash = file_hash(path)
+            hashed += 1
+        session.commit()
+        last_id = pors[-1].id
+    return hashed
+
+
+if __name__ == '__main__':
+    from models import get_session, init_database
+    init_database()
+    db_session = get_session()
+    try:
+        print(f"✅ Recorded source hashes for {backfill_source_hashes(db_session)} POR(s)")
+    finally:
+        db_session.close()
@@ -0,0 +1,119 @@
+"""
+POR export.
+Streams every POR joined with its line items as CSV or XLSX. Rows are
+fetched in chunks from a server-side cursor and written out as they
+arrive, so memory stays flat whatever the number of rows.
+"""
+
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import select
+
+from models import POR, LineItem
+from search import apply_search
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 1000
+# Bytes per chunk when streaming the finished XLSX file
+XLSX_STREAM_CHUNK = 64 * 1024
+
+# (header, column) pairs in export order
+EXPORT_COLUMNS = [
+    ('PO Number', POR.po_number),
+    ('Requestor', POR.requestor_name),
+    ('Date Order Raised', POR.date_order_raised),
+    ('Ship / Project', POR.ship_project_name),
+    ('Supplier', POR.supplier),
+    ('Order Total', POR.order_total),
+    ('Quote Ref', POR.quote_ref),
+    ('Quote Date', POR.quote_date),
+    ('Supplier Contact', POR.supplier_contact_name),
+    ('Supplier Email', POR.supplier_contact_email),
+    ('Created At', POR.created_at),
+    ('Line Job / Contract No.', LineItem.job_contract_no),
+    ('Line OP No.', LineItem.op_no),
+    ('Line Description', LineItem.description),
+    ('Line Quantity', LineItem.quantity),
+    ('Line Price Each', LineItem.price_each),
+    ('Line Total', LineItem.line_total),
+]
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+
+def export_filename(extension: str) -> str:
+    """Build a timestamped download name, e.g. por_export_20250101_120000.csv."""
+    return f"por_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def iter_export_rows(session, search_query: str = '') -> Iterator[List[Tuple]]:
+    """
+    Yield chunks of export rows: one row per line item, one per POR without items.
+
+    Applies the same search as /view and orders newest POR first.
+    """
+    stmt = (select(*[column for _, column in EXPORT_COLUMNS])
+            .select_from(POR)
+            .outerjoin(LineItem, LineItem.por_id == POR.id))
+    stmt, _ = apply_search(session, stmt, search_query)
+    stmt = stmt.order_by(POR.id.desc(), LineItem.id)
+
+    # stream_results uses a server-side cursor where the driver has one
+    # (psycopg2 named cursors); SQLite cursors already fetch lazily
+    result = session.connection(execution_options={'stream_results': True,
+                                                   'max_row_buffer': EXPORT_CHUNK_SIZE}).execute(stmt)
+    try:
+        for chunk in result.partitions(EXPORT_CHUNK_SIZE):
+            yield chunk
+    finally:
+        result.close()
+
+
+def _cell(value):
+    """Format a value for export (datetimes as ISO text)."""
+    return value.isoformat(sep=' ', timespec='seconds') if isinstance(value, datetime) else value
+
+
+def stream_csv(session, search_query: str = '') -> Iterator[str]:
+    """Yield the CSV export chunk by chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_HEADERS)
+    for chunk in iter_export_rows(session, search_query):
+        writer.writerows([_cell(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_xlsx(session, search_query: str = '') -> Iterator[bytes]:
+    """
+    Yield the XLSX export.
+
+    A write-only workbook streams rows to disk as they are appended; the
+    finished file is then streamed from a temporary file.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('PORs')
+    sheet.append(EXPORT_HEADERS)
+    for chunk in iter_export_rows(session, search_query):
+        for row in chunk:
+            sheet.append([_cell(value) for value in row])
+
+    with tempfile.TemporaryFile() as stream:
+        workbook.save(stream)
+        stream.seek(0)
+        while True:
+            data = stream.read(XLSX_STREAM_CHUNK)
+            if not data:
+                break
+            yield data
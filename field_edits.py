@@ -0,0 +1,150 @@
+"""
+Inline field edits.
+Validates and applies edits to POR and line item fields made from the
+records page. Rows are never loaded: edits sharing a set of fields are
+written with one executemany UPDATE, and a batch is committed as one
+transaction together with the search index refresh and /view cache
+invalidation.
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, update, bindparam
+
+from models import POR, LineItem
+from search import index_pors
+from view_cache import bump_data_generation
+
+logger = logging.getLogger(__name__)
+
+# Most changes accepted in one batch request
+MAX_BATCH_CHANGES = 500
+
+# Editable fields per entity: entity -> (model, {field: type}); the whitelist
+# also keeps field names out of SQL
+EDITABLE_FIELDS = {
+    'por': (POR, {
+        'requestor_name': str, 'ship_project_name': str, 'supplier': str, 'job_contract_no': str,
+        'op_no': str, 'order_total': float, 'quote_ref': str, 'quote_date': str,
+    }),
+    'line_item': (LineItem, {
+        'job_contract_no': str, 'op_no': str, 'description': str,
+        'quantity': int, 'price_each': float, 'line_total': float,
+    }),
+}
+
+NOT_FOUND_ERRORS = {'por': 'POR not found', 'line_item': 'Line item not found'}
+
+
+def coerce_change(change: dict) -> Tuple[str, int, str, object]:
+    """
+    Validate one change and convert its value to the field's type.
+
+    Args:
+        change: Dict with entity, id, field and value
+
+    Returns:
+        Tuple of (entity, id, field, value)
+
+    Raises:
+        ValueError: With a user-facing message if the change is invalid
+    """
+    entity, row_id, field, value = (change.get(key) for key in ('entity', 'id', 'field', 'value'))
+    if not all([entity, row_id, field, value is not None]):
+        raise ValueError('Missing required fields')
+    if entity not in EDITABLE_FIELDS:
+        raise ValueError('Invalid entity')
+    fields = EDITABLE_FIELDS[entity][1]
+    if field not in fields:
+        raise ValueError('Invalid field name')
+    try:
+        row_id = int(row_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid id')
+
+    field_type = fields[field]
+    if field_type is not str:
+        # Blank numbers are stored as zero, as the single-field edits always did
+        try:
+            value = field_type(value) if value else field_type()
+        except (TypeError, ValueError):
+            raise ValueError('Invalid number format')
+    return entity, row_id, field, value
+
+
+def apply_field_changes(session, changes: List[dict]) -> List[dict]:
+    """
+    Apply a batch of field edits in one transaction.
+
+    Invalid changes and changes to missing rows are reported and skipped;
+    the rest are merged per row (the last edit of a field wins), written
+    with one executemany UPDATE per entity and set of fields, re-indexed
+    and committed together. If the
+    commit fails, every valid change is reported as failed.
+
+    Args:
+        session: Open database session; committed or rolled back here
+        changes: Dicts with entity, id, field and value
+
+    Returns:
+        One {'success': bool, 'error'?: str} result per change, in order
+    """
+    results: List[dict] = [{'success': True} for _ in changes]
+    rows: Dict[Tuple[str, int], Dict[str, object]] = {}
+    row_changes: Dict[Tuple[str, int], List[int]] = {}
+    for index, change in enumerate(changes):
+        try:
+            entity, row_id, field, value = coerce_change(change if isinstance(change, dict) else {})
+        except ValueError as e:
+            results[index] = {'success': False, 'error': str(e)}
+            continue
+        rows.setdefault((entity, row_id), {})[field] = value
+        row_changes.setdefault((entity, row_id), []).append(index)
+
+    if not rows:
+        return results
+
+    try:
+        # Which rows exist (ids only), and the POR of each edited line item
+        por_ids = set()
+        found = {}
+        for entity in EDITABLE_FIELDS:
+            ids = [row_id for kind, row_id in rows if kind == entity]
+            if not ids:
+                continue
+            if entity == 'por':
+                found[entity] = set(session.execute(select(POR.id).where(POR.id.in_(ids))).scalars())
+                por_ids.update(found[entity])
+            else:
+                pairs = session.execute(select(LineItem.id, LineItem.por_id).where(LineItem.id.in_(ids))).all()
+                found[entity] = {row_id for row_id, _ in pairs}
+                por_ids.update(por_id for _, por_id in pairs)
+
+        # One executemany UPDATE per (entity, set of fields edited)
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[dict]] = {}
+        for (entity, row_id), values in rows.items():
+            if row_id not in found.get(entity, ()):
+                for index in row_changes[(entity, row_id)]:
+                    results[index] = {'success': False, 'error': NOT_FOUND_ERRORS[entity]}
+                continue
+            groups.setdefault((entity, tuple(sorted(values))), []).append(dict(values, row_id=row_id))
+        for (entity, fields), params in groups.items():
+            table = EDITABLE_FIELDS[entity][0].__table__
+            session.execute(update(table)
+                            .where(table.c.id == bindparam('row_id'))
+                            .values({field: bindparam(field) for field in fields}),
+                            params)
+
+        if groups:
+            index_pors(session, por_ids)
+            bump_data_generation(session)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error applying field changes: {str(e)}")
+        for indexes in row_changes.values():
+            for index in indexes:
+                if results[index]['success']:
+                    results[index] = {'success': False, 'error': str(e)}
+    return results
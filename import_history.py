@@ -0,0 +1,320 @@
+"""
+Historical POR import.
+Loads a directory of old POR workbooks in one go: the workbooks are
+parsed in a process pool and inserted with executemany batches (one
+statement per table per batch) instead of one ORM flush per POR.
+
+PO numbers can be preserved with a manifest CSV of filename,po_number
+rows (filenames relative to the directory, or bare names); workbooks not
+in the manifest get new numbers. The PO counter is moved past the
+highest imported number before anything is inserted, so uploads running
+alongside the import never collide with it.
+
+    python import_history.py archive/ --manifest archive/po_numbers.csv
+"""
+
+import os
+import csv
+import shutil
+import logging
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, select
+
+from config import UPLOAD_FOLDER, BULK_WORKERS, IMPORT_BATCH_SIZE
+from bulk_upload import is_workbook
+
+logger = logging.getLogger(__name__)
+
+
+def find_workbooks(directory: str) -> List[str]:
+    """Workbook paths under directory (recursively), relative to it and sorted."""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(('.', '__MACOSX'))]
+        for name in files:
+            if is_workbook(name) and not name.startswith(('.', '~$')):
+                found.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(found)
+
+
+def load_manifest(path: str) -> Dict[str, int]:
+    """
+    Read a manifest CSV of filename,po_number rows (a header row is optional).
+
+    Raises:
+        ValueError: If a PO number is not a positive integer or is listed twice
+    """
+    manifest: Dict[str, int] = {}
+    seen: Dict[int, str] = {}
+    with open(path, newline='') as f:
+        for line_no, row in enumerate(csv.reader(f), start=1):
+            if not row or not row[0].strip():
+                continue
+            if len(row) < 2:
+                raise ValueError(f"Manifest line {line_no}: expected filename,po_number")
+            name, number = row[0].strip(), row[1].strip()
+            if not number.isdigit():
+                if line_no == 1:
+                    continue  # header
+                raise ValueError(f"Manifest line {line_no}: invalid PO number {number!r}")
+            po_number = int(number)
+            if po_number < 1:
+                raise ValueError(f"Manifest line {line_no}: invalid PO number {number!r}")
+            if po_number in seen:
+                raise ValueError(f"Manifest line {line_no}: PO #{po_number} is also listed for {seen[po_number]}")
+            seen[po_number] = name
+            manifest[os.path.normpath(name)] = po_number
+    return manifest
+
+
+def _chunks(values: List[Any], size: int):
+    """Yield values in lists of at most size, keeping each IN (...) under the bound-parameter limit."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _manifest_number(manifest: Dict[str, int], name: str) -> Optional[int]:
+    """Look a workbook up by its relative path, then by its bare filename."""
+    return manifest.get(os.path.normpath(name), manifest.get(os.path.basename(name)))
+
+
+def _insert_batch(session, batch: List[Dict[str, Any]]) -> int:
+    """
+    Insert a batch of parsed workbooks in the caller's transaction.
+
+    Returns:
+        Number of line items inserted
+    """
+    from models import POR, LineItem
+    from po_counter import allocate_po_block
+    from utils import to_float, make_por_filename
+
+    unnumbered = [entry for entry in batch if entry['po_number'] is None]
+    for entry, po_number in zip(unnumbered, allocate_po_block(session, len(unnumbered))):
+        entry['po_number'] = po_number
+
+    por_rows = []
+    for entry in batch:
+        data = dict(entry['data'])
+        data.update({
+            'po_number': entry['po_number'],
+            'source_hash': entry['source_hash'],
+            'filename': make_por_filename(entry['po_number'], data['date_order_raised'], data['requestor_name']),
+            # Keep the original order date visible in the list: created_at is when the workbook was saved
+            'created_at': datetime.fromtimestamp(os.path.getmtime(entry['path']), timezone.utc),
+        })
+        entry['filename'] = data['filename']
+        por_rows.append(data)
+    session.execute(insert(POR), por_rows)
+
+    ids = dict(session.execute(select(POR.po_number, POR.id)
+                               .where(POR.po_number.in_([entry['po_number'] for entry in batch]))).all())
+    item_rows = [
+        {
+            'por_id': ids[entry['po_number']],
+            'job_contract_no': item.get('job'),
+            'op_no': item.get('op'),
+            'description': item.get('desc'),
+            'quantity': item.get('qty'),
+            'price_each': to_float(item.get('price')),
+            'line_total': to_float(item.get('ltot')),
+        }
+        for entry in batch for item in entry['items'] or []
+    ]
+    if item_rows:
+        session.execute(insert(LineItem), item_rows)
+    for entry in batch:
+        entry['por_id'] = ids[entry['po_number']]
+    return len(item_rows)
+
+
+def import_workbooks(session, directory: str, manifest: Optional[Dict[str, int]] = None,
+                     workers: int = BULK_WORKERS, batch_size: int = IMPORT_BATCH_SIZE,
+                     allow_duplicates: bool = False) -> Dict[str, Any]:
+    """
+    Parse and insert every workbook under directory.
+
+    A workbook whose manifest PO number already exists is skipped if that
+    POR was created from the same file, so an interrupted import can
+    simply be run again, and fails if it was not. Unlisted workbooks
+    already imported or uploaded (matched by content hash) or repeated
+    within the directory are skipped; listed workbooks are always imported
+    under their own number, even when another PO has the same content.
+
+    Args:
+        session: Database session
+        directory: Folder of workbooks (searched recursively)
+        manifest: Optional {relative path or filename: PO number}
+        workers: Parser processes (1 parses in-process)
+        batch_size: PORs per transaction
+        allow_duplicates: Import files whose content was processed before
+
+    Returns:
+        Dict with per-file 'results' ('name', 'success', 'message',
+        'po_number') and 'stats' (counts, timings and rows per second)
+    """
+    from bulk_upload import ParserPool, parse_workbook_file
+    from duplicates import file_hash, find_processed_pos
+    from models import POR
+    from po_counter import advance_po_counter
+    from search import index_pors
+    from view_cache import bump_data_generation
+
+    started = time.perf_counter()
+    manifest = manifest or {}
+    entries = [{'name': name, 'path': os.path.join(directory, name), 'success': False, 'message': '',
+                'po_number': _manifest_number(manifest, name), 'source_hash': None}
+               for name in find_workbooks(directory)]
+    for entry in entries:
+        entry['source_hash'] = file_hash(entry['path'])
+
+    # Skip what is already in the database or repeated in this import. A
+    # manifest number is a distinct historical PO, so listed workbooks are
+    # never dropped as copies of another file; only unlisted ones are.
+    listed = [e['po_number'] for e in entries if e['po_number']]
+    taken: Dict[int, Optional[str]] = {}
+    for chunk in _chunks(listed, batch_size):
+        taken.update(session.execute(select(POR.po_number, POR.source_hash).where(POR.po_number.in_(chunk))).all())
+    processed: Dict[str, int] = {}
+    if not allow_duplicates:
+        for chunk in _chunks(sorted({e['source_hash'] for e in entries}), batch_size):
+            processed.update(find_processed_pos(session, chunk))
+
+    first_seen: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        if entry['po_number'] and entry['source_hash'] not in first_seen:
+            first_seen[entry['source_hash']] = entry
+    for entry in entries:
+        po_number, source_hash = entry['po_number'], entry['source_hash']
+        if po_number:
+            if po_number not in taken:
+                continue
+            if taken[po_number] == source_hash:
+                entry.update(success=True, message=f"Already imported as PO #{po_number}")
+            elif taken[po_number] is None:
+                entry['message'] = (f"PO #{po_number} already exists with no source hash recorded; "
+                                    f"run `python duplicates.py` to compare it")
+            else:
+                entry['message'] = f"PO #{po_number} already exists for a different workbook"
+        elif allow_duplicates:
+            continue
+        elif source_hash in processed:
+            entry.update(success=True, po_number=processed[source_hash],
+                         message=f"Already processed as PO #{processed[source_hash]}")
+        elif first_seen.setdefault(source_hash, entry) is not entry:
+            original = first_seen[source_hash]
+            entry['message'] = f"Same file as {original['name']}" + (
+                f" (PO #{original['po_number']})" if original['po_number'] else "")
+    pending = [entry for entry in entries if not entry['message']]
+
+    preserved = [entry['po_number'] for entry in pending if entry['po_number']]
+    if preserved:
+        advance_po_counter(session, max(preserved))
+        session.commit()
+
+    stats = {'files': len(entries), 'imported': 0, 'skipped': len(entries) - len(pending), 'failed': 0,
+             'line_items': 0, 'parse_seconds': 0.0, 'insert_seconds': 0.0}
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    with ParserPool(workers) as parser:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            parse_started = time.perf_counter()
+            parsed = parser.map(parse_workbook_file, [entry['path'] for entry in batch])
+            stats['parse_seconds'] += time.perf_counter() - parse_started
+
+            accepted = []
+            for entry, (ok, error, data, items) in zip(batch, parsed):
+                if ok:
+                    entry.update(data=data, items=items)
+                    accepted.append(entry)
+                else:
+                    entry['message'] = f"Error processing Excel file: {error}"
+                    stats['failed'] += 1
+            if not accepted:
+                continue
+
+            insert_started = time.perf_counter()
+            copied = []
+            try:
+                line_items = _insert_batch(session, accepted)
+                index_pors(session, [entry['por_id'] for entry in accepted])
+                for entry in accepted:
+                    stored_path = os.path.join(UPLOAD_FOLDER, entry['filename'])
+                    shutil.copyfile(entry['path'], stored_path)
+                    copied.append(stored_path)
+                bump_data_generation(session)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Import batch error: {str(e)}")
+                for stored_path in copied:
+                    os.remove(stored_path)
+                for entry in accepted:
+                    entry['message'] = f"Error saving to database: {str(e)}"
+                    if entry['po_number'] not in preserved:
+                        entry['po_number'] = None
+                stats['failed'] += len(accepted)
+                continue
+            finally:
+                stats['insert_seconds'] += time.perf_counter() - insert_started
+
+            for entry in accepted:
+                entry.update(success=True, message=f"Imported as PO #{entry['po_number']}")
+            stats['imported'] += len(accepted)
+            stats['line_items'] += line_items
+            logger.info(f"Imported {stats['imported']} of {len(pending)} workbook(s)")
+
+    elapsed = time.perf_counter() - started
+    rows = stats['imported'] + stats['line_items']
+    stats.update(elapsed_seconds=round(elapsed, 3),
+                 parse_seconds=round(stats['parse_seconds'], 3),
+                 insert_seconds=round(stats['insert_seconds'], 3),
+                 rows_per_second=round(rows / elapsed, 1) if elapsed else 0.0,
+                 insert_rows_per_second=round(rows / stats['insert_seconds'], 1) if stats['insert_seconds'] else 0.0)
+    results = [{key: entry[key] for key in ('name', 'success', 'message', 'po_number')} for entry in entries]
+    return {'results': results, 'stats': stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a directory of historical POR workbooks")
+    parser.add_argument('directory', help="folder of .xlsx/.xls workbooks (searched recursively)")
+    parser.add_argument('--manifest', help="CSV of filename,po_number rows to keep existing PO numbers")
+    parser.add_argument('--workers', type=int, default=BULK_WORKERS, help="parser processes")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="PORs per transaction")
+    parser.add_argument('--allow-duplicates', action='store_true',
+                        help="import workbooks whose content was already processed")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    try:
+        manifest = load_manifest(args.manifest) if args.manifest else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    from models import get_session, init_database
+    init_database()
+    db_session = get_session()
+    try:
+        outcome = import_workbooks(db_session, args.directory, manifest, workers=max(1, args.workers),
+                                   batch_size=max(1, args.batch_size), allow_duplicates=args.allow_duplicates)
+    finally:
+        db_session.close()
+
+    for result in outcome['results']:
+        if not result['message'].startswith('Imported'):
+            print(f"{'⚠️' if result['success'] else '❌'} {result['name']}: {result['message']}")
+    stats = outcome['stats']
+    print(f"✅ Imported {stats['imported']} of {stats['files']} workbook(s) with {stats['line_items']} line items "
+          f"({stats['skipped']} skipped, {stats['failed']} failed) in {stats['elapsed_seconds']}s: "
+          f"{stats['rows_per_second']} rows/s overall, {stats['insert_rows_per_second']} rows/s inserting "
+          f"(parse {stats['parse_seconds']}s, insert {stats['insert_seconds']}s)")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,221 @@
+"""
+Upload Job Queue
+Durable queue backed by the upload_jobs table. Uploads are spooled to
+disk, background workers claim queued jobs and run the upload handler.
+"""
+
+import os
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Optional, Tuple, List
+
+from sqlalchemy import update
+
+from config import UPLOAD_JOB_POLL_INTERVAL, UPLOAD_JOB_STALE_SECONDS
+from models import get_session, UploadJob
+from spool import claim_upload
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+FINISHED_STATES = (JOB_DONE, JOB_FAILED)
+
+# handler(spool_path, original_filename, content_hash, allow_duplicate) -> (success, message, po_number)
+UploadHandler = Callable[[str, str, Optional[str], bool], Tuple[bool, str, Optional[int]]]
+
+
+def enqueue_upload(file, allow_duplicate: bool = False) -> int:
+    """
+    Queue an uploaded file for processing.
+
+    The file is already on disk in the spool folder (see spool.py); the
+    job takes it over by path, so queueing copies nothing.
+
+    Args:
+        file: Uploaded FileStorage
+        allow_duplicate: Create a new PO even if the file was processed before
+
+    Returns:
+        Id of the queued job
+    """
+    spool_path, content_hash, _ = claim_upload(file)
+
+    session = get_session()
+    try:
+        job = UploadJob(status=JOB_QUEUED, original_filename=file.filename, spool_path=spool_path,
+                        content_hash=content_hash, allow_duplicate=allow_duplicate)
+        session.add(job)
+        session.commit()
+        job_id = job.id
+    except Exception:
+        session.rollback()
+        os.remove(spool_path)
+        raise
+    finally:
+        session.close()
+
+    if _worker_pool:
+        _worker_pool.notify()
+    return job_id
+
+
+def get_job(job_id: int) -> Optional[dict]:
+    """Get a job's status as a dictionary, None if it does not exist."""
+    session = get_session()
+    try:
+        job = session.get(UploadJob, job_id)
+        return job.to_dict() if job else None
+    finally:
+        session.close()
+
+
+def _claim_next_job(session) -> Optional[UploadJob]:
+    """
+    Atomically move the oldest queued job to running.
+
+    The conditional UPDATE only succeeds for one worker, so two workers
+    racing for the same job never both run it.
+    """
+    candidates = (session.query(UploadJob.id)
+                  .filter(UploadJob.status == JOB_QUEUED)
+                  .order_by(UploadJob.id)
+                  .limit(5)
+                  .all())
+    for (job_id,) in candidates:
+        result = session.execute(
+            update(UploadJob)
+            .where(UploadJob.id == job_id, UploadJob.status == JOB_QUEUED)
+            .values(status=JOB_RUNNING, started_at=datetime.now(timezone.utc))
+        )
+        session.commit()
+        if result.rowcount == 1:
+            return session.get(UploadJob, job_id)
+    return None
+
+
+def run_next_job(handler: UploadHandler) -> bool:
+    """
+    Claim and run one queued job.
+
+    Args:
+        handler: Upload handler called with the spooled file
+
+    Returns:
+        True if a job was run, False if the queue was empty
+    """
+    session = get_session()
+    try:
+        job = _claim_next_job(session)
+        if not job:
+            return False
+
+        try:
+            success, message, po_number = handler(job.spool_path, job.original_filename,
+                                                  job.content_hash, bool(job.allow_duplicate))
+        except Exception as e:
+            logger.error(f"Upload job {job.id} error: {str(e)}")
+            success, message, po_number = False, f"❌ Unexpected error: {str(e)}", None
+
+        job.status = JOB_DONE if success else JOB_FAILED
+        job.message = message
+        job.po_number = po_number
+        job.finished_at = datetime.now(timezone.utc)
+        session.commit()
+
+        try:
+            os.remove(job.spool_path)
+        except OSError:
+            pass
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Upload queue error: {str(e)}")
+        return False
+    finally:
+        session.close()
+
+
+def requeue_stale_jobs(stale_seconds: int = UPLOAD_JOB_STALE_SECONDS) -> int:
+    """Put jobs left running by a crashed worker back in the queue."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_seconds)
+    session = get_session()
+    try:
+        result = session.execute(
+            update(UploadJob)
+            .where(UploadJob.status == JOB_RUNNING, UploadJob.started_at < cutoff)
+            .values(status=JOB_QUEUED, started_at=None)
+        )
+        session.commit()
+        if result.rowcount:
+            logger.warning(f"Requeued {result.rowcount} stale upload job(s)")
+        return result.rowcount
+    finally:
+        session.close()
+
+
+class UploadWorkerPool:
+    """Background threads that drain the upload queue."""
+
+    def __init__(self, handler: UploadHandler, count: int, poll_interval: float = UPLOAD_JOB_POLL_INTERVAL):
+        self.handler = handler
+        self.count = count
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        requeue_stale_jobs()
+        for i in range(self.count):
+            thread = threading.Thread(target=self._work, name=f"upload-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.count} upload worker(s)")
+
+    def notify(self) -> None:
+        """Wake idle workers because a job was queued."""
+        self._wake.set()
+
+    def stop(self, timeout: float = None) -> None:
+        """Stop the workers after their current job."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            if not run_next_job(self.handler):
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+_worker_pool: Optional[UploadWorkerPool] = None
+_worker_pool_lock = threading.Lock()
+
+
+def start_upload_workers(handler: UploadHandler, count: int) -> Optional[UploadWorkerPool]:
+    """
+    Start the in-process worker pool once; later calls are no-ops.
+
+    Args:
+        handler: Upload handler run for each job
+        count: Number of worker threads (0 disables in-process workers)
+
+    Returns:
+        The running pool, None if disabled
+    """
+    global _worker_pool
+    if count < 1:
+        return None
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = UploadWorkerPool(handler, count)
+            _worker_pool.start()
+    return _worker_pool
@@ -3,29 +3,86 @@ Database models for POR (Purchase Order Request) system.
 Defines the POR table structure and database configuration.
 """
 
-import os
 from datetime import datetime, timezone
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime, Index, ForeignKey
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Text, DateTime, Boolean, Index, ForeignKey
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, SingletonThreadPool, StaticPool, NullPool
 
-# Database configuration
-DATABASE_URL = os.environ.get('DATABASE_URL', "sqlite:///por.db")
-
-print("Using database at:", DATABASE_URL)
+from config import (DATABASE_URL, DB_POOL_STRATEGY, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                    DB_POOL_RECYCLE, SQLITE_WAL, SQLITE_BUSY_TIMEOUT)
 
 # Handle Railway's PostgreSQL URL format
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Create engine with optimized settings
-engine = create_engine(
-    DATABASE_URL,
-    future=True,
-    poolclass=StaticPool,  # Better for single-threaded apps
-    pool_pre_ping=True,    # Verify connections before use
-    echo=False             # Set to True for SQL debugging
-)
+def _json_value(value):
+    """Format a column value for JSON (datetimes as ISO text)."""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+POOL_CLASSES = {
+    'queue': QueuePool,
+    'thread': SingletonThreadPool,
+    'static': StaticPool,
+    'null': NullPool,
+}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite setup: WAL journal and a busy timeout."""
+    cursor = dbapi_connection.cursor()
+    if SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, fewer fsyncs
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT * 1000}")
+    cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL, strategy: str = DB_POOL_STRATEGY) -> Engine:
+    """
+    Create the engine with a pool suited to the database backend.
+    
+    Args:
+        url: Database URL
+        strategy: 'auto', or one of POOL_CLASSES to force a pool class
+        
+    Returns:
+        Configured SQLAlchemy engine
+    """
+    url_obj = make_url(url)
+    is_sqlite = url_obj.get_backend_name() == 'sqlite'
+    in_memory = is_sqlite and url_obj.database in (None, '', ':memory:')
+    
+    if strategy == 'auto':
+        # In-memory SQLite only exists on its one connection
+        strategy = 'static' if in_memory else 'queue'
+    if strategy not in POOL_CLASSES:
+        raise ValueError(f"Unknown DB_POOL_STRATEGY: {strategy}")
+    
+    options = {'poolclass': POOL_CLASSES[strategy]}
+    if strategy == 'queue':
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE)
+    elif strategy == 'thread':
+        # One connection per thread; size it for every thread that may query
+        options['pool_size'] = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    if is_sqlite:
+        connect_args = {'timeout': SQLITE_BUSY_TIMEOUT}
+        if strategy != 'thread':
+            # Connections may be handed between threads by the pool
+            connect_args['check_same_thread'] = False
+        options['connect_args'] = connect_args
+    else:
+        options['pool_pre_ping'] = True  # Verify server connections before use
+    
+    new_engine = create_engine(url, future=True, echo=False, **options)
+    if is_sqlite and not in_memory:
+        event.listen(new_engine, 'connect', _set_sqlite_pragmas)
+    return new_engine
+
+
+engine = build_engine()
 
 # Create declarative base
 Base = declarative_base()
@@ -36,6 +93,13 @@ class BatchCounter(Base):
     id = Column(Integer, primary_key=True)
     value = Column(Integer, nullable=False)
 
+class DataGeneration(Base):
+    """Single-row counter bumped by every write that changes what /view shows."""
+    __tablename__ = "data_generation"
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
 def get_or_create_batch_counter(session):
     counter = session.query(BatchCounter).first()
     if not counter:
@@ -63,6 +127,7 @@ class POR(Base):
     ship_project_name = Column(String(255), index=True)
     supplier = Column(String(255), index=True)
     filename = Column(String(255), nullable=False)
+    source_hash = Column(String(64), index=True)  # SHA-256 of the uploaded file (see duplicates.py)
     
     # Line item details
     job_contract_no = Column(String(100), index=True)
@@ -100,23 +165,19 @@ class POR(Base):
         """String representation of POR record."""
         return f"<POR(po_number={self.po_number}, requestor='{self.requestor_name}')>"
     
+    # Keys of to_dict(), in order
+    DICT_FIELDS = ('id', 'po_number', 'requestor_name', 'date_order_raised', 'filename',
+                   'job_contract_no', 'op_no', 'description', 'quantity', 'price_each',
+                   'line_total', 'order_total', 'created_at')
+    
+    @classmethod
+    def row_to_dict(cls, row) -> dict:
+        """Convert a row (or object) with the DICT_FIELDS columns to a to_dict() dictionary."""
+        return {field: _json_value(getattr(row, field)) for field in cls.DICT_FIELDS}
+    
     def to_dict(self):
         """Convert POR record to dictionary."""
-        return {
-            'id': self.id,
-            'po_number': self.po_number,
-            'requestor_name': self.requestor_name,
-            'date_order_raised': self.date_order_raised,
-            'filename': self.filename,
-            'job_contract_no': self.job_contract_no,
-            'op_no': self.op_no,
-            'description': self.description,
-            'quantity': self.quantity,
-            'price_each': self.price_each,
-            'line_total': self.line_total,
-            'order_total': self.order_total,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return self.row_to_dict(self)
 
 
 class PORFile(Base):
@@ -143,6 +204,7 @@ class PORFile(Base):
     # Metadata
     uploaded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     description = Column(String(500))  # Optional description
+    content_hash = Column(String(64), index=True)  # SHA-256 of the blob; None for legacy flat files
     
     # Relationship to POR
     por = relationship("POR", back_populates="attached_files")
@@ -162,10 +224,26 @@ class PORFile(Base):
             'file_size': self.file_size,
             'mime_type': self.mime_type,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
-            'description': self.description
+            'description': self.description,
+            'content_hash': self.content_hash
         }
 
 
+class AttachmentBlob(Base):
+    """
+    Stored attachment content, shared by every PORFile with the same hash.
+    
+    ref_count is the number of PORFile rows pointing at the blob; the blob
+    is deleted with its last reference (see blob_store.py).
+    """
+    __tablename__ = "attachment_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+
 class LineItem(Base):
     """
     Line Item model for POR.
@@ -183,27 +261,109 @@ class LineItem(Base):
     line_total = Column(Float)
 
     por = relationship("POR", back_populates="line_items")
+    
+    def to_dict(self):
+        """Convert LineItem record to dictionary."""
+        return {
+            'id': self.id,
+            'por_id': self.por_id,
+            'job_contract_no': self.job_contract_no,
+            'op_no': self.op_no,
+            'description': self.description,
+            'quantity': self.quantity,
+            'price_each': self.price_each,
+            'line_total': self.line_total
+        }
+
+
+class UploadJob(Base):
+    """
+    Queued upload job.
+    
+    Uploaded files are spooled to disk and recorded here; background
+    workers claim queued jobs and the upload page polls their status.
+    """
+    __tablename__ = "upload_jobs"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    status = Column(String(20), nullable=False, default='queued', index=True)  # 'queued', 'running', 'done', 'failed'
+    original_filename = Column(String(255), nullable=False)
+    spool_path = Column(String(500), nullable=False)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the upload, computed while spooling
+    allow_duplicate = Column(Boolean, default=False)  # create a new PO even if the file was processed before
+    message = Column(Text)
+    po_number = Column(Integer)
+    
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    def __repr__(self):
+        """String representation of UploadJob record."""
+        return f"<UploadJob(id={self.id}, status='{self.status}', filename='{self.original_filename}')>"
+    
+    def to_dict(self):
+        """Convert UploadJob record to dictionary."""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'original_filename': self.original_filename,
+            'message': self.message,
+            'po_number': self.po_number,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Columns added after their table first shipped: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ('data_generation', 'updated_at', 'TIMESTAMP'),
+    ('por_files', 'content_hash', 'VARCHAR(64)'),
+    ('upload_jobs', 'content_hash', 'VARCHAR(64)'),
+    ('upload_jobs', 'allow_duplicate', 'BOOLEAN'),
+    ('por', 'source_hash', 'VARCHAR(64)'),
+]
+
+
+def _add_missing_columns():
+    """Add ADDED_COLUMNS to tables created before them (create_all skips existing tables)."""
+    from sqlalchemy import inspect, text
+    inspector = inspect(engine)
+    for table, column, ddl_type in ADDED_COLUMNS:
+        if column not in {c['name'] for c in inspector.get_columns(table)}:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
 
 
 def init_database():
-    """Initialize database tables."""
+    """
+    Create any missing database tables.
+    
+    Run once at deploy/startup (``python app.py``, ``flask --app app init-db``
+    or ``python models.py``); importing this module never touches the database.
+    """
     try:
+        print("Using database at:", DATABASE_URL)
         Base.metadata.create_all(engine)
+        _add_missing_columns()
+        from search import init_search_index
+        init_search_index(engine)
         print("✅ Database tables created successfully")
     except Exception as e:
         print(f"❌ Error creating database tables: {e}")
         raise
 
 
+# Session factory shared by all callers
+SessionLocal = sessionmaker(bind=engine)
+
+
 def get_session():
     """Get a new database session."""
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return SessionLocal()
 
-# Create global session for the application
-session = get_session()
 
-# Initialize database on import
 if __name__ == '__main__':
     init_database() 
 
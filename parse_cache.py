@@ -0,0 +1,72 @@
+"""
+Parsed upload cache.
+Keeps the extracted data of recently parsed uploads in a bounded LRU
+keyed by the file's SHA-256, so a dry run followed by the real upload of
+the same file parses it only once. Entries are copied in and out, so
+callers may modify what they get back.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import PARSE_CACHE_SIZE
+
+ParseResult = Tuple[Dict[str, Any], List[Dict[str, Any]]]
+
+
+class ParseCache:
+    """Thread-safe bounded LRU of (data, line_items) by content hash, with hit/miss statistics."""
+
+    def __init__(self, max_entries: int = PARSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, ParseResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, content_hash: Optional[str]) -> Optional[ParseResult]:
+        """Return a copy of the cached parse of content_hash, or None."""
+        if not content_hash:
+            return None
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(content_hash)
+            self._stats['hits'] += 1
+        return copy.deepcopy(entry)
+
+    def put(self, content_hash: Optional[str], data: Dict[str, Any], line_items: List[Dict[str, Any]]) -> None:
+        """Cache a successful parse, evicting the least recently used."""
+        if not content_hash or self.max_entries < 1:
+            return
+        entry = copy.deepcopy((data, line_items))
+        with self._lock:
+            self._entries[content_hash] = entry
+            self._entries.move_to_end(content_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def __contains__(self, content_hash: str) -> bool:
+        with self._lock:
+            return content_hash in self._entries
+
+    def clear(self) -> None:
+        """Drop every cached parse."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and current size."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats,
+                        entries=len(self._entries),
+                        max_entries=self.max_entries,
+                        hit_rate=round(self._stats['hits'] / lookups, 3) if lookups else 0.0)
+
+
+parse_cache = ParseCache()
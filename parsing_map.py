@@ -0,0 +1,302 @@
+"""
+AP POR parsing map.
+Declares where each POR field lives in the workbook and compiles that
+declaration into a bounded reading plan.
+"""
+
+import re
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet
+
+from utils import (ParsedSheet, read_ws, find_vertical, find_header_row, get_order_total,
+                   extract_line_items, capitalize_text, stringify, to_float)
+
+# A1-style cell reference, e.g. "C33"
+CELL_REF_RE = re.compile(r'^([A-Z]{1,3})([1-9][0-9]*)$')
+
+# Rows read below a keyword when looking for its value (see find_vertical)
+KEYWORD_LOOKAHEAD = 4
+
+# Template declarations, based on "AP POR PARSING MAP.docx".
+# Add a new entry here when the POR layout changes; the header row
+# fingerprint decides which one applies to an uploaded workbook.
+POR_TEMPLATES: List[Dict[str, Any]] = [
+    {
+        'name': 'AP POR v1',
+        'header_row': 4,
+        'headers': {
+            'A': 'JOB / CONTRACT No.',
+            'B': 'OP No.',
+            'C': 'MATERIAL / SERVICE DESCRIPTION',
+            'G': 'QUANTITY',
+            'H': 'PRICE EACH £',
+            'I': 'LINE TOTAL',
+        },
+        'cells': {
+            'ship_project_name': 'B2',
+            'supplier': 'D2',
+            'specification_standards': 'A29',
+            'supplier_contact_name': 'C33',
+            'supplier_contact_email': 'C34',
+            'quote_ref': 'C35',
+            'quote_date': 'C36',
+        },
+        'keywords': {
+            'requestor_name': 'Requestor Name',
+            'date_order_raised': 'Date Order Raised',
+            'order_total': 'ORDER TOTAL',
+        },
+        'line_items': {
+            'rows': (6, 26),
+            'columns': {'job': 'A', 'op': 'B', 'desc': 'C', 'qty': 'G', 'price': 'H', 'ltot': 'I'},
+        },
+    },
+]
+
+
+def column_index(letters: str) -> int:
+    """Convert a column letter ("A", "AB") to its 1-based index."""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+
+def cell_position(ref: str) -> Tuple[int, int]:
+    """Convert an A1-style reference to a 1-based (row, column) tuple."""
+    match = CELL_REF_RE.match(ref.upper())
+    if not match:
+        raise ValueError(f"Invalid cell reference: {ref}")
+    return int(match.group(2)), column_index(match.group(1))
+
+
+def normalize_header(value: Any) -> str:
+    """Normalize a header label for fingerprinting (case, punctuation, spacing)."""
+    if not isinstance(value, str):
+        return ""
+    return re.sub(r'[^A-Z0-9]+', ' ', value.upper()).strip()
+
+
+def header_fingerprint(row: List[Any]) -> FrozenSet[Tuple[int, str]]:
+    """
+    Fingerprint a header row as a set of (column, normalized label) pairs.
+
+    Args:
+        row: Cell values of the header row
+
+    Returns:
+        Frozen set of non-empty labels keyed by 1-based column
+    """
+    return frozenset(
+        (col, label) for col, label in
+        ((col, normalize_header(value)) for col, value in enumerate(row, start=1))
+        if label
+    )
+
+
+class CompiledTemplate:
+    """A single parsing-map template resolved to row/column numbers."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = spec['name']
+        self.header_row = spec['header_row']
+        self.fingerprint = frozenset(
+            (column_index(col), normalize_header(label))
+            for col, label in spec['headers'].items()
+        )
+        self.cells: Dict[str, Tuple[int, int]] = {
+            field: cell_position(ref) for field, ref in spec['cells'].items()
+        }
+        self.keywords: Dict[str, str] = dict(spec['keywords'])
+        self.line_item_rows: Tuple[int, int] = tuple(spec['line_items']['rows'])
+        self.line_item_columns: Dict[str, int] = {
+            key: column_index(col)
+            for key, col in spec['line_items']['columns'].items()
+        }
+
+        # Highest row/column the fixed cells need. Keyword fields have no fixed
+        # row (the footer moves down when users insert line items), so the
+        # reader also keeps going until it has seen each keyword (see read_ws)
+        rows = [self.header_row, self.line_item_rows[1]] + [r for r, _ in self.cells.values()]
+        cols = ([c for c, _ in self.fingerprint] + list(self.line_item_columns.values())
+                + [c for _, c in self.cells.values()])
+        self.max_row = max(rows) + KEYWORD_LOOKAHEAD
+        self.max_column = max(cols)
+        self.lookahead = KEYWORD_LOOKAHEAD
+        self.anchors: FrozenSet[str] = frozenset(keyword.lower() for keyword in self.keywords.values())
+
+    def matches(self, row: List[Any]) -> bool:
+        """Check whether a header row carries this template's labels."""
+        return self.fingerprint <= header_fingerprint(row)
+
+    def find_anchors(self, row: List[Any], pending) -> Dict[str, int]:
+        """
+        Find which of the pending keywords a row contains.
+
+        Args:
+            row: Cell values of one row
+            pending: Lower-cased keywords not seen yet
+
+        Returns:
+            Dict of keyword to the 1-based column it was found in
+        """
+        found = {}
+        for col, value in enumerate(row, start=1):
+            if isinstance(value, str):
+                text = value.lower()
+                for keyword in pending:
+                    if keyword not in found and keyword in text:
+                        found[keyword] = col
+        return found
+
+    def __repr__(self):
+        return f"<CompiledTemplate(name='{self.name}', max_row={self.max_row}, max_column={self.max_column})>"
+
+
+class ParsingPlan:
+    """
+    Compiled set of templates used by read_ws to bound the streaming read.
+
+    The reader checks the header row once it has been streamed and, when a
+    template matches, stops once it is past that template's last fixed row
+    and has seen every keyword label (plus KEYWORD_LOOKAHEAD rows below it).
+    A keyword that never appears means the whole sheet is read.
+    """
+
+    def __init__(self, specs: List[Dict[str, Any]]):
+        if not specs:
+            raise ValueError("Parsing plan needs at least one template")
+        self.templates = [CompiledTemplate(spec) for spec in specs]
+        self.default = self.templates[0]
+        self.fingerprint_row = max(t.header_row for t in self.templates)
+
+    def match(self, rows: List[List[Any]]) -> Optional[CompiledTemplate]:
+        """
+        Pick the template whose header fingerprint matches the rows read so far.
+
+        Args:
+            rows: Rows streamed so far (at least fingerprint_row of them)
+
+        Returns:
+            Matching template, None if the layout is not recognised
+        """
+        for template in self.templates:
+            if template.header_row <= len(rows) and template.matches(rows[template.header_row - 1]):
+                return template
+        return None
+
+
+def compile_plan(specs: List[Dict[str, Any]] = None) -> ParsingPlan:
+    """Compile template declarations into a ParsingPlan."""
+    return ParsingPlan(POR_TEMPLATES if specs is None else specs)
+
+
+# Compiled once at import so every upload shares the same plan
+POR_PLAN = compile_plan()
+
+
+def extract_fields(sheet: ParsedSheet, plan: ParsingPlan = POR_PLAN) -> Dict[str, Any]:
+    """
+    Extract raw POR values from a parsed sheet using the parsing map.
+
+    Falls back to the default template's cell positions and a keyword
+    search for the line-item header when no template was matched.
+
+    Args:
+        sheet: Parsed worksheet (from read_ws)
+        plan: Compiled parsing plan
+
+    Returns:
+        Dictionary of raw field values plus 'line_items' and 'template'
+    """
+    template = sheet.template or plan.default
+
+    fields: Dict[str, Any] = {
+        field: sheet.cell(row, col) for field, (row, col) in template.cells.items()
+    }
+    fields['requestor_name'] = find_vertical(sheet, template.keywords['requestor_name'])
+    fields['date_order_raised'] = find_vertical(sheet, template.keywords['date_order_raised'])
+    fields['order_total'] = get_order_total(sheet, template.keywords['order_total'])
+
+    if sheet.template:
+        header_row = template.header_row
+    else:
+        header_row = find_header_row(sheet, 'MATERIAL')
+
+    start_row, end_row = template.line_item_rows
+    fields['line_items'] = extract_line_items(
+        sheet, header_row,
+        start_row=start_row, end_row=end_row,
+        default_columns=template.line_item_columns
+    ) if header_row else []
+    fields['template'] = sheet.template.name if sheet.template else None
+
+    return fields
+
+
+def build_por_data(sheet: ParsedSheet, plan: ParsingPlan = POR_PLAN) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Turn a parsed sheet into POR column values and line items.
+
+    Has no side effects: the PO number, stored filename and created_at
+    are filled in by the caller once the upload is accepted.
+
+    Args:
+        sheet: Parsed worksheet (from read_ws)
+        plan: Compiled parsing plan
+
+    Returns:
+        Tuple of (data_dict, line_items)
+    """
+    fields = extract_fields(sheet, plan)
+
+    items = fields['line_items']
+    # Capitalize text fields in line items
+    for item in items:
+        item['job'] = capitalize_text(item.get('job'))
+        item['op'] = capitalize_text(item.get('op'))
+        item['desc'] = capitalize_text(item.get('desc'))
+
+    first_item = items[0] if items else {}
+
+    data = {
+        'requestor_name': capitalize_text(fields['requestor_name'] or 'Unknown'),
+        'date_order_raised': fields['date_order_raised'] or datetime.now().strftime('%d/%m/%Y'),
+        'ship_project_name': capitalize_text(fields['ship_project_name'] or 'Unknown'),
+        'supplier': capitalize_text(fields['supplier'] or ''),
+        'job_contract_no': first_item.get('job'),
+        'op_no': first_item.get('op'),
+        'description': first_item.get('desc'),
+        'quantity': first_item.get('qty'),
+        'price_each': to_float(first_item.get('price')),
+        'line_total': to_float(first_item.get('ltot')),
+        'order_total': to_float(fields['order_total']),
+        'specification_standards': capitalize_text(fields['specification_standards'] or ''),
+        'supplier_contact_name': capitalize_text(fields['supplier_contact_name'] or ''),
+        'supplier_contact_email': fields['supplier_contact_email'] or '',  # Keep email in original case
+        'quote_ref': capitalize_text(fields['quote_ref'] or ''),
+        'quote_date': stringify(fields['quote_date']) if fields['quote_date'] else '',  # dd/mm/yyyy
+        'data_summary': "\n".join(str(r) for r in sheet.rows[:10]),
+    }
+
+    return data, items
+
+
+def parse_por_workbook(stream, plan: ParsingPlan = POR_PLAN) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Read a POR workbook and extract its data without side effects.
+
+    Args:
+        stream: Binary file stream of the workbook
+        plan: Compiled parsing plan
+
+    Returns:
+        Tuple of (data_dict, line_items)
+
+    Raises:
+        ValueError: If the workbook cannot be read or is empty
+    """
+    sheet = read_ws(stream, plan)
+    if not sheet:
+        raise ValueError("Empty or invalid Excel file")
+    return build_por_data(sheet, plan)
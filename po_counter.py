@@ -5,8 +5,9 @@ Handles incrementing and persisting Purchase Order numbers.
 
 import os
 import threading
-from typing import Optional
-from models import get_session, BatchCounter, get_or_create_batch_counter
+from typing import Optional, List
+from sqlalchemy import update, select, func
+from models import get_session, BatchCounter
 
 # Configuration
 STARTING_PO = 1000
@@ -67,24 +68,133 @@ class POCounter:
             return True
 
 
-# Global PO counter instance
-_po_counter = POCounter()
+# Global PO counter instance, created on first use so importing this
+# module does not read po_counter.txt
+_po_counter: Optional[POCounter] = None
+
+
+def _get_po_counter() -> POCounter:
+    """Get the global PO counter, loading it from file on first use."""
+    global _po_counter
+    if _po_counter is None:
+        with _counter_lock:
+            if _po_counter is None:
+                _po_counter = POCounter()
+    return _po_counter
 
 
 def get_current_po() -> int:
     """Get current PO number."""
-    return _po_counter.get_current()
+    return _get_po_counter().get_current()
+
+
+def set_current_po(value: int) -> bool:
+    """Set the displayed PO number and persist it to po_counter.txt."""
+    return _get_po_counter().set_value(value)
+
+
+def allocate_po_block(session, count: int) -> List[int]:
+    """
+    Allocate count consecutive PO numbers inside the caller's transaction.
+    
+    Uses a single UPDATE ... RETURNING on the counter row, so the row is
+    locked until the caller commits (or rolls back, releasing the numbers).
+    Concurrent allocators therefore never see the same value, and a failed
+    insert does not burn numbers.
+    
+    Args:
+        session: Open database session; the caller commits
+        count: How many numbers to allocate
+        
+    Returns:
+        Allocated PO numbers in ascending order
+    """
+    if count < 1:
+        return []
+    
+    counter_id = select(func.min(BatchCounter.id)).scalar_subquery()
+    bump = (update(BatchCounter)
+            .where(BatchCounter.id == counter_id)
+            .values(value=BatchCounter.value + count))
+    
+    if session.get_bind().dialect.update_returning:
+        last = session.execute(bump.returning(BatchCounter.value)).scalar()
+    else:
+        # No RETURNING support: take a row lock, then read the bumped value
+        counter = session.query(BatchCounter).with_for_update().order_by(BatchCounter.id).first()
+        last = None
+        if counter:
+            counter.value += count
+            session.flush()
+            last = counter.value
+    
+    if last is None:
+        # First allocation ever: create the counter row (value starts at 1)
+        counter = BatchCounter(value=1 + count)
+        session.add(counter)
+        session.flush()
+        last = counter.value
+    
+    return list(range(last - count + 1, last + 1))
+
+
+def peek_next_po(session) -> int:
+    """Return the PO number the next allocation will get, without reserving it."""
+    last = session.execute(select(BatchCounter.value).order_by(BatchCounter.id).limit(1)).scalar()
+    return (last if last is not None else 1) + 1
+
+
+def advance_po_counter(session, value: int) -> int:
+    """
+    Move the counter up to value (if it is lower) inside the caller's transaction.
+
+    Used after importing PORs with preserved numbers, so new allocations
+    start past the highest imported one. The counter never moves back.
+
+    Returns:
+        The counter value after the update
+    """
+    counter_id = select(func.min(BatchCounter.id)).scalar_subquery()
+    session.execute(update(BatchCounter)
+                    .where(BatchCounter.id == counter_id, BatchCounter.value < value)
+                    .values(value=value))
+    current = session.execute(select(BatchCounter.value).order_by(BatchCounter.id).limit(1)).scalar()
+    if current is None:
+        session.add(BatchCounter(value=value))
+        session.flush()
+        current = value
+    return current
+
+
+def allocate_po(session) -> int:
+    """Allocate the next PO number inside the caller's transaction."""
+    return allocate_po_block(session, 1)[0]
 
 
 def increment_po() -> int:
-    """Increment and return next PO number."""
+    """Increment and return next PO number (in its own transaction)."""
+    return reserve_po_numbers(1)[0]
+
+
+def reserve_po_numbers(count: int) -> List[int]:
+    """
+    Reserve a block of count consecutive PO numbers in its own transaction.
+    
+    Intended for bulk imports that hand each worker a range of numbers;
+    numbers reserved this way are consumed even if the caller never uses them.
+    """
+    if count < 1:
+        return []
     session = get_session()
-    counter = get_or_create_batch_counter(session)
-    counter.value += 1
-    session.commit()
-    po_number = counter.value
-    session.close()
-    return po_number
+    try:
+        po_numbers = allocate_po_block(session, count)
+        session.commit()
+        return po_numbers
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 
 def set_po_value(value: int) -> bool:
@@ -104,10 +214,16 @@ def set_po_value(value: int) -> bool:
 
 
 # Backward compatibility
-current_po = get_current_po()
 po_counter_path = PO_COUNTER_PATH
 
 
+def __getattr__(name: str):
+    # ``current_po`` used to be read from file at import; resolve it lazily
+    if name == 'current_po':
+        return get_current_po()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == '__main__':
     # Test the counter
     print(f"Current PO: {get_current_po()}")
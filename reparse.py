@@ -0,0 +1,302 @@
+"""
+Re-parse stored POR workbooks.
+When the parser improves, PORs created earlier keep their old
+extractions. This backfill re-reads each POR's stored workbook
+(UPLOAD_FOLDER/POR.filename) in a process pool, diffs the result against
+the POR and LineItem rows and applies the changes one batch per
+transaction. Progress is checkpointed after every committed batch, so an
+interrupted run picks up where it stopped:
+
+    python reparse.py --dry-run --report diff.jsonl   # report only
+    python reparse.py                                 # apply (resumes from the checkpoint)
+    python reparse.py --restart                       # ignore the checkpoint
+"""
+
+import os
+import json
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from config import UPLOAD_FOLDER, BULK_WORKERS, REPARSE_BATCH_SIZE, REPARSE_CHECKPOINT_PATH
+from utils import to_float
+
+logger = logging.getLogger(__name__)
+
+# POR columns filled from the workbook (the rest are set on upload or edited in the app)
+REPARSE_FIELDS = ('requestor_name', 'date_order_raised', 'ship_project_name', 'supplier',
+                  'job_contract_no', 'op_no', 'description', 'quantity', 'price_each', 'line_total',
+                  'order_total', 'specification_standards', 'supplier_contact_name',
+                  'supplier_contact_email', 'quote_ref', 'quote_date', 'data_summary')
+
+
+def _line_item_values(item: Dict[str, Any]) -> Dict[str, Any]:
+    """LineItem column values for a parsed line item, as save_por_to_database stores them."""
+    return {
+        'job_contract_no': item.get('job'),
+        'op_no': item.get('op'),
+        'description': item.get('desc'),
+        'quantity': item.get('qty'),
+        'price_each': to_float(item.get('price')),
+        'line_total': to_float(item.get('ltot')),
+    }
+
+
+def _same(old: Any, new: Any) -> bool:
+    """Compare a stored value with a parsed one, ignoring empty/None and int/float differences."""
+    if old in (None, '') and new in (None, ''):
+        return True
+    if old == new:
+        return True
+    try:
+        return float(old) == float(new)
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_parser_default(field: str, value: Any) -> bool:
+    """True if the parser fell back to a placeholder, which must not overwrite stored data."""
+    if field in ('requestor_name', 'ship_project_name'):
+        return value == 'Unknown'
+    if field == 'date_order_raised':
+        return value == datetime.now().strftime('%d/%m/%Y')
+    return False
+
+
+def diff_por(por, data: Dict[str, Any], items: List[Dict[str, Any]],
+             fields=REPARSE_FIELDS, line_items: bool = True) -> Dict[str, Any]:
+    """
+    Compare a POR with a fresh parse of its workbook.
+
+    Line items are matched by position (in id order), so unchanged rows
+    keep their ids.
+
+    Args:
+        por: POR with its line_items loaded
+        data: Parsed POR values (from parse_por_workbook)
+        items: Parsed line items
+        fields: POR columns to compare
+        line_items: Whether to compare line items
+
+    Returns:
+        Dict with 'fields' ({name: [old, new]}) and 'line_items'
+        ({'updated': [[id, {name: [old, new]}]], 'added': [values], 'removed': [ids]})
+    """
+    field_changes = {}
+    for field in fields:
+        old, new = getattr(por, field), data.get(field)
+        if not _same(old, new) and not _is_parser_default(field, new):
+            field_changes[field] = [old, new]
+
+    item_changes = {'updated': [], 'added': [], 'removed': []}
+    if line_items:
+        existing = sorted(por.line_items, key=lambda item: item.id)
+        parsed = [_line_item_values(item) for item in items]
+        for line_item, values in zip(existing, parsed):
+            changes = {name: [getattr(line_item, name), value] for name, value in values.items()
+                       if not _same(getattr(line_item, name), value)}
+            if changes:
+                item_changes['updated'].append([line_item.id, changes])
+        item_changes['added'] = parsed[len(existing):]
+        item_changes['removed'] = [line_item.id for line_item in existing[len(parsed):]]
+    return {'fields': field_changes, 'line_items': item_changes}
+
+
+def has_changes(diff: Dict[str, Any]) -> bool:
+    """True if diff_por found anything to apply."""
+    return bool(diff['fields']) or any(diff['line_items'].values())
+
+
+def apply_diff(session, por, diff: Dict[str, Any]) -> None:
+    """Apply a diff_por result to a POR in the caller's transaction."""
+    from models import LineItem
+
+    for field, (_, new) in diff['fields'].items():
+        setattr(por, field, new)
+    by_id = {line_item.id: line_item for line_item in por.line_items}
+    for item_id, changes in diff['line_items']['updated']:
+        for name, (_, new) in changes.items():
+            setattr(by_id[item_id], name, new)
+    for item_id in diff['line_items']['removed']:
+        session.delete(by_id[item_id])
+    for values in diff['line_items']['added']:
+        session.add(LineItem(por_id=por.id, **values))
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """Read a checkpoint written by save_checkpoint, or a fresh one if there is none."""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'last_id': 0, 'counts': {}}
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """Write the checkpoint atomically, so an interruption never leaves a partial file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, path)
+
+
+def reparse_pors(session, dry_run: bool = False, workers: int = BULK_WORKERS,
+                 batch_size: int = REPARSE_BATCH_SIZE, checkpoint_path: Optional[str] = REPARSE_CHECKPOINT_PATH,
+                 fields=REPARSE_FIELDS, line_items: bool = True, report=None,
+                 limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Re-parse every POR's stored workbook and apply (or report) the differences.
+
+    PORs are walked in id order. Each batch is parsed in the pool and its
+    changes committed in one transaction, then the checkpoint records the
+    last id done; a later run with the same checkpoint_path resumes after
+    it. The checkpoint is removed once the walk completes. Dry runs never
+    write to the database or the checkpoint.
+
+    Args:
+        session: Database session
+        dry_run: Report differences without applying them
+        workers: Parser processes (1 parses in-process)
+        batch_size: PORs per batch / transaction
+        checkpoint_path: Checkpoint file; None disables checkpointing
+        fields: POR columns to compare
+        line_items: Whether to compare line items
+        report: Text stream receiving one JSON line per POR that differs or failed
+        limit: Stop after this many PORs (for trying a run out)
+
+    Returns:
+        Counts of 'checked', 'changed', 'unchanged', 'missing' and 'failed' PORs
+    """
+    from bulk_upload import ParserPool, parse_workbook_file
+    from models import POR
+    from search import index_pors
+    from view_cache import bump_data_generation
+
+    checkpoint_path = None if dry_run else checkpoint_path
+    checkpoint = load_checkpoint(checkpoint_path)
+    counts = {key: checkpoint['counts'].get(key, 0) for key in ('checked', 'changed', 'unchanged', 'missing', 'failed')}
+    last_id = checkpoint['last_id']
+    if last_id:
+        logger.info(f"Resuming after POR id {last_id}")
+
+    parser = ParserPool(workers)
+    remaining = limit
+    completed = False
+    try:
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            batch = session.execute(select(POR.id, POR.filename)
+                                    .where(POR.id > last_id)
+                                    .order_by(POR.id)
+                                    .limit(size)).all()
+            if not batch:
+                completed = True
+                break
+
+            paths = {por_id: os.path.join(UPLOAD_FOLDER, filename) for por_id, filename in batch}
+            present = [por_id for por_id, _ in batch if os.path.isfile(paths[por_id])]
+            parsed = dict(zip(present, parser.map(parse_workbook_file, [paths[por_id] for por_id in present])))
+
+            pors = session.scalars(select(POR)
+                                   .where(POR.id.in_([por_id for por_id, _ in batch]))
+                                   .options(selectinload(POR.line_items))
+                                   .order_by(POR.id)).all()
+            changed_ids = []
+            for por in pors:
+                counts['checked'] += 1
+                entry = {'por_id': por.id, 'po_number': por.po_number, 'filename': por.filename}
+                if por.id not in parsed:
+                    counts['missing'] += 1
+                    entry['status'] = 'missing'
+                else:
+                    ok, error, data, items = parsed[por.id]
+                    if not ok:
+                        counts['failed'] += 1
+                        entry.update(status='failed', error=error)
+                    else:
+                        diff = diff_por(por, data, items, fields, line_items)
+                        if not has_changes(diff):
+                            counts['unchanged'] += 1
+                            continue
+                        counts['changed'] += 1
+                        entry.update(status='changed', **diff)
+                        if not dry_run:
+                            apply_diff(session, por, diff)
+                            changed_ids.append(por.id)
+                if report is not None:
+                    report.write(json.dumps(entry, default=str) + "\n")
+
+            if changed_ids:
+                session.flush()
+                index_pors(session, changed_ids)
+                bump_data_generation(session)
+            if dry_run:
+                session.rollback()
+            else:
+                session.commit()
+
+            last_id = batch[-1][0]
+            if remaining is not None:
+                remaining -= len(batch)
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, {'last_id': last_id, 'counts': counts})
+            logger.info(f"Re-parsed up to POR id {last_id}: {counts}")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        parser.close()
+
+    if completed and checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse stored POR workbooks and update changed extractions")
+    parser.add_argument('--dry-run', action='store_true', help="report differences without applying them")
+    parser.add_argument('--report', help="write one JSON line per differing or failed POR to this file")
+    parser.add_argument('--workers', type=int, default=BULK_WORKERS, help="parser processes")
+    parser.add_argument('--batch-size', type=int, default=REPARSE_BATCH_SIZE, help="PORs per transaction")
+    parser.add_argument('--checkpoint', default=REPARSE_CHECKPOINT_PATH, help="checkpoint file used to resume")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--fields', help="comma-separated POR columns to compare (default: all parsed columns)")
+    parser.add_argument('--skip-line-items', action='store_true', help="leave line items as they are")
+    parser.add_argument('--limit', type=int, help="stop after this many PORs")
+    args = parser.parse_args()
+
+    fields = REPARSE_FIELDS
+    if args.fields:
+        fields = tuple(field.strip() for field in args.fields.split(',') if field.strip())
+        unknown = set(fields) - set(REPARSE_FIELDS)
+        if unknown:
+            parser.error(f"unknown field(s): {', '.join(sorted(unknown))}")
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    from models import get_session, init_database
+    init_database()
+    db_session = get_session()
+    resuming = not args.dry_run and os.path.exists(args.checkpoint)
+    report = open(args.report, 'a' if resuming else 'w') if args.report else None
+    try:
+        counts = reparse_pors(db_session, dry_run=args.dry_run, workers=max(1, args.workers),
+                              batch_size=max(1, args.batch_size), checkpoint_path=args.checkpoint,
+                              fields=fields, line_items=not args.skip_line_items, report=report,
+                              limit=args.limit)
+    finally:
+        if report is not None:
+            report.close()
+        db_session.close()
+
+    action = "would change" if args.dry_run else "changed"
+    print(f"✅ Checked {counts['checked']} POR(s): {counts['changed']} {action}, {counts['unchanged']} unchanged, "
+          f"{counts['missing']} missing workbook(s), {counts['failed']} failed to parse")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,196 @@
+"""
+POR full-text search.
+Keeps one search document per POR (header fields plus every line item's
+description and job/op numbers) in a text index: an FTS5 table on SQLite,
+a tsvector column with a GIN index on Postgres. Other databases fall
+back to LIKE matching on the POR header.
+"""
+
+import re
+import logging
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text, Integer, Float
+from sqlalchemy.orm import selectinload
+
+from models import POR
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'por_search'
+REINDEX_BATCH_SIZE = 500
+
+# POR header fields included in the search document
+POR_SEARCH_FIELDS = ['po_number', 'requestor_name', 'ship_project_name', 'supplier',
+                     'job_contract_no', 'op_no', 'description', 'quote_ref']
+# Line item fields included in the search document
+LINE_ITEM_SEARCH_FIELDS = ['job_contract_no', 'op_no', 'description']
+
+# Letter/digit runs; matches how both index tokenizers split text
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def search_backend(bind) -> Optional[str]:
+    """Return 'sqlite' or 'postgresql' if the database has a text index, else None."""
+    name = bind.dialect.name
+    return name if name in ('sqlite', 'postgresql') else None
+
+
+def init_search_index(engine) -> None:
+    """Create the search index if missing and fill it on first use."""
+    backend = search_backend(engine)
+    if not backend:
+        return
+    with engine.begin() as conn:
+        if backend == 'sqlite':
+            # rowid is the POR id
+            conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                              f"USING fts5(document, tokenize='unicode61')"))
+        else:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                              f"por_id INTEGER PRIMARY KEY REFERENCES por(id) ON DELETE CASCADE, "
+                              f"document TSVECTOR NOT NULL)"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+                              f"ON {SEARCH_TABLE} USING GIN (document)"))
+        indexed = conn.execute(text(f"SELECT 1 FROM {SEARCH_TABLE} LIMIT 1")).first()
+        has_pors = conn.execute(text("SELECT 1 FROM por LIMIT 1")).first()
+
+    if has_pors and not indexed:
+        from models import get_session
+        session = get_session()
+        try:
+            count = rebuild_search_index(session)
+            logger.info(f"Built search index for {count} POR(s)")
+        finally:
+            session.close()
+
+
+def build_search_document(por: POR) -> str:
+    """Concatenate the searchable text of a POR and its line items."""
+    parts = [getattr(por, field) for field in POR_SEARCH_FIELDS]
+    for item in por.line_items:
+        parts.extend(getattr(item, field) for field in LINE_ITEM_SEARCH_FIELDS)
+    return ' '.join(str(part) for part in parts if part not in (None, ''))
+
+
+def index_pors(session, por_ids: Iterable[int]) -> None:
+    """
+    Refresh the search documents of the given PORs in the caller's transaction.
+
+    Call after flushing inserts or edits of PORs or their line items; the
+    caller commits.
+    """
+    backend = search_backend(session.get_bind())
+    por_ids = sorted(set(por_ids))
+    if not backend or not por_ids:
+        return
+
+    session.flush()
+    pors = (session.query(POR)
+            .options(selectinload(POR.line_items))
+            .filter(POR.id.in_(por_ids))
+            .all())
+    documents = [{'por_id': por.id, 'document': build_search_document(por)} for por in pors]
+
+    if backend == 'sqlite':
+        session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :por_id"),
+                        [{'por_id': por_id} for por_id in por_ids])
+        if documents:
+            session.execute(text(f"INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (:por_id, :document)"),
+                            documents)
+    elif documents:
+        session.execute(text(f"INSERT INTO {SEARCH_TABLE} (por_id, document) "
+                             f"VALUES (:por_id, to_tsvector('simple', :document)) "
+                             f"ON CONFLICT (por_id) DO UPDATE SET document = EXCLUDED.document"),
+                        documents)
+
+
+def rebuild_search_index(session) -> int:
+    """Re-index every POR in batches; returns the number indexed."""
+    if not search_backend(session.get_bind()):
+        return 0
+    session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    last_id, total = 0, 0
+    while True:
+        ids = [row.id for row in session.query(POR.id)
+               .filter(POR.id > last_id)
+               .order_by(POR.id)
+               .limit(REINDEX_BATCH_SIZE)]
+        if not ids:
+            break
+        index_pors(session, ids)
+        session.commit()
+        session.expunge_all()
+        last_id, total = ids[-1], total + len(ids)
+    return total
+
+
+def search_tokens(query: str) -> List[str]:
+    """Split a search box query into index tokens."""
+    return TOKEN_RE.findall(query.lower())
+
+
+def search_matches(session, query: str):
+    """
+    Build a (por_id, rank) subquery of PORs matching every token of query.
+
+    Tokens match as prefixes, so "12" finds PO 1234. Lower rank is a
+    better match on every backend.
+
+    Returns:
+        Subquery, or None if the database has no text index or the
+        query has no searchable tokens
+    """
+    backend = search_backend(session.get_bind())
+    tokens = search_tokens(query)
+    if not backend or not tokens:
+        return None
+
+    if backend == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        statement = text(f"SELECT rowid AS por_id, bm25({SEARCH_TABLE}) AS rank "
+                         f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match")
+    else:
+        match = ' & '.join(f"{token}:*" for token in tokens)
+        statement = text(f"SELECT por_id, -ts_rank(document, to_tsquery('simple', :match)) AS rank "
+                         f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', :match)")
+    return (statement
+            .bindparams(match=match)
+            .columns(por_id=Integer, rank=Float)
+            .subquery('search_matches'))
+
+
+def apply_search(session, query, search_query: str):
+    """
+    Restrict a POR query (ORM Query or Core select) to PORs matching search_query.
+
+    Uses the text index where there is one, otherwise substring matching
+    on the POR header.
+
+    Returns:
+        Tuple of (query, matches); matches is the (por_id, rank) subquery
+        joined in, or None when LIKE matching was used or nothing was searched
+    """
+    if not search_query:
+        return query, None
+    matches = search_matches(session, search_query)
+    if matches is not None:
+        return query.join(matches, matches.c.por_id == POR.id), matches
+    search_term = f"%{search_query}%"
+    return query.filter(
+        POR.po_number.like(search_term) |
+        POR.requestor_name.like(search_term) |
+        POR.job_contract_no.like(search_term) |
+        POR.op_no.like(search_term) |
+        POR.description.like(search_term)
+    ), None
+
+
+if __name__ == '__main__':
+    from models import get_session, init_database
+    init_database()
+    db_session = get_session()
+    try:
+        print(f"✅ Indexed {rebuild_search_index(db_session)} POR(s)")
+    finally:
+        db_session.close()
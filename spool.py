@@ -0,0 +1,105 @@
+"""
+Upload spooling.
+Multipart file parts are streamed by Werkzeug straight into temporary
+files in the uploads volume and hashed (SHA-256) as they are written.
+Later stages take the file over by path, so storing an upload is a
+rename rather than another copy, and nothing re-reads it to hash it.
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import Optional, Tuple
+
+from config import UPLOAD_FOLDER
+
+# Spooled uploads waiting to be processed or stored
+SPOOL_FOLDER = os.path.join(UPLOAD_FOLDER, 'queue')
+
+
+class SpooledUpload:
+    """
+    Temporary file in SPOOL_FOLDER that hashes everything written to it.
+
+    Behaves like the file object it wraps. Closing it deletes the file
+    unless claim() has handed it over first, so uploads a request never
+    stored are cleaned up when Werkzeug closes the request's files.
+    """
+
+    def __init__(self, suffix: str = ''):
+        os.makedirs(SPOOL_FOLDER, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=SPOOL_FOLDER, suffix=suffix)
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self._claimed = False
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def close(self) -> None:
+        """Close the file, deleting it unless it was claimed."""
+        self._file.close()
+        if not self._claimed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def hexdigest(self) -> str:
+        """SHA-256 of everything written so far."""
+        return self._hash.hexdigest()
+
+    def claim(self) -> Tuple[str, str, int]:
+        """
+        Take ownership of the spooled file; the caller must move or delete it.
+
+        Returns:
+            Tuple of (path, sha256 hex digest, size in bytes)
+        """
+        self._claimed = True
+        self._file.close()
+        return self.path, self._hash.hexdigest(), self.size
+
+
+def spool_stream_factory(total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None) -> SpooledUpload:
+    """Werkzeug stream factory that spools each uploaded file with SpooledUpload."""
+    return SpooledUpload(os.path.splitext(filename or '')[1].lower())
+
+
+def spooled_hash(file) -> Optional[str]:
+    """SHA-256 of an uploaded file spooled by spool_stream_factory, None for other files."""
+    return file.stream.hexdigest() if isinstance(file.stream, SpooledUpload) else None
+
+
+def claim_upload(file) -> Tuple[str, str, int]:
+    """
+    Take over an uploaded file's spool file.
+
+    Files that were not spooled by spool_stream_factory (e.g. built in
+    code) are copied into a spool file first.
+
+    Args:
+        file: Uploaded FileStorage
+
+    Returns:
+        Tuple of (path, sha256 hex digest, size in bytes); the caller must
+        move or delete the file
+    """
+    if isinstance(file.stream, SpooledUpload):
+        return file.stream.claim()
+    spooled = SpooledUpload(os.path.splitext(file.filename or '')[1].lower())
+    try:
+        file.stream.seek(0)
+        shutil.copyfileobj(file.stream, spooled)
+    except Exception:
+        spooled.close()
+        raise
+    return spooled.claim()
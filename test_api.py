@@ -0,0 +1,47 @@
+"""
+Test script to verify the JSON API pages PORs and answers conditional GETs.
+"""
+
+from models import POR, get_session, init_database
+from view_cache import bump_data_generation
+from test_pagination import TEST_PO_START, TEST_RECORDS, create_test_records, delete_test_records
+
+
+def test_api_pages_and_revalidates():
+    """Cursor pages cover every record once; a matching ETag gets a 304 until the next write."""
+    from app import app
+
+    init_database()
+    session = get_session()
+    try:
+        delete_test_records(session)
+        create_test_records(session)
+        client = app.test_client()
+
+        seen, cursor = [], None
+        while True:
+            url = '/api/v1/pors?limit=7&requestor_name=Test User' + (f'&cursor={cursor}' if cursor else '')
+            data = client.get(url).get_json()
+            seen.extend(por['po_number'] for por in data['pors'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        assert seen == list(range(TEST_PO_START + TEST_RECORDS - 1, TEST_PO_START - 1, -1))
+
+        por_id = session.query(POR.id).filter(POR.po_number == TEST_PO_START).scalar()
+        response = client.get(f'/api/v1/pors/{por_id}')
+        assert len(response.get_json()['por']['line_items']) == 3
+        etag = response.headers['ETag']
+        assert client.get(f'/api/v1/pors/{por_id}', headers={'If-None-Match': etag}).status_code == 304
+
+        bump_data_generation(session)
+        session.commit()
+        assert client.get(f'/api/v1/pors/{por_id}', headers={'If-None-Match': etag}).status_code == 200
+    finally:
+        delete_test_records(session)
+        session.close()
+
+
+if __name__ == '__main__':
+    test_api_pages_and_revalidates()
+    print("✅ API tests passed")
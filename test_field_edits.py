@@ -0,0 +1,48 @@
+"""
+Test script to verify batched inline edits apply in one request with per-change results.
+"""
+
+from models import POR, LineItem, get_session, init_database
+from test_pagination import TEST_PO_START, count_queries, create_test_records, delete_test_records
+
+
+def test_batch_edits_report_per_change():
+    """Valid edits are applied together; invalid ones are reported without blocking the rest."""
+    from app import app
+
+    init_database()
+    session = get_session()
+    try:
+        delete_test_records(session)
+        create_test_records(session)
+        por = session.query(POR).filter(POR.po_number == TEST_PO_START).one()
+        item_ids = [item.id for item in por.line_items]
+        session.commit()
+
+        changes = [{'entity': 'line_item', 'id': item_id, 'field': 'quantity', 'value': '4'} for item_id in item_ids]
+        changes += [
+            {'entity': 'por', 'id': por.id, 'field': 'supplier', 'value': 'Batch Supplier'},
+            {'entity': 'por', 'id': por.id, 'field': 'po_number', 'value': '1'},
+            {'entity': 'line_item', 'id': item_ids[0], 'field': 'price_each', 'value': 'abc'},
+            {'entity': 'line_item', 'id': 10 ** 9, 'field': 'description', 'value': 'x'},
+        ]
+        client = app.test_client()
+        result = {}
+        queries = count_queries(lambda: result.update(client.post('/update_fields', json={'changes': changes}).get_json()))
+
+        assert [r['success'] for r in result['results']] == [True] * len(item_ids) + [True, False, False, False]
+        assert result['results'][-1]['error'] == 'Line item not found'
+        assert queries <= 12
+
+        session.expire_all()
+        assert session.get(POR, por.id).supplier == 'Batch Supplier'
+        assert {session.get(LineItem, item_id).quantity for item_id in item_ids} == {4}
+        assert client.get('/api/v1/pors?q=Batch Supplier').get_json()['pors'][0]['id'] == por.id
+    finally:
+        delete_test_records(session)
+        session.close()
+
+
+if __name__ == '__main__':
+    test_batch_edits_report_per_change()
+    print("✅ Field edit tests passed")
@@ -0,0 +1,138 @@
+"""
+Test script to verify the records view loads a page in a constant number of queries.
+"""
+
+from datetime import datetime, timezone
+from sqlalchemy import event
+from models import POR, PORFile, LineItem, engine, get_session, init_database
+from search import index_pors
+
+TEST_PO_START = 990000
+TEST_RECORDS = 30
+PAGE_SIZES = [5, 10, 25]
+
+
+def count_queries(func):
+    """Run func and return how many SQL statements it executed."""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_execute)
+    return len(statements)
+
+
+def create_test_records(session):
+    """Create PORs with line items and attachments."""
+    for i in range(TEST_RECORDS):
+        por = POR(
+            po_number=TEST_PO_START + i,
+            requestor_name='Test User',
+            date_order_raised='01/01/2025',
+            filename=f'test_{i}.xlsx',
+            created_at=datetime.now(timezone.utc)
+        )
+        por.line_items = [LineItem(description=f'Item {n}', quantity=1) for n in range(3)]
+        por.attached_files = [
+            PORFile(original_filename=f'file_{n}.pdf', stored_filename=f'test_{i}_{n}.pdf',
+                    file_type='other', file_size=1)
+            for n in range(i % 3)
+        ]
+        session.add(por)
+    session.flush()
+    index_pors(session, [por.id for por in session.query(POR).filter(POR.po_number >= TEST_PO_START)])
+    session.commit()
+
+
+def delete_test_records(session):
+    """Remove the records created by create_test_records."""
+    for por in session.query(POR).filter(POR.po_number >= TEST_PO_START).all():
+        session.delete(por)
+    session.commit()
+
+
+def test_paginated_records_query_count():
+    """The number of queries per page must not grow with the page size."""
+    from app import app, get_paginated_records
+
+    init_database()
+    session = get_session()
+    try:
+        delete_test_records(session)
+        create_test_records(session)
+
+        counts = {}
+        for per_page in PAGE_SIZES:
+            with app.test_request_context('/view'):
+                result = {}
+
+                def load_page():
+                    records, _ = get_paginated_records(1, 'Test User', per_page=per_page)
+                    # Touch everything the template renders
+                    result['items'] = sum(len(r.line_items) for r in records)
+                    result['files'] = sum(r.file_count for r in records)
+                    result['links'] = sum(len(r.files) for r in records)
+                    result['records'] = len(records)
+
+                counts[per_page] = count_queries(load_page)
+                assert result['records'] == per_page
+                assert result['items'] == per_page * 3
+                assert result['files'] == result['links']
+
+        print(f"Queries per page size: {counts}")
+        assert len(set(counts.values())) == 1, f"Query count grows with page size: {counts}"
+        print("✅ Paginated records load in a constant number of queries")
+    finally:
+        session.rollback()
+        delete_test_records(session)
+        session.close()
+
+
+def test_cursor_pages_match_page_numbers():
+    """Walking next/prev cursors visits the same records as the page numbers (unsearched list)."""
+    from app import app, get_paginated_records
+
+    init_database()
+    session = get_session()
+    try:
+        delete_test_records(session)
+        create_test_records(session)
+
+        with app.test_request_context('/view'):
+            per_page = 7
+            page_ids = []
+            _, info = get_paginated_records(1, per_page=per_page)
+            for page in range(1, info['total_pages'] + 1):
+                records, _ = get_paginated_records(page, per_page=per_page)
+                page_ids.append([r.id for r in records])
+
+            # Forward from page 1 with next cursors
+            records, info = get_paginated_records(1, per_page=per_page)
+            forward = [[r.id for r in records]]
+            while info['has_next']:
+                records, info = get_paginated_records(1, per_page=per_page, cursor=info['next_cursor'])
+                forward.append([r.id for r in records])
+            assert forward == page_ids
+
+            # And back again with prev cursors
+            backward = [forward[-1]]
+            while info['has_prev']:
+                records, info = get_paginated_records(1, per_page=per_page, cursor=info['prev_cursor'])
+                backward.append([r.id for r in records])
+            assert backward[::-1] == page_ids
+
+        print("✅ Cursor pagination matches page-number pagination")
+    finally:
+        session.rollback()
+        delete_test_records(session)
+        session.close()
+
+
+if __name__ == '__main__':
+    test_paginated_records_query_count()
+    test_cursor_pages_match_page_numbers()
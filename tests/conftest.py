@@ -0,0 +1,62 @@
+"""
+Shared setup for the tests in this directory.
+
+Tests run against a throwaway SQLite file rather than the shared por.db.
+DATABASE_URL is set here, when pytest loads this file and before any
+test module imports models (the engine is built at import).
+"""
+
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The app's modules live at the repository root; the workbook generator in benchmarks/
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+TEST_DIR = tempfile.mkdtemp(prefix='por_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+# Tests run queued uploads themselves (jobs.run_next_job)
+os.environ['UPLOAD_WORKERS'] = '0'
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the test from an empty directory, so static/uploads (relative to it) starts empty."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('static/uploads')
+    return tmp_path
+
+
+# PO numbers for records made by make_por, clear of the counter and other tests
+_po_numbers = itertools.count(880000)
+
+
+@pytest.fixture
+def make_por():
+    """Factory inserting a bare POR record and returning its id."""
+    from models import POR, get_session, init_database
+
+    init_database()
+
+    def make(**values):
+        session = get_session()
+        try:
+            por = POR(**dict({'po_number': next(_po_numbers), 'requestor_name': 'Test User',
+                              'date_order_raised': '01/01/2025', 'filename': 'test.xlsx',
+                              'created_at': datetime.now(timezone.utc)}, **values))
+            session.add(por)
+            session.commit()
+            return por.id
+        finally:
+            session.close()
+    return make
@@ -0,0 +1,80 @@
+"""
+Test script to verify attachments share reference-counted blobs and failed attaches leave none behind.
+"""
+
+import hashlib
+import io
+import os
+
+from models import AttachmentBlob, PORFile, get_session
+from blob_store import blob_path, ATTACHMENT_FOLDER
+
+CONTENT = b'%PDF-1.4 shared attachment'
+
+
+def attach(client, por_id, *names, content=CONTENT):
+    return client.post(f'/attach-files/{por_id}', content_type='multipart/form-data',
+                       data={'files': [(io.BytesIO(content), name) for name in names],
+                             'file_types': ['quote'] * len(names)})
+
+
+def blob_files():
+    return sorted(name for _, _, names in os.walk(ATTACHMENT_FOLDER) for name in names)
+
+
+def test_shared_blob_is_deleted_with_its_last_reference(workdir, make_por):
+    """Two attachments of the same bytes share one blob; each delete drops a reference."""
+    from app import app
+
+    client = app.test_client()
+    first, second = make_por(), make_por()
+    attach(client, first, 'quote.pdf')
+    attach(client, second, 'copy of quote.pdf')
+
+    sha256 = hashlib.sha256(CONTENT).hexdigest()
+    session = get_session()
+    try:
+        file_ids = [row.id for row in session.query(PORFile.id).filter(PORFile.content_hash == sha256)]
+        assert len(file_ids) == 2
+        assert session.get(AttachmentBlob, sha256).ref_count == 2
+        assert blob_files() == [sha256]
+        assert client.get(f'/download-file/{file_ids[1]}').data == CONTENT
+
+        client.post(f'/delete-file/{file_ids[0]}')
+        session.expire_all()
+        assert session.get(AttachmentBlob, sha256).ref_count == 1
+        assert os.path.exists(blob_path(sha256))
+
+        client.post(f'/delete-file/{file_ids[1]}')
+        session.expire_all()
+        assert session.get(AttachmentBlob, sha256) is None
+        assert blob_files() == []
+    finally:
+        session.close()
+
+
+def test_failed_attach_leaves_no_blob(workdir, make_por, monkeypatch):
+    """A blob placed by an attach whose transaction rolls back is removed again."""
+    import app as app_module
+
+    def fail(session):
+        raise RuntimeError("commit failed")
+
+    client = app_module.app.test_client()
+    por_id = make_por()
+    content = b'%PDF-1.4 never stored'
+    bump_data_generation = app_module.bump_data_generation
+    monkeypatch.setattr(app_module, 'bump_data_generation', fail)
+    attach(client, por_id, 'quote.pdf', content=content)
+    client.post(f'/attach_email/{por_id}', content_type='multipart/form-data',
+                data={'file': (io.BytesIO(b'Subject: quote\n\nbody'), 'quote.eml')})
+    assert blob_files() == []
+
+    monkeypatch.setattr(app_module, 'bump_data_generation', bump_data_generation)
+    attach(client, por_id, 'quote.pdf', content=content)
+    session = get_session()
+    try:
+        assert session.query(PORFile).filter(PORFile.por_id == por_id).count() == 1
+    finally:
+        session.close()
+    assert len(blob_files()) == 1
@@ -0,0 +1,45 @@
+"""
+Test script to verify bulk uploads re-check duplicates once they hold the PO counter lock.
+"""
+
+import bulk_upload
+from bulk_upload import _entry, process_bulk_upload
+from duplicates import content_hash
+from models import POR, get_session
+from po_counter import peek_next_po
+from workbooks import make_por_workbook
+
+
+def test_file_processed_during_the_upload_is_not_inserted_again(workdir, make_por, monkeypatch):
+    """A copy saved by another submission after the first check is reported, and burns no PO number."""
+    raced, fresh = make_por_workbook(lines=3, seed=201), make_por_workbook(lines=3, seed=202)
+    parse_entries = bulk_upload.parse_entries
+    state = {}
+
+    def parse_while_another_upload_saves(contents, workers):
+        parsed = parse_entries(contents, 1)
+        # Another submission stores the same workbook between the first check and the insert
+        por_id = make_por(source_hash=content_hash(raced))
+        session = get_session()
+        try:
+            state['po_number'] = session.get(POR, por_id).po_number
+            state['next_po'] = peek_next_po(session)
+        finally:
+            session.close()
+        return parsed
+
+    monkeypatch.setattr(bulk_upload, 'parse_entries', parse_while_another_upload_saves)
+    results = process_bulk_upload([_entry('raced.xlsx', raced), _entry('raced copy.xlsx', raced),
+                                   _entry('fresh.xlsx', fresh)], workers=1)
+
+    assert [r['success'] for r in results] == [True, True, True]
+    assert results[0]['message'] == f"Already processed as PO #{state['po_number']}"
+    assert results[1]['message'] == f"Same file as raced.xlsx (PO #{state['po_number']})"
+    assert results[2]['po_number'] == state['next_po']
+
+    session = get_session()
+    try:
+        assert session.query(POR).filter(POR.source_hash == content_hash(raced)).count() == 1
+        assert session.query(POR).filter(POR.source_hash == content_hash(fresh)).count() == 1
+    finally:
+        session.close()
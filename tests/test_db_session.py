@@ -0,0 +1,45 @@
+"""
+Test script to verify request-scoped sessions give their connections back when the request ends.
+"""
+
+import threading
+
+from sqlalchemy import text
+
+import db
+from db import close_db, get_db, held_connections, pool_stats
+
+
+def test_closing_the_session_returns_the_connection():
+    """A request that used the database ends with nothing checked out and no per-thread entry left."""
+    from app import app
+
+    before = pool_stats()
+    with app.test_request_context('/view'):
+        db._start_request()
+        get_db().execute(text("SELECT 1"))
+        assert held_connections() == 1
+        assert pool_stats()['checked_out'] == before['checked_out'] + 1
+
+        close_db()
+
+        assert held_connections() == 0
+        assert pool_stats()['checked_out'] == 0
+
+    stats = pool_stats()
+    assert stats['checkouts'] == before['checkouts'] + 1
+    assert stats['leaked_requests'] == before['leaked_requests']
+    assert threading.get_ident() not in db._checkouts
+
+
+def test_requests_through_the_app_leave_nothing_checked_out():
+    """Every route closes its session in teardown."""
+    from app import app
+    from models import init_database
+
+    init_database()
+    client = app.test_client()
+    for path in ('/view', '/api/v1/pors'):
+        assert client.get(path).status_code == 200
+        assert pool_stats()['checked_out'] == 0
+    assert threading.get_ident() not in db._checkouts
@@ -0,0 +1,26 @@
+"""
+Test script to verify the bounded workbook read still finds fields below the template's rows.
+"""
+
+import io
+
+from parsing_map import POR_PLAN, build_por_data, parse_por_workbook
+from utils import read_ws
+from workbooks import make_por_workbook
+
+
+def test_footer_below_template_rows_is_read():
+    """Extra line items push the ORDER TOTAL / requestor footer down; it must still be parsed."""
+    content = make_por_workbook(lines=40, junk_rows=2000)
+    data, _ = parse_por_workbook(io.BytesIO(content))
+
+    assert data['order_total'] == 210459.09
+    assert data['requestor_name'] == 'TOM EVANS'
+
+    # Same keyword fields as reading the whole sheet, without reading the junk rows
+    sheet = read_ws(io.BytesIO(content), POR_PLAN)
+    full, _ = build_por_data(read_ws(io.BytesIO(content)))
+    assert sheet.template is not None and sheet.max_row < 100
+    for field in ('order_total', 'requestor_name', 'date_order_raised'):
+        assert data[field] == full[field]
+
@@ -0,0 +1,82 @@
+"""
+Test script to verify uploads are hashed while they spool and stored by moving the spool file.
+"""
+
+import hashlib
+import io
+import os
+
+from models import POR, UploadJob, get_session
+from spool import SPOOL_FOLDER, SpooledUpload
+from workbooks import make_por_workbook
+
+
+def spooled_files():
+    return os.listdir(SPOOL_FOLDER) if os.path.isdir(SPOOL_FOLDER) else []
+
+
+def test_spooled_upload_hashes_what_is_written(workdir):
+    """The digest and size cover every chunk; closing an unclaimed file deletes it."""
+    chunks = [b'first chunk ', b'second chunk ', b'x' * 100000]
+    spooled = SpooledUpload('.xlsx')
+    for chunk in chunks:
+        spooled.write(chunk)
+    path, sha256, size = spooled.claim()
+    spooled.close()
+
+    assert sha256 == hashlib.sha256(b''.join(chunks)).hexdigest()
+    assert size == sum(len(chunk) for chunk in chunks)
+    with open(path, 'rb') as f:
+        assert f.read() == b''.join(chunks)
+
+    unclaimed = SpooledUpload()
+    unclaimed.write(b'abandoned')
+    unclaimed.close()
+    assert not os.path.exists(unclaimed.path)
+    assert spooled_files() == [os.path.basename(path)]
+
+
+def test_upload_is_queued_with_its_hash_and_stored_by_rename(workdir):
+    """POST / hands the spooled file and its hash to the job; processing moves it into place."""
+    from app import app, run_upload_job
+    from jobs import run_next_job
+
+    content = make_por_workbook(lines=5, seed=19)
+    sha256 = hashlib.sha256(content).hexdigest()
+    client = app.test_client()
+    response = client.post('/', data={'file': (io.BytesIO(content), 'por.xlsx')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 302
+
+    session = get_session()
+    try:
+        job = session.query(UploadJob).order_by(UploadJob.id.desc()).first()
+        assert job.content_hash == sha256
+        assert os.path.dirname(os.path.abspath(job.spool_path)) == os.path.abspath(SPOOL_FOLDER)
+        with open(job.spool_path, 'rb') as f:
+            assert f.read() == content
+
+        assert run_next_job(run_upload_job)
+        session.rollback()
+        por = session.query(POR).filter(POR.source_hash == sha256).one()
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], por.filename), 'rb') as f:
+            assert f.read() == content
+        assert spooled_files() == []
+
+        # The same bytes again are recognised from the spool hash, without queueing a job
+        jobs = session.query(UploadJob).count()
+        session.rollback()
+        client.post('/', data={'file': (io.BytesIO(content), 'again.xlsx')}, content_type='multipart/form-data')
+        assert session.query(UploadJob).count() == jobs
+        assert spooled_files() == []
+    finally:
+        session.close()
+
+
+def test_rejected_upload_leaves_no_spool_file(workdir):
+    """A file the request never stores is deleted when the request closes its files."""
+    from app import app
+
+    app.test_client().post('/', data={'file': (io.BytesIO(b'not a workbook'), 'notes.txt')},
+                           content_type='multipart/form-data')
+    assert spooled_files() == []
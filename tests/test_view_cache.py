@@ -0,0 +1,45 @@
+"""
+Test script to verify the data generation is bumped after a write commits, not inside it.
+"""
+
+from sqlalchemy import event
+
+from models import engine, get_session, init_database
+from view_cache import bump_data_generation, get_data_generation
+
+
+def test_generation_bumps_after_commit_only():
+    """Rolled back writes leave the generation alone; committed ones bump it in a separate transaction."""
+    init_database()
+    session = get_session()
+    reader = get_session()
+    try:
+        start = get_data_generation(reader)
+        reader.rollback()
+
+        session.connection()  # the write's transaction
+        bump_data_generation(session)
+        session.rollback()
+        session.commit()
+        assert get_data_generation(reader) == start
+        reader.rollback()
+
+        statements = []
+
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((conn, statement))
+
+        write_conn = session.connection()
+        bump_data_generation(session)
+        event.listen(engine, 'before_cursor_execute', before_execute)
+        try:
+            session.commit()
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_execute)
+        assert get_data_generation(reader) == start + 1
+        # The bump ran after the commit, on a connection of its own
+        assert statements and all('data_generation' in statement and conn is not write_conn
+                                  for conn, statement in statements)
+    finally:
+        reader.close()
+        session.close()
@@ -3,10 +3,54 @@ Utility functions for processing Excel files and extracting POR data.
 """
 
 import re
+import base64
+import binascii
 from datetime import datetime, date
 from typing import List, Dict, Any, Tuple, Optional
-from openpyxl import load_workbook
-from openpyxl.worksheet.worksheet import Worksheet
+from werkzeug.utils import secure_filename
+
+
+def capitalize_text(value):
+    """Capitalize text values, handling None and non-string values."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.upper()
+    return value
+
+
+def make_por_filename(po_number: int, date_order: str, requestor: str) -> str:
+    """Build the stored filename for a processed POR workbook."""
+    return secure_filename(f'PO_{po_number}_{date_order}_{requestor.replace(" ", "_")}.xlsx')
+
+
+CURSOR_DIRECTIONS = ('next', 'prev')
+
+
+def encode_cursor(direction: str, por_id: int) -> str:
+    """Build an opaque keyset cursor: rows after ('next') or before ('prev') por_id."""
+    raw = f"{direction}:{por_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Decode a cursor made by encode_cursor.
+    
+    Returns:
+        Tuple of (direction, por_id)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    direction, _, value = raw.partition(':')
+    if direction not in CURSOR_DIRECTIONS or not value.isdigit():
+        raise ValueError("Invalid cursor")
+    return direction, int(value)
 
 
 def stringify(value: Any) -> str:
@@ -48,52 +92,158 @@ def to_float(value: Any) -> float:
     return 0.0
 
 
-def read_ws(stream) -> Tuple[List[List[Any]], Worksheet]:
+class ParsedSheet:
+    """
+    In-memory grid of worksheet values built from a single streaming pass.
+    
+    Read-only openpyxl worksheets re-stream the sheet XML on every
+    ``ws.cell()`` call, so all extractors read from this grid instead.
+    Rows and columns are 1-based to match openpyxl.
+    """
+    
+    def __init__(self, rows: List[List[Any]], template=None):
+        self.rows = rows
+        self.max_row = len(rows)
+        self.max_column = max((len(row) for row in rows), default=0)
+        # Parsing-map template matched while reading, None if unrecognised
+        self.template = template
+    
+    def __bool__(self) -> bool:
+        return bool(self.rows)
+    
+    def __len__(self) -> int:
+        return self.max_row
+    
+    def cell(self, row: int, column: int) -> Any:
+        """
+        Get the value at (row, column), None if outside the used range.
+        
+        Args:
+            row: 1-based row number
+            column: 1-based column number
+            
+        Returns:
+            Cell value or None
+        """
+        if row < 1 or column < 1 or row > self.max_row:
+            return None
+        values = self.rows[row - 1]
+        return values[column - 1] if column <= len(values) else None
+    
+    def row(self, row: int) -> List[Any]:
+        """Get the values of a 1-based row, empty list if out of range."""
+        if row < 1 or row > self.max_row:
+            return []
+        return self.rows[row - 1]
+
+
+def read_ws(stream, plan=None) -> ParsedSheet:
     """
-    Read Excel worksheet from stream.
+    Read the active Excel worksheet from stream in a single pass.
+    
+    When a parsing plan is given, the header row is fingerprinted as soon
+    as it has been streamed. Reading then stops once it is past the matched
+    template's fixed cells and every keyword label (ORDER TOTAL, Requestor
+    Name, ...) has been seen, with a few rows below the last one for its
+    value, so trailing formatted rows are never parsed. A keyword that is
+    never found means the sheet is read to the end.
     
     Args:
-        stream: File stream
+        stream: File stream, or path of the workbook on disk
+        plan: Optional compiled ParsingPlan (see parsing_map)
         
     Returns:
-        Tuple of (rows, worksheet)
+        ParsedSheet holding the rows read from the active worksheet
         
     Raises:
         ValueError: If file cannot be read
     """
+    from openpyxl import load_workbook  # heavy; only needed once a workbook is read
+    
     try:
-        stream.seek(0)
+        if hasattr(stream, 'seek'):
+            stream.seek(0)
         wb = load_workbook(stream, data_only=True, read_only=True)
-        ws = wb.active
-        
-        if not ws:
-            raise ValueError("No active worksheet found")
+        try:
+            ws = wb.active
+            
+            if not ws:
+                raise ValueError("No active worksheet found")
+            
+            # Single streaming pass; everything after this reads from memory
+            rows = []
+            template = None
+            row_limit = None
+            max_column = None
+            pending = set()  # keyword labels of the matched template not seen yet
+            for values in ws.iter_rows(values_only=True):
+                rows.append(list(values))
+                new_rows = rows[-1:]
+                if plan is not None and len(rows) == plan.fingerprint_row:
+                    template = plan.match(rows)
+                    if template:
+                        row_limit = template.max_row
+                        max_column = template.max_column
+                        pending = set(template.anchors)
+                        # Keywords may sit above the header row too
+                        new_rows = rows
+                if pending:
+                    for row_no, row in enumerate(new_rows, start=len(rows) - len(new_rows) + 1):
+                        found = template.find_anchors(row, pending)
+                        if found:
+                            pending -= found.keys()
+                            # The value is below the label or in the next cell along
+                            row_limit = max(row_limit, row_no + template.lookahead)
+                            max_column = max(max_column, max(found.values()) + 1)
+                if row_limit and not pending and len(rows) >= row_limit:
+                    break
+        finally:
+            wb.close()
         
-        # Convert to list for easier processing
-        rows = [list(row) for row in ws.iter_rows(values_only=True)]
+        if template:
+            rows = [row[:max_column] for row in rows]
         
-        return rows, ws
+        return ParsedSheet(rows, template)
         
     except Exception as e:
         raise ValueError(f"Error reading Excel file: {str(e)}")
 
 
-def find_vertical(rows: List[List[Any]], keyword: str) -> str:
+def find_header_row(sheet: ParsedSheet, keyword: str = 'MATERIAL') -> Optional[int]:
+    """
+    Find the first row containing keyword (case-insensitive).
+    
+    Args:
+        sheet: Parsed worksheet
+        keyword: Header keyword to look for
+        
+    Returns:
+        1-based row number, None if not found
+    """
+    keyword_upper = keyword.upper()
+    for row_idx, row in enumerate(sheet.rows, start=1):
+        if any(isinstance(c, str) and keyword_upper in c.upper() for c in row):
+            return row_idx
+    return None
+
+
+def find_vertical(sheet: ParsedSheet, keyword: str) -> str:
     """
     Find value below keyword in vertical column.
     
     Args:
-        rows: List of rows from worksheet
+        sheet: Parsed worksheet
         keyword: Keyword to search for
         
     Returns:
         Found value as string, empty string if not found
     """
+    rows = sheet.rows
     if not rows:
         return ""
     
     keyword_lower = keyword.lower()
-    max_cols = max(len(row) for row in rows)
+    max_cols = sheet.max_column
     
     for col in range(max_cols):
         for row_idx, row in enumerate(rows):
@@ -109,20 +259,22 @@ def find_vertical(rows: List[List[Any]], keyword: str) -> str:
     return ""
 
 
-def get_order_total(ws: Worksheet) -> float:
+def get_order_total(sheet: ParsedSheet, keyword: str = "ORDER TOTAL") -> float:
     """
     Find order total in worksheet.
     
     Args:
-        ws: Worksheet to search
+        sheet: Parsed worksheet to search
+        keyword: Label next to or above the total
         
     Returns:
         Order total as float, 0.0 if not found
     """
     try:
-        for row_idx, row in enumerate(ws.iter_rows(values_only=True), start=1):
+        keyword_upper = keyword.upper()
+        for row_idx, row in enumerate(sheet.rows, start=1):
             for col_idx, cell in enumerate(row, start=1):
-                if isinstance(cell, str) and "ORDER TOTAL" in cell.upper():
+                if isinstance(cell, str) and keyword_upper in cell.upper():
                     # Check same row
                     for val in row[col_idx:]:
                         if isinstance(val, (int, float)):
@@ -130,12 +282,9 @@ def get_order_total(ws: Worksheet) -> float:
                     
                     # Check next few rows
                     for offset in range(1, 5):
-                        try:
-                            val = ws.cell(row=row_idx + offset, column=col_idx).value
-                            if isinstance(val, (int, float)):
-                                return float(val)
-                        except IndexError:
-                            break
+                        val = sheet.cell(row_idx + offset, col_idx)
+                        if isinstance(val, (int, float)):
+                            return float(val)
         
         return 0.0
         
@@ -143,30 +292,35 @@ def get_order_total(ws: Worksheet) -> float:
         return 0.0
 
 
-def extract_line_items(ws: Worksheet, header_row: int) -> List[Dict[str, Any]]:
+DEFAULT_LINE_ITEM_COLUMNS = {'job': 1, 'op': 2, 'desc': 3, 'qty': 7, 'price': 8, 'ltot': 9}
+
+
+def extract_line_items(sheet: ParsedSheet, header_row: int, start_row: int = 6, end_row: int = 26,
+                       default_columns: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
     """
     Extract line items from worksheet starting at header row.
     
     Args:
-        ws: Worksheet to process
+        sheet: Parsed worksheet to process
         header_row: Row number containing headers
+        start_row: First line item row (parsing map default 6)
+        end_row: Last line item row (parsing map default 26)
+        default_columns: Columns used when a header label is not found
         
     Returns:
         List of line item dictionaries
     """
-    if not header_row or header_row > ws.max_row:
+    if not header_row or header_row > sheet.max_row:
         return []
     
-    # Map column headers to column numbers based on parsing map
-    cols = {}
-    header_cells = ws[header_row]
+    # Map column headers to column numbers, falling back to the parsing map
+    cols = dict(default_columns or DEFAULT_LINE_ITEM_COLUMNS)
     
-    for cell in header_cells:
-        if not isinstance(cell.value, str):
+    for col, value in enumerate(sheet.row(header_row), start=1):
+        if not isinstance(value, str):
             continue
             
-        header = cell.value.upper()
-        col = cell.column
+        header = value.upper()
         
         if "MATERIAL" in header and "DESCRIPTION" in header:
             cols["desc"] = col
@@ -175,7 +329,7 @@ def extract_line_items(ws: Worksheet, header_row: int) -> List[Dict[str, Any]]:
         elif "PRICE" in header and "EACH" in header:
             cols["price"] = col
         elif "LINE TOTAL" in header:
-            cols["ltotal"] = col
+            cols["ltot"] = col
         elif "JOB" in header and "CONTRACT" in header:
             cols["job"] = col
         elif "OP" in header and "NO" in header:
@@ -183,60 +337,52 @@ def extract_line_items(ws: Worksheet, header_row: int) -> List[Dict[str, Any]]:
     
     # Extract line items using parsing map ranges
     items = []
-    
-    # Use the parsing map ranges: rows 6-26 for line items
-    start_row = 6
-    end_row = min(26, ws.max_row)
+    end_row = min(end_row, sheet.max_row)
     
     for row in range(start_row, end_row + 1):
-        try:
-            # Get cell values using mapped columns
-            desc = ws.cell(row, cols.get("desc", 3)).value  # Default to column C
-            job = ws.cell(row, cols.get("job", 1)).value    # Default to column A
-            op = ws.cell(row, cols.get("op", 2)).value      # Default to column B
-            qty = ws.cell(row, cols.get("qty", 7)).value    # Default to column G
-            price = ws.cell(row, cols.get("price", 8)).value # Default to column H
-            ltot = ws.cell(row, cols.get("ltotal", 9)).value # Default to column I
-            
-            # Check for end of line items
-            if isinstance(desc, str) and "ORDER TOTAL" in desc.upper():
-                break
-            
-            # Always add the item, even if some fields are empty
-            items.append({
-                "job": job,
-                "op": op,
-                "desc": desc,
-                "qty": qty,
-                "price": price,
-                "ltot": ltot
-            })
-            
-        except Exception:
-            # Skip problematic rows but continue processing
-            continue
+        # Get cell values using mapped columns
+        desc = sheet.cell(row, cols["desc"])
+        job = sheet.cell(row, cols["job"])
+        op = sheet.cell(row, cols["op"])
+        qty = sheet.cell(row, cols["qty"])
+        price = sheet.cell(row, cols["price"])
+        ltot = sheet.cell(row, cols["ltot"])
+        
+        # Check for end of line items
+        if isinstance(desc, str) and "ORDER TOTAL" in desc.upper():
+            break
+        
+        # Always add the item, even if some fields are empty
+        items.append({
+            "job": job,
+            "op": op,
+            "desc": desc,
+            "qty": qty,
+            "price": price,
+            "ltot": ltot
+        })
     
     return items
 
 
-def validate_excel_structure(rows: List[List[Any]]) -> bool:
+def validate_excel_structure(sheet: ParsedSheet) -> bool:
     """
     Validate that Excel file has expected structure.
     
     Args:
-        rows: List of rows from worksheet
+        sheet: Parsed worksheet
         
     Returns:
         True if structure is valid
     """
-    if not rows or len(rows) < 5:
+    if not sheet or sheet.max_row < 5:
         return False
     
     # Check for common POR keywords
     keywords = ['requestor', 'material', 'quantity', 'price', 'total']
     found_keywords = 0
     
-    for row in rows[:10]:  # Check first 10 rows
+    for row in sheet.rows[:10]:  # Check first 10 rows
         for cell in row:
             if isinstance(cell, str):
                 cell_lower = cell.lower()
@@ -245,4 +391,4 @@ def validate_excel_structure(rows: List[List[Any]]) -> bool:
                         found_keywords += 1
                         break
     
-    return found_keywords >= 3  # At least 3 keywords should be found 
\ No newline at end of file
+    return found_keywords >= 3  # At least 3 keywords should be found
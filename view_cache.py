@@ -0,0 +1,128 @@
+"""
+Rendered /view page cache.
+Pages are cached in a bounded LRU keyed on the data generation and the
+request (page or cursor, search query). Every write that changes what
+/view shows bumps the generation in the database once its transaction
+commits, so cached pages go stale when the data changes, including
+writes made by other processes such as worker.py.
+
+The bump runs in its own short transaction after the commit rather than
+inside the write's transaction: otherwise every concurrent writer would
+queue on the data_generation row lock until the previous one committed.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event, update, select
+from sqlalchemy.orm import Session
+
+from config import VIEW_CACHE_SIZE
+from models import DataGeneration
+
+
+def get_data_generation(session) -> int:
+    """Read the current data generation (0 before the first write)."""
+    return session.execute(select(DataGeneration.value).order_by(DataGeneration.id).limit(1)).scalar() or 0
+
+
+def get_data_version(session) -> Tuple[int, Optional[datetime]]:
+    """Read the current data generation and when it was last bumped (UTC)."""
+    row = session.execute(select(DataGeneration.value, DataGeneration.updated_at)
+                          .order_by(DataGeneration.id).limit(1)).first()
+    if not row:
+        return 0, None
+    updated_at = row.updated_at
+    if updated_at is not None and updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)  # SQLite drops the zone
+    return row.value or 0, updated_at
+
+
+# Session.info flag: the session's current transaction needs a bump on commit
+BUMP_ON_COMMIT = 'bump_data_generation'
+
+
+def bump_data_generation(session) -> None:
+    """Invalidate cached pages once the caller's transaction commits; call inside that transaction."""
+    session.info[BUMP_ON_COMMIT] = True
+
+
+def _bump(bind) -> None:
+    """Increment the generation in a transaction of its own."""
+    now = datetime.now(timezone.utc)
+    with bind.begin() as conn:
+        result = conn.execute(update(DataGeneration).values(value=DataGeneration.value + 1, updated_at=now))
+        if result.rowcount == 0:
+            conn.execute(DataGeneration.__table__.insert().values(value=1, updated_at=now))
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session) -> None:
+    if session.info.pop(BUMP_ON_COMMIT, False):
+        _bump(session.get_bind())
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_bump(session, previous_transaction) -> None:
+    # Only the outermost transaction; a rolled back savepoint leaves the rest to commit
+    if previous_transaction.parent is None:
+        session.info.pop(BUMP_ON_COMMIT, None)
+
+
+class ViewCache:
+    """Thread-safe bounded LRU of rendered pages with hit/miss statistics."""
+
+    def __init__(self, max_entries: int = VIEW_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, generation: int, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key at generation, or None."""
+        with self._lock:
+            value = self._entries.get((generation, key))
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end((generation, key))
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, generation: int, key: Hashable, value: Any) -> None:
+        """Cache value for key at generation, evicting the least recently used."""
+        if self.max_entries < 1:
+            return
+        with self._lock:
+            if generation < self._generation:
+                return  # rendered from data that has since changed
+            if generation > self._generation:
+                # Data changed: pages cached at older generations can never hit again
+                self._stats['invalidations'] += len(self._entries)
+                self._entries.clear()
+                self._generation = generation
+            self._entries[(generation, key)] = value
+            self._entries.move_to_end((generation, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and current size."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats,
+                        entries=len(self._entries),
+                        max_entries=self.max_entries,
+                        hit_rate=round(self._stats['hits'] / lookups, 3) if lookups else 0.0)
+
+
+view_cache = ViewCache()
@@ -0,0 +1,42 @@
+"""
+Standalone upload worker.
+Drains the upload queue outside the web process so parse capacity can be
+sized separately from the web tier:
+
+    UPLOAD_WORKERS=0 python app.py      # web tier only
+    python worker.py --workers 4        # queue workers
+"""
+
+import argparse
+import logging
+import signal
+import threading
+
+from jobs import UploadWorkerPool
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued POR uploads")
+    parser.add_argument('--workers', type=int, default=2, help="number of worker threads")
+    args = parser.parse_args()
+
+    # Imported here so the handler shares the web app's upload logic
+    from app import run_upload_job
+
+    pool = UploadWorkerPool(run_upload_job, max(1, args.workers))
+    pool.start()
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    print("Stopping upload workers...")
+    pool.stop()
+
+
+if __name__ == '__main__':
+    main()